@@ -0,0 +1,224 @@
+"""
+agregados_incrementales.py
+--------------------------
+Agregados materializados que se actualizan solo con los archivos nuevos.
+
+En lugar de volver a ejecutar `agrupar_y_agregar` o `agregar_costo_total` sobre
+todo el histórico cada día, el almacén guarda en disco los agregados parciales
+combinables (suma, conteo, mínimo y máximo por clave) y un manifiesto con los
+archivos ya incorporados (ruta, tamaño y fecha de modificación). Cada
+actualización lee solo los archivos que no están en el manifiesto y combina sus
+parciales con los guardados, de modo que el tiempo depende del archivo nuevo y
+no del histórico.
+
+Uso:
+    from agregados_incrementales import AlmacenAgregados
+
+    almacen = AlmacenAgregados('.agregados_costos', ['troux_uid', 'mes'], 'unblended_cost',
+                               funciones=['sum', 'count', 'mean'])
+    almacen.actualizar(sorted(glob.glob('facturacion/*.csv')))
+    resumen = almacen.resultado()
+    aplicaciones = almacen.agregar_costo_total(aplicaciones)
+
+Si un archivo ya incorporado cambia, `actualizar` lanza un error: sus filas
+anteriores ya están sumadas y no se pueden restar, así que hay que llamar a
+`reconstruir()`.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+import utils
+from agregados_parciales import (AcumuladorParciales, agregados_parciales, asignar_por_claves,
+                                 combinar_parciales, finalizar_parciales, parciales_necesarios)
+
+__all__ = ['AlmacenAgregados']
+
+
+class AlmacenAgregados:
+    """
+    Agregados por clave persistidos en disco y actualizados archivo por archivo.
+
+    Parámetros:
+    - carpeta (str): Carpeta donde se guardan los parciales y el manifiesto.
+    - columnas_agrupacion (str | list): Columna(s) por las que se agrupa.
+    - columna_valor (str): Columna sobre la que se calculan los agregados.
+    - funciones (list): Subconjunto de 'sum', 'count', 'min', 'max' y 'mean'.
+    - tamano_bloque (int): Filas por bloque al leer cada archivo.
+    - **opciones_lectura: sep, encoding, dtype o motor para `utils.leer_csv_por_bloques`.
+    """
+
+    def __init__(self, carpeta: str, columnas_agrupacion, columna_valor: str, funciones: List[str] = ['sum'],
+                 tamano_bloque: int = 1_000_000, **opciones_lectura):
+        self.carpeta = carpeta
+        self.claves = [columnas_agrupacion] if isinstance(columnas_agrupacion, str) else list(columnas_agrupacion)
+        self.columna_valor = columna_valor
+        self.funciones = list(funciones)
+        self.tamano_bloque = tamano_bloque
+        self.opciones_lectura = opciones_lectura
+        self._parciales_requeridos = parciales_necesarios(self.funciones)
+
+        os.makedirs(carpeta, exist_ok=True)
+        self._ruta_manifiesto = os.path.join(carpeta, 'manifiesto.json')
+        self._manifiesto = self._leer_manifiesto()
+        self._parciales: Optional[pd.DataFrame] = None
+
+    # --------- Manifiesto y parciales ---------
+
+    def _configuracion(self) -> Dict[str, Any]:
+        return {'claves': self.claves, 'columna_valor': self.columna_valor,
+                'parciales': self._parciales_requeridos}
+
+    def _leer_manifiesto(self) -> Dict[str, Any]:
+        if not os.path.exists(self._ruta_manifiesto):
+            return {**self._configuracion(), 'version': 0, 'archivo_parciales': None, 'archivos': {}}
+        with open(self._ruta_manifiesto, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        guardada = {clave: manifiesto.get(clave) for clave in self._configuracion()}
+        if guardada != self._configuracion():
+            raise ValueError(f"⚠️ La carpeta '{self.carpeta}' contiene agregados de otra configuración "
+                             f"({guardada}). Use otra carpeta o bórrela para empezar de cero.")
+        return manifiesto
+
+    def _cargar_parciales(self) -> Optional[pd.DataFrame]:
+        if self._parciales is None and self._manifiesto['archivo_parciales']:
+            self._parciales = pd.read_pickle(os.path.join(self.carpeta, self._manifiesto['archivo_parciales']))
+        return self._parciales
+
+    def _persistir(self, parciales: Optional[pd.DataFrame], archivos: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Escribe los parciales en un archivo nuevo y luego reemplaza el manifiesto de
+        forma atómica: si el proceso se interrumpe, el manifiesto anterior sigue
+        apuntando a los parciales anteriores y ningún archivo queda contado dos veces.
+        """
+        anterior = self._manifiesto['archivo_parciales']
+        version = self._manifiesto['version'] + 1
+        nombre = None
+        if parciales is not None:
+            nombre = f'parciales_{version:06d}.pkl'
+            parciales.to_pickle(os.path.join(self.carpeta, nombre))
+
+        manifiesto = {**self._configuracion(), 'version': version, 'archivo_parciales': nombre,
+                      'archivos': archivos}
+        temporal = self._ruta_manifiesto + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=1)
+        os.replace(temporal, self._ruta_manifiesto)
+
+        if anterior and anterior != nombre:
+            os.remove(os.path.join(self.carpeta, anterior))
+        self._manifiesto = manifiesto
+        self._parciales = parciales
+
+    @staticmethod
+    def _firma(ruta: str) -> Dict[str, int]:
+        info = os.stat(ruta)
+        return {'bytes': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+    # --------- Actualización ---------
+
+    def pendientes(self, rutas: Iterable[str]) -> List[str]:
+        """
+        Retorna las rutas que aún no se incorporaron, sin repetir un mismo archivo
+        ('d1.csv' y './d1.csv' cuentan una vez). Lanza ValueError si alguna ya
+        incorporada cambió de tamaño o de fecha de modificación.
+        """
+        nuevas, vistas = [], set()
+        for ruta in rutas:
+            absoluta = os.path.abspath(ruta)
+            if absoluta in vistas:
+                continue
+            vistas.add(absoluta)
+            registrada = self._manifiesto['archivos'].get(absoluta)
+            if registrada is None:
+                nuevas.append(ruta)
+            elif {k: registrada[k] for k in ('bytes', 'mtime_ns')} != self._firma(absoluta):
+                raise ValueError(f"⚠️ El archivo '{ruta}' cambió después de incorporarse. "
+                                 f"Llame a reconstruir() para recalcular los agregados.")
+        return nuevas
+
+    def _parciales_archivo(self, ruta: str) -> tuple:
+        bloques = utils.leer_csv_por_bloques(ruta, tamano_bloque=self.tamano_bloque,
+                                             usecols=self.claves + [self.columna_valor], reportar=False,
+                                             **self.opciones_lectura)
+        acumulador, filas = AcumuladorParciales(), 0
+        for bloque in bloques:
+            filas += len(bloque)
+            acumulador.agregar(agregados_parciales(bloque, self.claves, self.columna_valor,
+                                                    self._parciales_requeridos))
+        return acumulador.combinar(), filas
+
+    def actualizar(self, rutas: Iterable[str]) -> List[str]:
+        """
+        Incorpora los archivos que no estén en el manifiesto y guarda el resultado.
+
+        Parámetros:
+        - rutas (list): Rutas de los CSV del histórico (se pueden pasar todas; las ya
+                        incorporadas se omiten).
+
+        Retorna:
+        - list: Rutas incorporadas en esta llamada.
+        """
+        nuevas = self.pendientes(rutas)
+        if not nuevas:
+            return []
+
+        archivos = dict(self._manifiesto['archivos'])
+        partes = [self._cargar_parciales()]
+        for ruta in nuevas:
+            firma = self._firma(ruta)
+            parcial, filas = self._parciales_archivo(ruta)
+            partes.append(parcial)
+            archivos[os.path.abspath(ruta)] = {**firma, 'filas': filas}
+
+        parciales = combinar_parciales(partes)
+        self._persistir(parciales, archivos)
+        return nuevas
+
+    def reconstruir(self, rutas: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Descarta los agregados y vuelve a incorporar los archivos indicados (por
+        defecto, los que ya estaban en el manifiesto y siguen existiendo).
+        """
+        if rutas is None:
+            rutas = [ruta for ruta in self._manifiesto['archivos'] if os.path.exists(ruta)]
+        self._persistir(None, {})
+        return self.actualizar(rutas)
+
+    # --------- Consulta ---------
+
+    @property
+    def archivos(self) -> Dict[str, Dict[str, Any]]:
+        """Archivos incorporados: {ruta: {'bytes', 'mtime_ns', 'filas'}}."""
+        return dict(self._manifiesto['archivos'])
+
+    def resultado(self, funciones: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Retorna el mismo resultado que `utils.agrupar_y_agregar` sobre todos los
+        archivos incorporados (ordenado por las claves).
+        """
+        funciones = self.funciones if funciones is None else list(funciones)
+        faltantes = set(parciales_necesarios(funciones)) - set(self._parciales_requeridos)
+        if faltantes:
+            raise ValueError(f"⚠️ El almacén no guarda los parciales {sorted(faltantes)}.")
+        parciales = self._cargar_parciales()
+        if parciales is None:
+            return pd.DataFrame(columns=self.claves + funciones)
+        return finalizar_parciales(parciales, funciones).sort_index().reset_index()
+
+    def agregar_costo_total(self, aplicaciones: pd.DataFrame, columna_destino: str = 'costo_total',
+                            decimales: Optional[int] = 2, inplace: bool = False) -> pd.DataFrame:
+        """
+        Equivalente a `utils.agregar_costo_total` usando la suma guardada por clave.
+        Las claves del almacén deben existir en aplicaciones.
+        """
+        if 'sum' not in self._parciales_requeridos:
+            raise ValueError("⚠️ El almacén no guarda la suma; incluya 'sum' o 'mean' en funciones.")
+        parciales = self._cargar_parciales()
+        if parciales is None:
+            parciales = pd.DataFrame({'sum': pd.Series(dtype='float64')})
+        costos = parciales[['sum']].round(decimales) if decimales is not None else parciales[['sum']]
+        return asignar_por_claves(aplicaciones, costos, self.claves, {'sum': columna_destino}, inplace)
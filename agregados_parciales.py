@@ -0,0 +1,159 @@
+"""
+agregados_parciales.py
+----------------------
+Agregados parciales combinables por clave: la base común de
+`utils.agrupar_y_agregar_por_bloques` y de `agregados_incrementales.AlmacenAgregados`.
+
+Cada función pedida se calcula a partir de parciales que se pueden combinar entre
+bloques o archivos sin volver a leer las filas ('mean' = suma / conteo):
+
+    parciales = parciales_necesarios(['sum', 'mean'])          # ['sum', 'count']
+    acumulador = AcumuladorParciales()
+    for bloque in bloques:
+        acumulador.agregar(agregados_parciales(bloque, ['uid'], 'costo', parciales))
+    resultado = finalizar_parciales(acumulador.combinar(), ['sum', 'mean'])
+
+Los parciales son DataFrames indexados por las claves, con una columna por parcial.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+__all__ = ['PARCIALES_AGREGADO', 'COMBINAR_PARCIAL', 'parciales_necesarios', 'agregados_parciales',
+           'combinar_parciales', 'AcumuladorParciales', 'finalizar_parciales', 'asignar_por_claves']
+
+# Parciales de los que se calcula cada función
+PARCIALES_AGREGADO = {
+    'sum': ('sum',),
+    'count': ('count',),
+    'min': ('min',),
+    'max': ('max',),
+    'mean': ('sum', 'count'),
+}
+# Cómo se combina cada parcial entre bloques
+COMBINAR_PARCIAL = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def parciales_necesarios(funciones: Iterable[str]) -> List[str]:
+    """
+    Parciales que requieren las funciones pedidas, en el orden de COMBINAR_PARCIAL.
+    Lanza ValueError si alguna función no se puede combinar por bloques (p. ej. 'median').
+    """
+    funciones = list(funciones)
+    desconocidas = [f for f in funciones if f not in PARCIALES_AGREGADO]
+    if desconocidas:
+        raise ValueError(f"⚠️ Funciones no combinables por bloques: {desconocidas}. "
+                         f"Use {sorted(PARCIALES_AGREGADO)}.")
+    return [p for p in COMBINAR_PARCIAL if any(p in PARCIALES_AGREGADO[f] for f in funciones)]
+
+
+def agregados_parciales(df: pd.DataFrame, claves: List[str], columna_valor: str,
+                        parciales: List[str]) -> pd.DataFrame:
+    """Parciales de un bloque, indexados por las claves (sin ordenar)."""
+    return df.groupby(claves, sort=False, observed=True)[columna_valor].agg(parciales)
+
+
+def combinar_parciales(partes: Iterable[Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+    """
+    Combina varios DataFrames de parciales con las mismas claves en uno solo.
+    Ignora los None y los vacíos; retorna None si no queda ninguno.
+    """
+    partes = [parte for parte in partes if parte is not None and len(parte)]
+    if not partes:
+        return None
+    if len(partes) == 1:
+        return partes[0]
+    unidos = pd.concat(partes)
+    niveles = list(range(unidos.index.nlevels))
+    return unidos.groupby(level=niveles, sort=False).agg(
+        {columna: COMBINAR_PARCIAL[columna] for columna in unidos.columns})
+
+
+class AcumuladorParciales:
+    """
+    Acumula los parciales de cada bloque y los combina por tandas.
+
+    Combinar el acumulado con cada bloque volvería a agrupar todas las claves ya
+    vistas en cada bloque. En su lugar, los parciales nuevos quedan pendientes y
+    solo se combinan cuando ocupan al menos tantas filas como el acumulado (o
+    filas_minimas), así que el costo total crece con las filas de los parciales y
+    no con (bloques x claves distintas).
+
+    Parámetros:
+    - filas_minimas (int): Filas pendientes a partir de las que siempre se combina.
+    """
+
+    def __init__(self, filas_minimas: int = 1_000_000):
+        self.filas_minimas = filas_minimas
+        self._acumulado = None
+        self._pendientes = []
+        self._filas_pendientes = 0
+
+    @property
+    def filas(self) -> int:
+        """Cota superior de los grupos acumulados (acumulado + pendientes sin combinar)."""
+        return (0 if self._acumulado is None else len(self._acumulado)) + self._filas_pendientes
+
+    def agregar(self, parcial: Optional[pd.DataFrame]) -> None:
+        """Agrega los parciales de un bloque (combina si hay suficientes pendientes)."""
+        if parcial is None or not len(parcial):
+            return
+        self._pendientes.append(parcial)
+        self._filas_pendientes += len(parcial)
+        acumulado = 0 if self._acumulado is None else len(self._acumulado)
+        if self._filas_pendientes >= max(acumulado, self.filas_minimas):
+            self.combinar()
+
+    def combinar(self) -> Optional[pd.DataFrame]:
+        """Combina los pendientes con el acumulado y lo retorna (None si no hay datos)."""
+        if self._pendientes:
+            self._acumulado = combinar_parciales([self._acumulado] + self._pendientes)
+            self._pendientes, self._filas_pendientes = [], 0
+        return self._acumulado
+
+    def vaciar(self) -> None:
+        """Descarta el acumulado y los pendientes (p. ej. después de volcarlos a disco)."""
+        self._acumulado, self._pendientes, self._filas_pendientes = None, [], 0
+
+
+def finalizar_parciales(parciales: pd.DataFrame, funciones: Iterable[str]) -> pd.DataFrame:
+    """Calcula las funciones pedidas a partir de los parciales, sin reordenar."""
+    resultado = pd.DataFrame(index=parciales.index)
+    for funcion in funciones:
+        if funcion == 'mean':
+            resultado[funcion] = parciales['sum'] / parciales['count']
+        else:
+            resultado[funcion] = parciales[funcion]
+    return resultado
+
+
+def asignar_por_claves(df: pd.DataFrame, tabla: pd.DataFrame, claves: List[str], destinos: Dict[str, str],
+                       inplace: bool = False) -> pd.DataFrame:
+    """
+    Agrega a df columnas de `tabla` (indexada por las claves) buscando la posición
+    de cada fila en el índice, sin merge.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame al que se agregan las columnas.
+    - tabla (pd.DataFrame): Valores por clave (p. ej. parciales o costos resumidos).
+    - claves (list): Columnas de df que corresponden a los niveles del índice de tabla.
+    - destinos (dict): {columna_tabla: columna_df}.
+    - inplace (bool): Si es True, escribe sobre df y conserva su índice.
+
+    Retorna:
+    - pd.DataFrame con las columnas agregadas (NaN si la clave no está en tabla). Sin
+      inplace tiene un RangeIndex nuevo, como el de un merge.
+    """
+    if len(claves) == 1:
+        buscadas = df[claves[0]]
+    else:
+        buscadas = pd.MultiIndex.from_frame(df[claves])
+    posiciones = tabla.index.get_indexer(buscadas)
+
+    # Solo se reemplazan columnas enteras, así que una copia superficial no toca los datos de df
+    df = df if inplace else df.copy(deep=False)
+    for columna, destino in destinos.items():
+        df[destino] = pd.api.extensions.take(
+            tabla[columna].to_numpy(dtype='float64'), posiciones, allow_fill=True)
+    return df if inplace else df.reset_index(drop=True)
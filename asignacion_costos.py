@@ -0,0 +1,188 @@
+"""
+asignacion_costos.py
+--------------------
+Reparto de costos de proyectos entre sus recursos internos según el porcentaje
+de asignación entre corchetes ('Ana Ruiz [50%], Luis [12.5%]').
+
+En lugar de combinar a mano `dividir_registros_1`, `agregar_columnas_porcentaje`
+y `agregar_costo_total`, la matriz de pesos proyecto x recurso se construye una
+vez (dispersa, en formato CSR: por cada proyecto, sus recursos y pesos) con
+`utils.extraer_porcentajes`, y cualquier tabla de costos por proyecto (y por mes)
+se reparte con un solo producto matricial:
+
+    costo_recurso[r, mes] = sum_p peso[p, r] * costo_proyecto[p, mes]
+
+Uso:
+    from asignacion_costos import MatrizAsignacion
+
+    matriz = MatrizAsignacion(proyectos, columna_proyecto='Codigo')
+    print(matriz.excedidos())            # proyectos asignados por encima del 100%
+    por_recurso = matriz.asignar(costos, columna_proyecto='Codigo',
+                                 columna_costo='unblended_cost', columna_mes='mes')
+
+Con scipy instalado el producto usa scipy.sparse; sin él se hace con numpy
+(mismo resultado).
+"""
+from __future__ import annotations
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+try:
+    import scipy.sparse as sparse  # Opcional: producto disperso en C
+except ImportError:
+    sparse = None
+
+__all__ = ['MatrizAsignacion']
+
+
+class MatrizAsignacion:
+    """
+    Matriz dispersa de pesos proyecto x recurso construida desde una columna de
+    recursos con porcentajes.
+
+    Los proyectos repetidos en varias filas y los recursos repetidos dentro de un
+    proyecto suman sus porcentajes.
+
+    Parámetros:
+    - df (pd.DataFrame): Proyectos con su columna de recursos.
+    - columna_proyecto (str): Columna con el código del proyecto.
+    - columna_fuente (str): Columna con los recursos y sus porcentajes entre corchetes.
+    - separador (str): Separador entre recursos (por defecto ',').
+    - validar (bool): Si es True, lanza ValueError si algún proyecto suma más del 100%.
+    - tolerancia (float): Margen sobre el 100% admitido por redondeos (en fracción).
+    """
+
+    def __init__(self, df: pd.DataFrame, columna_proyecto: str = 'Codigo',
+                 columna_fuente: str = 'RecursosInternos', separador: str = ',',
+                 validar: bool = True, tolerancia: float = 1e-6):
+        if columna_proyecto not in df.columns:
+            raise ValueError(f"⚠️ La columna '{columna_proyecto}' no existe en el DataFrame.")
+        self.columna_proyecto = columna_proyecto
+        self.tolerancia = tolerancia
+
+        largo = utils.extraer_porcentajes(df[[columna_proyecto, columna_fuente]], columna_fuente, separador,
+                                          unir=True, conservar_sin_porcentaje=False)
+        largo = largo[largo[columna_proyecto].notna()]
+
+        # Etiquetas ordenadas: la fila i de la matriz es self.proyectos[i]
+        filas, self.proyectos = pd.factorize(largo[columna_proyecto], sort=True)
+        columnas, self.recursos = pd.factorize(largo['Recurso'], sort=True)
+
+        # Sumar duplicados (proyecto, recurso); la clave combinada ordena por fila y luego columna
+        clave = filas.astype('int64') * len(self.recursos) + columnas
+        claves, inversa = np.unique(clave, return_inverse=True)
+        self.pesos = np.bincount(inversa, weights=largo['ValorPorcentaje'].to_numpy(dtype='float64'))
+        self.indices = claves % max(len(self.recursos), 1)
+        filas_nnz = claves // max(len(self.recursos), 1)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(filas_nnz, minlength=len(self.proyectos)))))
+
+        # Orden por recurso (CSC) para el producto con numpy
+        self._orden_recurso = np.argsort(self.indices, kind='stable')
+        self._filas_nnz = filas_nnz
+
+        if validar:
+            excedidos = self.excedidos()
+            if len(excedidos):
+                muestra = ", ".join(f"{p} ({v:.1%})" for p, v in excedidos['Asignado'].head(5).items())
+                raise ValueError(f"⚠️ {len(excedidos)} proyectos tienen recursos asignados por encima del "
+                                 f"100%: {muestra}. Use validar=False para construir la matriz igualmente.")
+
+    # --------- Consulta ---------
+
+    @property
+    def forma(self) -> tuple:
+        """(proyectos, recursos)."""
+        return len(self.proyectos), len(self.recursos)
+
+    def asignado(self) -> pd.Series:
+        """Fracción total asignada por proyecto (1.0 = 100%)."""
+        return pd.Series(np.add.reduceat(self.pesos, self.indptr[:-1]) if len(self.pesos) else 0.0,
+                         index=self.proyectos, name='Asignado')
+
+    def excedidos(self, maximo: float = 1.0) -> pd.DataFrame:
+        """Proyectos cuyos pesos suman más que maximo (más la tolerancia), con su total asignado."""
+        asignado = self.asignado()
+        return asignado[asignado > maximo + self.tolerancia].to_frame()
+
+    def como_dataframe(self) -> pd.DataFrame:
+        """Tabla larga (proyecto, Recurso, Peso) con los elementos no nulos de la matriz."""
+        return pd.DataFrame({self.columna_proyecto: self.proyectos.take(self._filas_nnz),
+                             'Recurso': self.recursos.take(self.indices),
+                             'Peso': self.pesos})
+
+    def a_scipy(self):
+        """Retorna la matriz como scipy.sparse.csr_matrix (requiere scipy)."""
+        if sparse is None:
+            raise ImportError("⚠️ a_scipy requiere instalar scipy.")
+        return sparse.csr_matrix((self.pesos, self.indices, self.indptr), shape=self.forma)
+
+    # --------- Reparto ---------
+
+    def _multiplicar(self, costos: np.ndarray) -> np.ndarray:
+        """pesos.T @ costos para costos de forma (proyectos, k)."""
+        if sparse is not None:
+            return np.asarray(self.a_scipy().T @ costos)
+        return self._multiplicar_numpy(costos)
+
+    def _multiplicar_numpy(self, costos: np.ndarray) -> np.ndarray:
+        """pesos.T @ costos sin scipy: suma por recurso de los aportes ordenados (CSC)."""
+        resultado = np.zeros((len(self.recursos), costos.shape[1]))
+        if len(self.pesos):
+            aportes = costos[self._filas_nnz[self._orden_recurso]] * self.pesos[self._orden_recurso, None]
+            recursos = self.indices[self._orden_recurso]
+            cortes = np.flatnonzero(np.r_[True, recursos[1:] != recursos[:-1]])
+            resultado[recursos[cortes]] = np.add.reduceat(aportes, cortes, axis=0)
+        return resultado
+
+    def asignar(self, costos: pd.DataFrame, columna_proyecto: Optional[str] = None,
+                columna_costo: Union[str, List[str]] = 'unblended_cost', columna_mes: Optional[str] = None,
+                decimales: Optional[int] = 2, sin_asignar: Optional[str] = '(sin asignar)') -> pd.DataFrame:
+        """
+        Reparte los costos por proyecto entre los recursos según sus pesos.
+
+        Parámetros:
+        - costos (pd.DataFrame): Costos con una o varias filas por proyecto.
+        - columna_proyecto (str): Columna del proyecto en costos (por defecto, la de la matriz).
+        - columna_costo (str | list): Columna(s) de costo a repartir.
+        - columna_mes (str): Si se indica, se reparte por separado cada valor de esta columna
+                             (una columna de resultado por mes) con una sola columna de costo.
+        - decimales (int): Decimales del resultado (None para no redondear).
+        - sin_asignar (str): Etiqueta de la fila con el costo que no se asigna a ningún recurso
+                             (proyectos sin recursos o asignados por debajo del 100%). None la omite.
+                             Lanza ValueError si algún recurso se llama igual.
+
+        Retorna:
+        - pd.DataFrame con un recurso por fila y una columna por costo (o por mes).
+        """
+        columna_proyecto = columna_proyecto or self.columna_proyecto
+        if sin_asignar is not None and sin_asignar in self.recursos:
+            raise ValueError(f"⚠️ Hay un recurso llamado '{sin_asignar}': indique otra etiqueta en "
+                             f"sin_asignar (o None) para no mezclar su costo con el no asignado.")
+        if columna_mes is not None:
+            if not isinstance(columna_costo, str):
+                raise ValueError("⚠️ Con columna_mes indique una sola columna de costo.")
+            tabla = costos.pivot_table(index=columna_proyecto, columns=columna_mes, values=columna_costo,
+                                       aggfunc='sum', fill_value=0.0, observed=True)
+        else:
+            columnas = [columna_costo] if isinstance(columna_costo, str) else list(columna_costo)
+            tabla = costos.groupby(columna_proyecto, sort=False, observed=True)[columnas].sum()
+
+        # Alinear las filas de costos con las de la matriz (proyectos sin costo -> 0)
+        valores = tabla.to_numpy(dtype='float64')
+        posiciones = self.proyectos.get_indexer(tabla.index)
+        alineados = np.zeros((len(self.proyectos), valores.shape[1]))
+        conocidos = posiciones >= 0
+        alineados[posiciones[conocidos]] = valores[conocidos]
+
+        resultado = pd.DataFrame(self._multiplicar(alineados), index=pd.Index(self.recursos, name='Recurso'),
+                                 columns=tabla.columns)
+        if sin_asignar is not None:
+            resto = valores.sum(axis=0) - resultado.to_numpy().sum(axis=0)
+            resultado.loc[sin_asignar] = resto
+        if decimales is not None:
+            resultado = resultado.round(decimales)
+        return resultado
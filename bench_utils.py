@@ -0,0 +1,722 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_utils.py
+--------------
+Benchmarks de las utilidades de `utils.py`.
+
+1) Comparación con las versiones anteriores (fila por fila), para comprobar que
+   las versiones vectorizadas devuelven lo mismo y medir la mejora:
+
+    python bench_utils.py --filas 1000000
+
+2) Suite de regresión: mide tiempo y pico de memoria de cada función pública de
+   `utils.py` con datos sintéticos deterministas (1e4 a 1e7 filas), guarda una
+   línea base en JSON y compara las siguientes ejecuciones contra ella:
+
+    python bench_utils.py --suite --tamanos 1e4 1e5 1e6 --guardar-base bench_base.json
+    python bench_utils.py --suite --tamanos 1e4 1e5 1e6 --comparar bench_base.json --umbral 0.2
+
+   Con --comparar el proceso termina con código 1 si alguna medición empeora más
+   que el umbral. El pico de memoria es el de tracemalloc (memoria de Python; no
+   incluye los buffers internos de Arrow).
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+
+# --------- Versiones de referencia (implementación original) ---------
+
+def _dividir_registros_filas(df, columna_codigo='Codigo', columna_valor='AplicacionesImpactadas '):
+    """Versión original de `utils.dividir_registros` basada en iterrows."""
+    registros = []
+    for _, fila in df.iterrows():
+        codigo = fila[columna_codigo]
+        valores = str(fila[columna_valor])
+        partes = re.split(r'[\n,]+', valores)
+        for parte in partes:
+            parte = parte.strip()
+            if parte:
+                registros.append({columna_codigo: codigo, columna_valor: parte})
+    return pd.DataFrame(registros)
+
+
+def _contar_elementos_filas(df, columnas_config, separador=','):
+    """Versión original de `utils.contar_elementos` con un lambda por celda."""
+    df_resultado = df.copy()
+    for columna_original, nueva_columna in columnas_config.items():
+        df_resultado[nueva_columna] = (
+            df_resultado[columna_original]
+            .fillna('')
+            .apply(lambda x: len([item for item in x.split(separador) if item.strip() != '']))
+        )
+    return df_resultado
+
+
+def _separar_nombres_apellidos_split(df):
+    """Versión original de `utils.separar_nombres_apellidos` con tres str.split."""
+    nombres_split = df['Nombres'].str.split(',', n=1, expand=True)
+    df['Apellidos'] = nombres_split[0].str.strip()
+    df['Nombres_'] = nombres_split[1].str.strip()
+    apellidos_split = df['Apellidos'].str.split(' ', n=1, expand=True)
+    df['Apellido1'] = apellidos_split[0]
+    df['Apellido2'] = apellidos_split[1].fillna('')
+    nombres_split = df['Nombres_'].str.split(' ', n=1, expand=True)
+    df['Nombre1'] = nombres_split[0]
+    df['Nombre2'] = nombres_split[1].fillna('')
+    return df.drop(columns=['Apellidos', 'Nombres_'])
+
+
+# --------- Datos sintéticos ---------
+
+def generar_aplicaciones(n, semilla=0):
+    """
+    Genera un DataFrame con 'Codigo' y 'AplicacionesImpactadas ' donde cada
+    celda contiene entre 1 y 5 aplicaciones separadas por comas o saltos de línea.
+    """
+    rng = np.random.default_rng(semilla)
+    catalogo = np.array([f"APP{i:04d}" for i in range(500)])
+    num = rng.integers(1, 6, size=n)
+    separadores = np.array([', ', '\n', ',\n'])
+    celdas = [
+        separadores[rng.integers(0, 3)].join(catalogo[rng.integers(0, 500, size=k)])
+        for k in num
+    ]
+    return pd.DataFrame({
+        'Codigo': [f"REQ{i:07d}" for i in range(n)],
+        'AplicacionesImpactadas ': celdas,
+    })
+
+
+def generar_recursos(n, semilla=0):
+    """
+    Genera un DataFrame con 'RecursosInternos' del tipo 'Nombre Apellido [50%], ...'
+    (entre 0 y 4 recursos por celda, con algunos nulos).
+    """
+    rng = np.random.default_rng(semilla)
+    nombres = np.array([f"Persona{i:03d} Apellido{i % 37:02d}" for i in range(300)])
+    porcentajes = np.array([10, 20, 25, 50, 100])
+    num = rng.integers(0, 5, size=n)
+    celdas = [
+        ', '.join(f"{nombre} [{pct}%]" for nombre, pct in
+                  zip(nombres[rng.integers(0, 300, size=k)], porcentajes[rng.integers(0, 5, size=k)]))
+        if k else None
+        for k in num
+    ]
+    return pd.DataFrame({'Codigo': [f"REQ{i:07d}" for i in range(n)], 'RecursosInternos': celdas})
+
+
+def generar_nombres(n, semilla=0):
+    """
+    Genera un DataFrame con 'Nombres' del tipo 'Apellido1 Apellido2, Nombre1 Nombre2'
+    (a veces con un solo apellido o un solo nombre), como un extracto de RR. HH.
+    """
+    rng = np.random.default_rng(semilla)
+    apellidos = np.array([f"Apellido{i:04d}" for i in range(3000)])
+    nombres = np.array([f"Nombre{i:03d}" for i in range(800)])
+    ap1, ap2 = apellidos[rng.integers(0, 3000, n)], apellidos[rng.integers(0, 3000, n)]
+    nom1, nom2 = nombres[rng.integers(0, 800, n)], nombres[rng.integers(0, 800, n)]
+    un_apellido, un_nombre = rng.random(n) < 0.1, rng.random(n) < 0.3
+    celdas = [
+        f"{a1}{'' if ua else ' ' + a2}, {n1}{'' if un else ' ' + n2}"
+        for a1, a2, n1, n2, ua, un in zip(ap1, ap2, nom1, nom2, un_apellido, un_nombre)
+    ]
+    return pd.DataFrame({'Nombres': celdas})
+
+
+def _catalogo(rng, n, construir, maximo=200_000):
+    """
+    Construye hasta `maximo` celdas distintas con construir(rng, k) y las muestrea
+    hasta n filas, para generar 1e7 filas sin un bucle de Python por fila.
+    """
+    celdas = np.asarray(construir(rng, min(n, maximo)), dtype=object)
+    return celdas if len(celdas) == n else celdas[rng.integers(0, len(celdas), size=n)]
+
+
+def _fechas_texto(dias, formato):
+    """Convierte días desde 1970 a texto 'dd/mm/aaaa' ('d-m-a') o 'mm/dd/aaaa' ('m-d-a')."""
+    fechas = pd.to_datetime(dias, unit='D')
+    return fechas.strftime('%d/%m/%Y' if formato == 'd-m-a' else '%m/%d/%Y').to_numpy(dtype=object)
+
+
+def generar_datos(n, semilla=0):
+    """
+    Genera los DataFrames sintéticos de la suite (deterministas para una semilla):
+
+    - 'nombres': 'Nombres' del tipo 'Apellido1 Apellido2, Nombre1 Nombre2'.
+    - 'recursos': 'RecursosInternos' con porcentajes entre corchetes ('Ana Ruiz [25%], ...')
+      y 'Roles' con la lista alineada de roles.
+    - 'aplicaciones': 'Codigo' y 'AplicacionesImpactadas ' separadas por comas o saltos de línea.
+    - 'externos': 'RecursosExternosProveedoSM' con campos separados por '|'.
+    - 'fechas': 'FechaInicio'/'FechaFin' en d-m-a y 'FechaInicioMDA'/'FechaFinMDA' en m-d-a.
+    - 'costos': líneas de costo (troux_uid, mes, cuenta, unblended_cost y el costo como texto).
+    - 'inventario': una fila por troux_uid, para agregar_costo_total.
+    """
+    rng = np.random.default_rng(semilla)
+    num_uids = max(n // 50, 10)
+
+    def recursos(rng, k):
+        nombres = np.array([f"Persona{i:04d} Apellido{i % 97:02d}" for i in range(2000)])
+        roles = np.array(['Analista', 'Desarrollador', 'QA', 'Líder', 'Arquitecto'])
+        porcentajes = np.array(['10', '20', '25', '50', '100', '12.5'])
+        cantidades = rng.integers(0, 5, size=k)
+        celdas, celdas_roles = [], []
+        for cantidad in cantidades:
+            if cantidad == 0:
+                celdas.append(None)
+                celdas_roles.append(None)
+                continue
+            elegidos = rng.integers(0, 2000, size=cantidad)
+            celdas.append(', '.join(f"{nombres[i]} [{porcentajes[i % 6]}%]" for i in elegidos))
+            celdas_roles.append(', '.join(roles[elegidos % 5]))
+        return list(zip(celdas, celdas_roles))
+
+    pares = _catalogo(rng, n, recursos)
+    externos = _catalogo(rng, n, lambda rng, k: [
+        f"Proveedor{p:03d} | CTR-{c:05d} | Consultor{c % 700:03d}" + (" | Renovación pendiente" if c % 4 == 0 else "")
+        for p, c in zip(rng.integers(0, 300, size=k), rng.integers(0, 99_999, size=k))
+    ])
+
+    inicio = rng.integers(18_000, 20_500, size=n)   # días desde 1970 (2019-2026)
+    fin = inicio + rng.integers(0, 900, size=n)
+    costo = np.round(rng.gamma(2.0, 150.0, size=n), 2)
+
+    return {
+        'nombres': generar_nombres(min(n, 200_000), semilla).sample(n, replace=n > 200_000, random_state=semilla,
+                                                                   ignore_index=True),
+        'recursos': pd.DataFrame({
+            'Codigo': np.arange(n),
+            'RecursosInternos': [celda for celda, _ in pares],
+            'Roles': [roles for _, roles in pares],
+        }),
+        'aplicaciones': generar_aplicaciones(min(n, 200_000), semilla).sample(
+            n, replace=n > 200_000, random_state=semilla, ignore_index=True),
+        'externos': pd.DataFrame({'RecursosExternosProveedoSM': externos}),
+        'fechas': pd.DataFrame({
+            'FechaInicio': _fechas_texto(inicio, 'd-m-a'),
+            'FechaFin': _fechas_texto(fin, 'd-m-a'),
+            'FechaInicioMDA': _fechas_texto(inicio, 'm-d-a'),
+            'FechaFinMDA': _fechas_texto(fin, 'm-d-a'),
+        }),
+        'costos': pd.DataFrame({
+            'troux_uid': np.char.add('UID', rng.integers(0, num_uids, size=n).astype(str)).astype(object),
+            'mes': rng.integers(1, 13, size=n),
+            'cuenta': np.array(['C1', 'C2', 'C3', 'C4', None], dtype=object)[rng.integers(0, 5, size=n)],
+            'unblended_cost': costo,
+            'costo_texto': np.char.add('$ ', costo.astype(str)).astype(object),
+        }),
+        'inventario': pd.DataFrame({'troux_uid': [f'UID{i}' for i in range(num_uids)]}),
+    }
+
+
+# --------- Medición ---------
+
+def medir(funcion, *args, **kwargs):
+    """Ejecuta la función y devuelve (resultado, segundos)."""
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def bench_dividir_registros(n):
+    df = generar_aplicaciones(n)
+    esperado, t_filas = medir(_dividir_registros_filas, df)
+    obtenido, t_vector = medir(utils.dividir_registros, df)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+    return t_filas, t_vector
+
+
+def bench_contar_elementos(n):
+    df = generar_recursos(n)
+    config = {'RecursosInternos': 'numRecursos'}
+    esperado, t_filas = medir(_contar_elementos_filas, df, config)
+    obtenido, t_vector = medir(utils.contar_elementos, df, config, inplace=True)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+    return t_filas, t_vector
+
+
+def bench_separar_nombres_apellidos(n):
+    df = generar_nombres(n)
+    esperado, t_split = medir(_separar_nombres_apellidos_split, df.copy())
+    obtenido, t_regex = medir(utils.separar_nombres_apellidos, df)
+    pd.testing.assert_frame_equal(obtenido.astype(object), esperado.astype(object))
+    return t_split, t_regex
+
+
+BENCHMARKS = {
+    'dividir_registros': bench_dividir_registros,
+    'contar_elementos': bench_contar_elementos,
+    'separar_nombres_apellidos': bench_separar_nombres_apellidos,
+}
+
+
+def imprimir(nombre, n, t_anterior, t_nuevo):
+    print(f"{nombre:<28} filas={n:>9,}  anterior={t_anterior:8.3f}s  "
+          f"nuevo={t_nuevo:8.3f}s  mejora={t_anterior / t_nuevo:6.1f}x")
+
+
+# --------- Suite de regresión ---------
+
+TAMANOS = (10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Caso:
+    """
+    Una medición de la suite.
+
+    - funcion (str): Función de utils.py que cubre el caso.
+    - ejecutar (callable): `ejecutar(datos, archivos)`, la llamada que se mide.
+    - preparar (callable): `preparar(datos, archivos)` retorna (sin medirse) los datos que
+      recibe ejecutar, p. ej. con copias para las funciones que modifican su entrada.
+      Por defecto se usan los datos tal cual.
+    - max_filas (int): Tamaño máximo con el que se ejecuta el caso.
+    """
+
+    def __init__(self, funcion, ejecutar, preparar=None, max_filas=None):
+        self.funcion = funcion
+        self.ejecutar = ejecutar
+        self.preparar = preparar
+        self.max_filas = max_filas
+
+
+REGLAS_COSTO = [
+    {'columna': 'costo_texto', 'tipo': 'replace', 'patron': '$'},
+    {'columna': 'costo_texto', 'tipo': 'regex', 'patron': r'\s+'},
+]
+COLUMNAS_RECURSOS = {'RecursosInternos': 'Recurso', 'Roles': 'Rol'}
+FILTROS_COSTO = {'cuenta': ['C1', 'C2'], 'mes': {'entre': (3, 6)}}
+
+
+# --------- Preparación (no se mide) ---------
+
+def _con_copia(datos, nombre):
+    return {**datos, nombre: datos[nombre].copy()}
+
+
+def preparar_copia_costos(datos, archivos):
+    return _con_copia(datos, 'costos')
+
+
+def preparar_copia_recursos(datos, archivos):
+    return _con_copia(datos, 'recursos')
+
+
+def preparar_copia_externos(datos, archivos):
+    return _con_copia(datos, 'externos')
+
+
+def preparar_indice_filtro(datos, archivos):
+    """Construye el índice de filtro de costos antes de medir."""
+    utils.filtrar_dataframe(datos['costos'], {'mes': 1, 'cuenta': 'C1'}, usar_indice=True)
+    return datos
+
+
+# --------- Casos ---------
+
+def caso_leer_csv_por_bloques(d, a):
+    return sum(len(bloque) for bloque in utils.leer_csv_por_bloques(a['costos_csv'], tamano_bloque=250_000,
+                                                                     reportar=False))
+
+
+def caso_cargar_archivo(d, a):
+    return utils.cargar_archivo(a['costos_csv'])
+
+
+def caso_compactar_memoria(d, a):
+    return utils.compactar_memoria(d['costos'], reportar=False)
+
+
+def caso_limpiar_columna(d, a):
+    return utils.limpiar_columna(d['costos'], 'costo_texto', '$')
+
+
+def caso_limpiar_columna_por_unicos(d, a):
+    return utils.limpiar_columna(d['costos'], 'costo_texto', '$', por_unicos=True)
+
+
+def _mayusculas(serie):
+    return serie.str.upper()
+
+
+def caso_aplicar_por_unicos(d, a):
+    return utils.aplicar_por_unicos(d['nombres']['Nombres'], _mayusculas)
+
+
+def caso_convertir_a_numerico(d, a):
+    return utils.convertir_a_numerico(d['costos'], 'unblended_cost')
+
+
+def caso_reemplazar_nulos(d, a):
+    return utils.reemplazar_nulos(d['costos'], 'cuenta', 'SIN CUENTA')
+
+
+def caso_agrupar_y_agregar(d, a):
+    return utils.agrupar_y_agregar(d['costos'], ['troux_uid', 'mes'], 'unblended_cost', ['sum', 'mean'])
+
+
+def caso_agrupar_y_agregar_por_bloques(d, a):
+    return utils.agrupar_y_agregar_por_bloques(a['costos_csv'], ['troux_uid', 'mes'], 'unblended_cost',
+                                               ['sum', 'mean'], tamano_bloque=250_000)
+
+
+def caso_extraer_columnas(d, a):
+    return utils.extraer_columnas(d['costos'], ['troux_uid', 'cuenta'], incluir_duplicados=False)
+
+
+def caso_resumir_costos(d, a):
+    return utils.resumir_costos(d['costos'], ['troux_uid', 'mes', 'cuenta'], 'unblended_cost')
+
+
+def caso_agregar_costo_total(d, a):
+    return utils.agregar_costo_total(d['costos'], d['inventario'])
+
+
+def caso_separar_nombres_apellidos(d, a):
+    return utils.separar_nombres_apellidos(d['nombres'])
+
+
+def caso_cargar_hojas_excel(d, a):
+    return utils.cargar_hojas_excel(a['costos_xlsx'], ['Costos'])
+
+
+def caso_dividir_registros(d, a):
+    return utils.dividir_registros(d['aplicaciones'])
+
+
+def caso_agregar_columnas_porcentaje(d, a):
+    return utils.agregar_columnas_porcentaje(d['recursos'])
+
+
+def caso_separar_recursos_externos(d, a):
+    return utils.separar_recursos_externos(d['externos'], 'RecursosExternosProveedoSM')
+
+
+def caso_separar_recursos_externos_por_unicos(d, a):
+    return utils.separar_recursos_externos(d['externos'], 'RecursosExternosProveedoSM', por_unicos=True)
+
+
+def caso_agregar_columnas_porcentaje_v1(d, a):
+    return utils.agregar_columnas_porcentaje_v1(d['recursos'])
+
+
+def caso_agregar_columnas_porcentaje_v1_por_unicos(d, a):
+    return utils.agregar_columnas_porcentaje_v1(d['recursos'], por_unicos=True)
+
+
+def caso_extraer_porcentajes(d, a):
+    return utils.extraer_porcentajes(d['recursos'])
+
+
+def caso_extraer_porcentajes_unir(d, a):
+    return utils.extraer_porcentajes(d['recursos'], unir=True)
+
+
+def caso_filtrar_dataframe(d, a):
+    return utils.filtrar_dataframe(d['costos'], FILTROS_COSTO)
+
+
+def caso_filtrar_dataframe_indice(d, a):
+    return utils.filtrar_dataframe(d['costos'], FILTROS_COSTO, usar_indice=True)
+
+
+def caso_limpiar_indices_filtro(d, a):
+    return utils.limpiar_indices_filtro(d['costos'])
+
+
+def caso_dividir_registros_1(d, a):
+    return utils.dividir_registros_1(d['recursos'], 'RecursosInternos', 'Recurso')
+
+
+def caso_estimar_filas_dividir(d, a):
+    return utils.estimar_filas_dividir(d['recursos'], ['RecursosInternos', 'Roles'])
+
+
+def caso_dividir_registros_multiple(d, a):
+    return utils.dividir_registros_multiple(d['recursos'], COLUMNAS_RECURSOS)
+
+
+def caso_dividir_registros_multiple_pareado(d, a):
+    return utils.dividir_registros_multiple(d['recursos'], COLUMNAS_RECURSOS, modo='pareado')
+
+
+def caso_contar_elementos(d, a):
+    return utils.contar_elementos(d['recursos'], {'RecursosInternos': 'numRecursos'})
+
+
+def caso_guardar_columnas_csv(d, a):
+    return utils.guardar_columnas_csv(d['costos'], ['troux_uid', 'mes', 'unblended_cost'], 'costos.csv',
+                                      a['salida'])
+
+
+def caso_guardar_columnas_csv_parquet(d, a):
+    return utils.guardar_columnas_csv(d['costos'], ['troux_uid', 'mes', 'unblended_cost'], 'costos.parquet',
+                                      a['salida'])
+
+
+def caso_guardar_varios_csv(d, a):
+    return utils.guardar_varios_csv([
+        {'df': d['costos'], 'columnas': ['troux_uid', 'unblended_cost'], 'nombre_archivo': 'a.csv.gz',
+         'carpeta': a['salida']},
+        {'df': d['nombres'], 'columnas': ['Nombres'], 'nombre_archivo': 'b.csv.gz', 'carpeta': a['salida']},
+    ])
+
+
+def caso_limpiar_columnas(d, a):
+    return utils.limpiar_columnas(d['costos'], REGLAS_COSTO)
+
+
+def caso_formatear_fechas_dma(d, a):
+    return utils.formatear_fechas(d['fechas'], ['FechaInicio', 'FechaFin'], formato='d-m-a')
+
+
+def caso_formatear_fechas_mda(d, a):
+    return utils.formatear_fechas(d['fechas'], ['FechaInicioMDA', 'FechaFinMDA'], formato='m-d-a')
+
+
+def caso_formatear_fechas_celda_a_celda(d, a):
+    return utils.formatear_fechas(d['fechas'], ['FechaInicio', 'FechaFin'], formato='d-m-a', por_unicos=False)
+
+
+def caso_calcular_detalle_laborable(d, a):
+    return utils.calcular_detalle_laborable(d['fechas'], 'FechaInicio', 'FechaFin')
+
+
+def caso_calcular_rangos_fechas(d, a):
+    return utils.calcular_rangos_fechas(d['fechas'], 'FechaInicio', 'FechaFin')
+
+
+CASOS = {
+    'leer_csv_por_bloques': Caso('leer_csv_por_bloques', caso_leer_csv_por_bloques),
+    'cargar_archivo': Caso('cargar_archivo', caso_cargar_archivo),
+    'compactar_memoria': Caso('compactar_memoria', caso_compactar_memoria),
+    'limpiar_columna': Caso('limpiar_columna', caso_limpiar_columna, preparar_copia_costos),
+    'limpiar_columna[por_unicos]': Caso('limpiar_columna', caso_limpiar_columna_por_unicos,
+                                        preparar_copia_costos),
+    'aplicar_por_unicos': Caso('aplicar_por_unicos', caso_aplicar_por_unicos),
+    'convertir_a_numerico': Caso('convertir_a_numerico', caso_convertir_a_numerico, preparar_copia_costos),
+    'reemplazar_nulos': Caso('reemplazar_nulos', caso_reemplazar_nulos, preparar_copia_costos),
+    'agrupar_y_agregar': Caso('agrupar_y_agregar', caso_agrupar_y_agregar),
+    'agrupar_y_agregar_por_bloques': Caso('agrupar_y_agregar_por_bloques', caso_agrupar_y_agregar_por_bloques),
+    'extraer_columnas': Caso('extraer_columnas', caso_extraer_columnas),
+    'resumir_costos': Caso('resumir_costos', caso_resumir_costos),
+    'agregar_costo_total': Caso('agregar_costo_total', caso_agregar_costo_total),
+    'separar_nombres_apellidos': Caso('separar_nombres_apellidos', caso_separar_nombres_apellidos),
+    'cargar_hojas_excel': Caso('cargar_hojas_excel', caso_cargar_hojas_excel, max_filas=100_000),
+    'dividir_registros': Caso('dividir_registros', caso_dividir_registros),
+    'agregar_columnas_porcentaje': Caso('agregar_columnas_porcentaje', caso_agregar_columnas_porcentaje,
+                                        preparar_copia_recursos),
+    'separar_recursos_externos': Caso('separar_recursos_externos', caso_separar_recursos_externos,
+                                      preparar_copia_externos),
+    'agregar_columnas_porcentaje_v1': Caso('agregar_columnas_porcentaje_v1', caso_agregar_columnas_porcentaje_v1,
+                                           preparar_copia_recursos),
+    'agregar_columnas_porcentaje_v1[por_unicos]': Caso('agregar_columnas_porcentaje_v1',
+                                                       caso_agregar_columnas_porcentaje_v1_por_unicos,
+                                                       preparar_copia_recursos),
+    'extraer_porcentajes': Caso('extraer_porcentajes', caso_extraer_porcentajes),
+    'extraer_porcentajes[unir]': Caso('extraer_porcentajes', caso_extraer_porcentajes_unir),
+    'separar_recursos_externos[por_unicos]': Caso('separar_recursos_externos',
+                                                  caso_separar_recursos_externos_por_unicos,
+                                                  preparar_copia_externos),
+    'filtrar_dataframe': Caso('filtrar_dataframe', caso_filtrar_dataframe),
+    'filtrar_dataframe[indice]': Caso('filtrar_dataframe', caso_filtrar_dataframe_indice, preparar_indice_filtro),
+    'limpiar_indices_filtro': Caso('limpiar_indices_filtro', caso_limpiar_indices_filtro, preparar_indice_filtro),
+    'dividir_registros_1': Caso('dividir_registros_1', caso_dividir_registros_1),
+    'estimar_filas_dividir': Caso('estimar_filas_dividir', caso_estimar_filas_dividir),
+    'dividir_registros_multiple': Caso('dividir_registros_multiple', caso_dividir_registros_multiple),
+    'dividir_registros_multiple[pareado]': Caso('dividir_registros_multiple',
+                                                caso_dividir_registros_multiple_pareado),
+    'contar_elementos': Caso('contar_elementos', caso_contar_elementos),
+    'guardar_columnas_csv': Caso('guardar_columnas_csv', caso_guardar_columnas_csv),
+    'guardar_columnas_csv[parquet]': Caso('guardar_columnas_csv', caso_guardar_columnas_csv_parquet),
+    'guardar_varios_csv': Caso('guardar_varios_csv', caso_guardar_varios_csv),
+    'limpiar_columnas': Caso('limpiar_columnas', caso_limpiar_columnas),
+    'formatear_fechas[d-m-a]': Caso('formatear_fechas', caso_formatear_fechas_dma),
+    'formatear_fechas[m-d-a]': Caso('formatear_fechas', caso_formatear_fechas_mda),
+    'formatear_fechas[celda a celda]': Caso('formatear_fechas', caso_formatear_fechas_celda_a_celda),
+    'calcular_detalle_laborable': Caso('calcular_detalle_laborable', caso_calcular_detalle_laborable),
+    'calcular_rangos_fechas': Caso('calcular_rangos_fechas', caso_calcular_rangos_fechas),
+}
+
+
+def funciones_sin_caso():
+    """Funciones públicas de utils.py que todavía no tienen un caso en la suite."""
+    publicas = {nombre for nombre, objeto in vars(utils).items()
+                if callable(objeto) and not nombre.startswith('_') and getattr(objeto, '__module__', None) == 'utils'}
+    return sorted(publicas - {caso.funcion for caso in CASOS.values()})
+
+
+def _preparar_archivos(datos, carpeta, n):
+    """Escribe (sin medirse) los archivos que leen los casos de carga."""
+    archivos = {'salida': os.path.join(carpeta, 'salida'), 'costos_csv': os.path.join(carpeta, 'costos.csv')}
+    datos['costos'].to_csv(archivos['costos_csv'], index=False)
+    if n <= CASOS['cargar_hojas_excel'].max_filas:
+        try:
+            archivos['costos_xlsx'] = os.path.join(carpeta, 'costos.xlsx')
+            datos['costos'].to_excel(archivos['costos_xlsx'], sheet_name='Costos', index=False)
+        except ImportError:
+            archivos.pop('costos_xlsx')
+    return archivos
+
+
+def medir_caso(caso, datos, archivos, repeticiones=1, memoria=True):
+    """
+    Mide un caso: mejor tiempo de `repeticiones` ejecuciones (sin tracemalloc, que
+    las haría más lentas) y, aparte, el pico de memoria de una ejecución más.
+    """
+    tiempos = []
+    # Los mensajes que imprimen las funciones (p. ej. cargar_archivo) no se muestran
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticiones):
+            entrada = caso.preparar(datos, archivos) if caso.preparar else datos
+            inicio = time.perf_counter()
+            caso.ejecutar(entrada, archivos)
+            tiempos.append(time.perf_counter() - inicio)
+
+        pico = None
+        if memoria:
+            entrada = caso.preparar(datos, archivos) if caso.preparar else datos
+            tracemalloc.start()
+            try:
+                base = tracemalloc.get_traced_memory()[0]
+                caso.ejecutar(entrada, archivos)
+                pico = tracemalloc.get_traced_memory()[1] - base
+            finally:
+                tracemalloc.stop()
+    return {'segundos': min(tiempos), 'pico_bytes': pico}
+
+
+def ejecutar_suite(tamanos, casos=None, repeticiones=1, memoria=True, semilla=0):
+    """
+    Ejecuta los casos para cada tamaño y retorna {'caso@filas': medición}. Los
+    casos con max_filas menor que el tamaño (o sin archivo de entrada) se omiten.
+    """
+    resultados = {}
+    for n in tamanos:
+        datos = generar_datos(n, semilla)
+        with tempfile.TemporaryDirectory(prefix='bench_utils_') as carpeta:
+            archivos = _preparar_archivos(datos, carpeta, n)
+            for nombre in casos or CASOS:
+                caso = CASOS[nombre]
+                if caso.max_filas is not None and n > caso.max_filas:
+                    continue
+                if nombre == 'cargar_hojas_excel' and 'costos_xlsx' not in archivos:
+                    print("⚠️ cargar_hojas_excel omitido: se necesita openpyxl.")
+                    continue
+                medicion = medir_caso(caso, datos, archivos, repeticiones, memoria)
+                resultados[f'{nombre}@{n}'] = medicion
+                pico = f"{medicion['pico_bytes'] / 1024**2:10.1f} MB" if medicion['pico_bytes'] is not None else ''
+                print(f"{nombre:<38} filas={n:>11,}  {medicion['segundos']:9.3f}s  {pico}", flush=True)
+        utils.limpiar_indices_filtro()
+    return resultados
+
+
+def guardar_base(resultados, ruta):
+    """Guarda los resultados como línea base en JSON (con el entorno en que se midieron)."""
+    base = {
+        'entorno': {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                    'pyarrow': getattr(utils.pyarrow, '__version__', None), 'maquina': platform.node()},
+        'resultados': resultados,
+    }
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(base, f, indent=1, sort_keys=True)
+    os.replace(temporal, ruta)
+
+
+def comparar_con_base(resultados, ruta, umbral=0.2, minimo_segundos=0.01):
+    """
+    Compara los resultados con la línea base e imprime las diferencias.
+
+    Una medición empeora si su tiempo supera al de la base en más de `umbral`
+    (proporción, 0.2 = 20%) y en más de `minimo_segundos`, o si su pico de memoria
+    supera al de la base en más de `umbral`.
+
+    Retorna:
+    - list: Claves 'caso@filas' que empeoraron.
+    """
+    with open(ruta, encoding='utf-8') as f:
+        base = json.load(f)['resultados']
+
+    regresiones = []
+    for clave, actual in resultados.items():
+        anterior = base.get(clave)
+        if anterior is None:
+            print(f"{clave:<50} (sin línea base)")
+            continue
+        razon = actual['segundos'] / anterior['segundos'] if anterior['segundos'] else float('inf')
+        lento = (actual['segundos'] > anterior['segundos'] * (1 + umbral)
+                 and actual['segundos'] - anterior['segundos'] > minimo_segundos)
+        memoria = ''
+        pesado = False
+        if actual.get('pico_bytes') is not None and anterior.get('pico_bytes'):
+            razon_memoria = actual['pico_bytes'] / anterior['pico_bytes']
+            pesado = razon_memoria > 1 + umbral
+            memoria = f"  memoria x{razon_memoria:5.2f}"
+        marca = '  ⚠️ REGRESIÓN' if lento or pesado else ''
+        print(f"{clave:<50} {anterior['segundos']:9.3f}s -> {actual['segundos']:9.3f}s  x{razon:5.2f}{memoria}{marca}")
+        if lento or pesado:
+            regresiones.append(clave)
+    return regresiones
+
+
+def _tamano(texto):
+    return int(float(texto))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de utils.py")
+    parser.add_argument("--filas", type=int, default=200_000, help="Número de filas sintéticas")
+    parser.add_argument("--solo", nargs="*", choices=sorted(BENCHMARKS), help="Benchmarks a ejecutar")
+    parser.add_argument("--suite", action="store_true", help="Ejecutar la suite de regresión")
+    parser.add_argument("--tamanos", nargs="*", type=_tamano, default=list(TAMANOS[:3]),
+                        help="Filas de cada ronda de la suite (p. ej. 1e4 1e5 1e6 1e7)")
+    parser.add_argument("--casos", nargs="*", choices=sorted(CASOS), help="Casos de la suite a ejecutar")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Se toma el mejor tiempo de N ejecuciones")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los datos sintéticos")
+    parser.add_argument("--guardar-base", metavar="JSON", help="Guardar los resultados como línea base")
+    parser.add_argument("--comparar", metavar="JSON", help="Comparar con una línea base guardada")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Empeoramiento tolerado (0.2 = 20%%)")
+    parser.add_argument("--minimo-segundos", type=float, default=0.01,
+                        help="Diferencia mínima de tiempo para considerar una regresión")
+    args = parser.parse_args()
+
+    if not args.suite:
+        for nombre in args.solo or BENCHMARKS:
+            imprimir(nombre, args.filas, *BENCHMARKS[nombre](args.filas))
+        return
+
+    faltantes = funciones_sin_caso()
+    if faltantes:
+        print(f"⚠️ Funciones públicas sin caso en la suite: {faltantes}")
+    resultados = ejecutar_suite(args.tamanos, args.casos, args.repeticiones, not args.sin_memoria, args.semilla)
+    if args.guardar_base:
+        guardar_base(resultados, args.guardar_base)
+        print(f"Línea base guardada en {args.guardar_base}")
+    if args.comparar:
+        regresiones = comparar_con_base(resultados, args.comparar, args.umbral, args.minimo_segundos)
+        if regresiones:
+            print(f"⚠️ {len(regresiones)} mediciones empeoraron más de {args.umbral:.0%}.")
+            sys.exit(1)
+        print("Sin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+cache_columnar.py
+-----------------
+Caché en disco de DataFrames ya leídos (CSV o Excel) en formato columnar
+(Parquet o Feather), para no volver a interpretar el mismo archivo cada vez.
+
+La clave de cada entrada combina la ruta absoluta, el tamaño y la fecha de
+modificación del archivo de origen junto con las opciones de lectura, de modo
+que si el archivo cambia la entrada anterior deja de usarse sola.
+
+Los aciertos solo actualizan la fecha de último acceso en memoria; el índice se
+escribe en disco al guardar o eliminar entradas y con `sincronizar()`
+(cargar_archivo y cargar_hojas_excel lo llaman una vez al terminar).
+
+Uso:
+    from cache_columnar import CacheColumnar
+    from utils import cargar_archivo, cargar_hojas_excel
+
+    cache = CacheColumnar('.cache_datos', max_bytes=2 * 1024**3)
+    df = cargar_archivo('costos.csv', cache=cache)
+    hojas = cargar_hojas_excel('plan.xlsx', ['Proyectos', 'Recursos'], cache=cache)
+    print(cache.estadisticas())
+
+Requiere pyarrow.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+__all__ = ['CacheColumnar']
+
+FORMATOS = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+class CacheColumnar:
+    """
+    Caché LRU en disco, limitada por tamaño, de DataFrames leídos desde archivos.
+
+    Parámetros:
+    - carpeta (str): Carpeta donde se guardan los archivos de la caché y su índice.
+    - max_bytes (int): Tamaño máximo total; al superarlo se eliminan las entradas
+                       usadas hace más tiempo.
+    - formato (str): 'parquet' (por defecto) o 'feather'.
+    """
+
+    def __init__(self, carpeta: str = '.cache_datos', max_bytes: int = 2 * 1024**3, formato: str = 'parquet'):
+        if formato not in FORMATOS:
+            raise ValueError(f"⚠️ Formato de caché desconocido: '{formato}'. Use 'parquet' o 'feather'.")
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("⚠️ CacheColumnar requiere instalar pyarrow.") from e
+
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.formato = formato
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.desalojos = 0
+        self._accesos_sin_guardar = False
+
+        os.makedirs(carpeta, exist_ok=True)
+        self._ruta_indice = os.path.join(carpeta, 'indice.json')
+        self._indice = self._leer_indice()
+
+    # --------- Índice ---------
+
+    def _leer_indice(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self._ruta_indice):
+            return {}
+        try:
+            with open(self._ruta_indice, encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Descartar entradas cuyo archivo ya no existe
+        return {clave: entrada for clave, entrada in indice.items()
+                if os.path.exists(os.path.join(self.carpeta, entrada['archivo']))}
+
+    def _guardar_indice(self) -> None:
+        self._accesos_sin_guardar = False
+        temporal = self._ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f)
+        os.replace(temporal, self._ruta_indice)
+
+    def _clave(self, ruta: str, opciones: Optional[Dict[str, Any]]) -> str:
+        ruta = os.path.abspath(ruta)
+        info = os.stat(ruta)
+        firma = json.dumps([ruta, info.st_size, info.st_mtime_ns, opciones or {}], sort_keys=True, default=str)
+        return hashlib.sha1(firma.encode('utf-8')).hexdigest()
+
+    # --------- Lectura / escritura ---------
+
+    def buscar(self, ruta: str, opciones: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """
+        Retorna el DataFrame guardado para (ruta, opciones) o None si no está en la caché.
+        """
+        clave = self._clave(ruta, opciones)
+        entrada = self._indice.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+
+        archivo = os.path.join(self.carpeta, entrada['archivo'])
+        try:
+            df = pd.read_parquet(archivo) if self.formato == 'parquet' else pd.read_feather(archivo)
+        except (OSError, ValueError):
+            self._eliminar(clave)
+            self._guardar_indice()
+            self.fallos += 1
+            return None
+
+        # Solo en memoria: se escribe con la siguiente escritura del índice o con sincronizar()
+        entrada['ultimo_acceso'] = time.time()
+        self._accesos_sin_guardar = True
+        self.aciertos += 1
+        return df
+
+    def guardar(self, ruta: str, opciones: Optional[Dict[str, Any]], df: pd.DataFrame) -> bool:
+        """
+        Guarda el DataFrame leído de (ruta, opciones). Retorna False si no se pudo
+        convertir al formato columnar (p. ej. columnas con tipos mezclados).
+        """
+        clave = self._clave(ruta, opciones)
+        nombre = clave + FORMATOS[self.formato]
+        archivo = os.path.join(self.carpeta, nombre)
+        temporal = archivo + '.tmp'
+        try:
+            if self.formato == 'parquet':
+                df.to_parquet(temporal)
+            else:
+                df.to_feather(temporal)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar '{ruta}' en la caché: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        os.replace(temporal, archivo)
+
+        self._indice[clave] = {
+            'ruta': os.path.abspath(ruta),
+            'archivo': nombre,
+            'bytes': os.path.getsize(archivo),
+            'ultimo_acceso': time.time(),
+        }
+        self.escrituras += 1
+        self._desalojar()
+        self._guardar_indice()
+        return clave in self._indice
+
+    def obtener(self, ruta: str, opciones: Optional[Dict[str, Any]], cargar: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Retorna el DataFrame de la caché o, si no está, lo lee con `cargar()` y lo guarda.
+        """
+        df = self.buscar(ruta, opciones)
+        if df is None:
+            df = cargar()
+            if df is not None:
+                self.guardar(ruta, opciones, df)
+        return df
+
+    # --------- Mantenimiento ---------
+
+    def sincronizar(self) -> None:
+        """Escribe el índice si hay fechas de último acceso que aún no están en disco."""
+        if self._accesos_sin_guardar:
+            self._guardar_indice()
+
+    def _eliminar(self, clave: str) -> None:
+        entrada = self._indice.pop(clave, None)
+        if entrada is not None:
+            archivo = os.path.join(self.carpeta, entrada['archivo'])
+            if os.path.exists(archivo):
+                os.remove(archivo)
+
+    def _desalojar(self) -> None:
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo max_bytes."""
+        total = sum(entrada['bytes'] for entrada in self._indice.values())
+        for clave, entrada in sorted(self._indice.items(), key=lambda item: item[1]['ultimo_acceso']):
+            if total <= self.max_bytes:
+                break
+            total -= entrada['bytes']
+            self._eliminar(clave)
+            self.desalojos += 1
+
+    def invalidar(self, ruta: Optional[str] = None) -> int:
+        """
+        Elimina las entradas de un archivo de origen (o todas si ruta es None).
+        Retorna el número de entradas eliminadas.
+        """
+        ruta = os.path.abspath(ruta) if ruta is not None else None
+        claves = [clave for clave, entrada in self._indice.items() if ruta is None or entrada['ruta'] == ruta]
+        for clave in claves:
+            self._eliminar(clave)
+        self._guardar_indice()
+        return len(claves)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Retorna aciertos, fallos, escrituras, desalojos, entradas y bytes ocupados."""
+        consultas = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'escrituras': self.escrituras,
+            'desalojos': self.desalojos,
+            'entradas': len(self._indice),
+            'bytes': sum(entrada['bytes'] for entrada in self._indice.values()),
+        }
@@ -26,8 +26,13 @@ warnings.filterwarnings('ignore')
 from utils import limpiar_columna, convertir_a_numerico, reemplazar_nulos, agregar_costo_total, cargar_archivo, agrupar_y_agregar
 from utils import extraer_columnas,separar_nombres_apellidos, cargar_hojas_excel, dividir_registros, agregar_columnas_porcentaje
 from utils import separar_recursos_externos, agregar_columnas_porcentaje_v1, filtrar_dataframe, dividir_registros_1
-from utils import dividir_registros_multiple, contar_elementos,guardar_columnas_csv
-from utils import limpiar_columnas,formatear_fechas
-from utils import calcular_rangos_fechas
-
-
+from utils import extraer_porcentajes
+from utils import limpiar_indices_filtro, leer_csv_por_bloques, compactar_memoria, resumir_costos
+from utils import dividir_registros_multiple, estimar_filas_dividir, contar_elementos,guardar_columnas_csv, guardar_varios_csv
+from utils import limpiar_columnas,formatear_fechas, aplicar_por_unicos
+from utils import calcular_rangos_fechas, calcular_detalle_laborable, agrupar_y_agregar_por_bloques
+from pipeline_utils import PipelineLimpieza
+from agregados_parciales import AcumuladorParciales
+from agregados_incrementales import AlmacenAgregados
+from asignacion_costos import MatrizAsignacion
+from indice_bipartito import EtiquetasTexto, IndiceBipartito
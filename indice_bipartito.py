@@ -0,0 +1,296 @@
+"""
+indice_bipartito.py
+-------------------
+Índice compacto de una relación muchos a muchos (códigos x aplicaciones) como la
+que produce `utils.dividir_registros`.
+
+En lugar de filtrar una y otra vez el DataFrame largo para saber "qué códigos
+impactan la aplicación X" (y al revés), el índice guarda la relación en los dos
+sentidos en formato CSR: para el código i, sus aplicaciones son
+`indices_aplicaciones[indptr_codigos[i]:indptr_codigos[i + 1]]` (y lo mismo al
+revés). Las etiquetas se guardan ordenadas, se buscan con searchsorted y cada
+consulta cuesta O(log n + grado) sin recorrer las demás filas. Las listas de
+cada fila están ordenadas, así que la unión y la intersección entre varias
+etiquetas son operaciones sobre arreglos de enteros ordenados.
+
+Las etiquetas se guardan como en Arrow: los bytes UTF-8 de todas seguidos y un
+arreglo de desplazamientos (la etiqueta i es `datos[desplazamientos[i]:desplazamientos[i + 1]]`).
+Un arreglo de texto de ancho fijo de numpy ocuparía 4 bytes por carácter de la
+etiqueta más larga en cada etiqueta.
+
+El índice se guarda como archivos .npy sin pickle, que se abren con mmap: varios procesos comparten la misma
+copia en la caché del sistema operativo sin cargarla en su memoria.
+
+Uso:
+    from indice_bipartito import IndiceBipartito
+    from utils import dividir_registros
+
+    largo = dividir_registros(df, 'Codigo', 'AplicacionesImpactadas ')
+    indice = IndiceBipartito.desde_registros(largo, 'Codigo', 'AplicacionesImpactadas ')
+    indice.codigos_de('APP-001')
+    indice.aplicaciones_de(['C-1', 'C-2'], modo='interseccion')
+    indice.guardar('.indice_aplicaciones')
+
+    indice = IndiceBipartito.cargar('.indice_aplicaciones')   # mmap, solo lectura
+"""
+from __future__ import annotations
+import bisect
+import json
+import os
+from typing import Dict, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+__all__ = ['IndiceBipartito', 'EtiquetasTexto']
+
+_ETIQUETAS = ('codigos', 'aplicaciones')
+_ARREGLOS = ('indptr_codigos', 'indices_aplicaciones', 'indptr_aplicaciones', 'indices_codigos')
+
+
+class EtiquetasTexto:
+    """
+    Etiquetas de texto ordenadas como bytes UTF-8 seguidos más desplazamientos.
+
+    Parámetros:
+    - desplazamientos (np.ndarray): int64 de largo n + 1; la etiqueta i ocupa
+      datos[desplazamientos[i]:desplazamientos[i + 1]].
+    - datos (np.ndarray): uint8 con los bytes UTF-8 de todas las etiquetas.
+
+    El orden de los bytes UTF-8 es el mismo que el de los puntos de código, así que
+    las etiquetas ordenadas como str también lo están como bytes y se buscan por
+    bisección sin decodificarlas. Solo se decodifican las que se devuelven.
+    """
+
+    def __init__(self, desplazamientos: np.ndarray, datos: np.ndarray):
+        self.desplazamientos = desplazamientos
+        self.datos = datos
+
+    @classmethod
+    def desde_textos(cls, textos: Iterable[str]) -> 'EtiquetasTexto':
+        """Construye las etiquetas desde textos ya ordenados y sin repetir."""
+        codificados = [texto.encode('utf-8') for texto in textos]
+        desplazamientos = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=desplazamientos[1:])
+        return cls(desplazamientos, np.frombuffer(b''.join(codificados), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.desplazamientos) - 1
+
+    def _bytes(self, posicion: int) -> bytes:
+        return self.datos[self.desplazamientos[posicion]:self.desplazamientos[posicion + 1]].tobytes()
+
+    def __getitem__(self, posiciones):
+        """Una posición retorna str; un arreglo de posiciones, un np.ndarray de objetos str."""
+        if np.ndim(posiciones) == 0:
+            return self._bytes(int(posiciones)).decode('utf-8')
+        posiciones = np.asarray(posiciones)
+        if not posiciones.size:
+            return np.array([], dtype=object)
+        # Cada etiqueta distinta se decodifica una sola vez aunque se repita
+        unicas, inversas = np.unique(posiciones, return_inverse=True)
+        textos = np.array([self._bytes(p).decode('utf-8') for p in unicas.tolist()], dtype=object)
+        return textos[inversas.reshape(posiciones.shape)]
+
+    def tolist(self) -> list:
+        return self[np.arange(len(self))].tolist()
+
+    def buscar(self, buscadas: Iterable[str]) -> np.ndarray:
+        """Posición de cada texto buscado, o -1 si no está."""
+        posiciones = []
+        for texto in buscadas:
+            clave = texto.encode('utf-8')
+            p = bisect.bisect_left(range(len(self)), clave, key=self._bytes)
+            posiciones.append(p if p < len(self) and self._bytes(p) == clave else -1)
+        return np.array(posiciones, dtype=np.int64)
+
+
+class IndiceBipartito:
+    """
+    Relación códigos x aplicaciones en CSR en ambos sentidos.
+
+    Parámetros:
+    - codigos (EtiquetasTexto): Etiquetas de los códigos, ordenadas y sin repetir.
+    - aplicaciones (EtiquetasTexto): Etiquetas de las aplicaciones, ordenadas y sin repetir.
+    - indptr_codigos, indices_aplicaciones (np.ndarray): Aplicaciones de cada código.
+    - indptr_aplicaciones, indices_codigos (np.ndarray): Códigos de cada aplicación.
+    - columnas (tuple): Nombres de las columnas de código y aplicación (para a_dataframe).
+
+    Normalmente se construye con `desde_registros` o se abre con `cargar`.
+    """
+
+    def __init__(self, codigos: EtiquetasTexto, aplicaciones: EtiquetasTexto,
+                 indptr_codigos: np.ndarray, indices_aplicaciones: np.ndarray,
+                 indptr_aplicaciones: np.ndarray, indices_codigos: np.ndarray,
+                 columnas: tuple = ('Codigo', 'AplicacionesImpactadas ')):
+        self.codigos = codigos
+        self.aplicaciones = aplicaciones
+        self.indptr_codigos = indptr_codigos
+        self.indices_aplicaciones = indices_aplicaciones
+        self.indptr_aplicaciones = indptr_aplicaciones
+        self.indices_codigos = indices_codigos
+        self.columnas = tuple(columnas)
+
+    @classmethod
+    def desde_registros(cls, df: pd.DataFrame, columna_codigo: str = 'Codigo',
+                        columna_valor: str = 'AplicacionesImpactadas ') -> 'IndiceBipartito':
+        """
+        Construye el índice desde un DataFrame largo (una fila por par código-aplicación,
+        como el de dividir_registros). Los pares repetidos y los nulos se descartan; las
+        etiquetas se guardan como texto.
+        """
+        for col in (columna_codigo, columna_valor):
+            if col not in df.columns:
+                raise ValueError(f"⚠️ La columna '{col}' no existe en el DataFrame.")
+        pares = df[[columna_codigo, columna_valor]].dropna()
+
+        # factorize por hash y luego ordena solo las etiquetas distintas (np.unique ordenaría todas las filas)
+        fila, codigos = pd.factorize(pares[columna_codigo].astype(str), sort=True)
+        columna, aplicaciones = pd.factorize(pares[columna_valor].astype(str), sort=True)
+        codigos, aplicaciones = EtiquetasTexto.desde_textos(codigos), EtiquetasTexto.desde_textos(aplicaciones)
+        tipo = np.int32 if max(len(codigos), len(aplicaciones)) < 2**31 else np.int64
+
+        # Pares únicos ordenados por código y luego por aplicación
+        claves = np.unique(fila.astype('int64') * max(len(aplicaciones), 1) + columna)
+        fila = claves // max(len(aplicaciones), 1)
+        columna = claves % max(len(aplicaciones), 1)
+        # El orden estable por aplicación conserva los códigos ordenados dentro de cada una
+        orden = np.argsort(columna, kind='stable')
+
+        return cls(codigos, aplicaciones,
+                   _indptr(fila, len(codigos)), columna.astype(tipo),
+                   _indptr(columna[orden], len(aplicaciones)), fila[orden].astype(tipo),
+                   (columna_codigo, columna_valor))
+
+    # --------- Consultas ---------
+
+    @property
+    def forma(self) -> tuple:
+        """(códigos, aplicaciones, pares)."""
+        return len(self.codigos), len(self.aplicaciones), len(self.indices_aplicaciones)
+
+    @staticmethod
+    def _posiciones(etiquetas: EtiquetasTexto, buscadas) -> tuple:
+        """(posiciones de las etiquetas buscadas que existen, True si existen todas)."""
+        buscadas = [buscadas] if isinstance(buscadas, str) else [str(b) for b in buscadas]
+        posiciones = etiquetas.buscar(buscadas)
+        existe = posiciones >= 0
+        return posiciones[existe], bool(existe.all())
+
+    @staticmethod
+    def _vecinos(indptr: np.ndarray, indices: np.ndarray, posiciones: np.ndarray, completas: bool,
+                 modo: str) -> np.ndarray:
+        if modo not in ('union', 'interseccion'):
+            raise ValueError(f"⚠️ Modo desconocido: '{modo}'. Use 'union' o 'interseccion'.")
+        filas = [indices[indptr[p]:indptr[p + 1]] for p in posiciones]
+        if not filas or (modo == 'interseccion' and not completas):
+            return np.array([], dtype=indices.dtype)
+        if len(filas) == 1:
+            return np.asarray(filas[0])
+        if modo == 'union':
+            return np.unique(np.concatenate(filas))
+        # Intersección empezando por la fila más corta
+        filas.sort(key=len)
+        resultado = np.asarray(filas[0])
+        for fila in filas[1:]:
+            resultado = np.intersect1d(resultado, fila, assume_unique=True)
+            if not len(resultado):
+                break
+        return resultado
+
+    def aplicaciones_de(self, codigos: Union[str, Iterable[str]], modo: str = 'union') -> np.ndarray:
+        """
+        Aplicaciones impactadas por uno o varios códigos.
+
+        Parámetros:
+        - codigos (str | list): Código o lista de códigos (los inexistentes no tienen aplicaciones).
+        - modo (str): 'union' (impactadas por alguno) o 'interseccion' (por todos).
+
+        Retorna:
+        - np.ndarray con las etiquetas de las aplicaciones, ordenadas.
+        """
+        posiciones, completas = self._posiciones(self.codigos, codigos)
+        return self.aplicaciones[np.asarray(self._vecinos(self.indptr_codigos, self.indices_aplicaciones,
+                                                                     posiciones, completas, modo))]
+
+    def codigos_de(self, aplicaciones: Union[str, Iterable[str]], modo: str = 'union') -> np.ndarray:
+        """Códigos que impactan una o varias aplicaciones (ver aplicaciones_de)."""
+        posiciones, completas = self._posiciones(self.aplicaciones, aplicaciones)
+        return self.codigos[np.asarray(self._vecinos(self.indptr_aplicaciones, self.indices_codigos,
+                                                                posiciones, completas, modo))]
+
+    def grados(self, lado: str = 'codigos') -> pd.Series:
+        """Número de vecinos de cada código ('codigos') o de cada aplicación ('aplicaciones')."""
+        if lado not in ('codigos', 'aplicaciones'):
+            raise ValueError(f"⚠️ Lado desconocido: '{lado}'. Use 'codigos' o 'aplicaciones'.")
+        etiquetas, indptr = ((self.codigos, self.indptr_codigos) if lado == 'codigos'
+                             else (self.aplicaciones, self.indptr_aplicaciones))
+        return pd.Series(np.diff(indptr), index=etiquetas.tolist(), name='grado')
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Reconstruye el DataFrame largo (un par por fila, ordenado por código y aplicación)."""
+        filas = np.repeat(np.arange(len(self.codigos)), np.diff(self.indptr_codigos))
+        codigos = np.array(self.codigos.tolist(), dtype=object)
+        aplicaciones = np.array(self.aplicaciones.tolist(), dtype=object)
+        return pd.DataFrame({self.columnas[0]: codigos[filas],
+                             self.columnas[1]: aplicaciones[self.indices_aplicaciones]})
+
+    # --------- Persistencia ---------
+
+    def guardar(self, carpeta: str) -> str:
+        """
+        Guarda el índice en carpeta como un .npy por arreglo (dos por lado de etiquetas:
+        <lado>_desplazamientos y <lado>_datos) y un meta.json. Cada archivo
+        se escribe en un temporal y se reemplaza, y meta.json se escribe al final.
+
+        Retorna:
+        - str: La carpeta.
+        """
+        os.makedirs(carpeta, exist_ok=True)
+        arreglos = {nombre: getattr(self, nombre) for nombre in _ARREGLOS}
+        for lado in _ETIQUETAS:
+            etiquetas = getattr(self, lado)
+            arreglos[lado + '_desplazamientos'] = etiquetas.desplazamientos
+            arreglos[lado + '_datos'] = etiquetas.datos
+        for nombre, arreglo in arreglos.items():
+            ruta = os.path.join(carpeta, nombre + '.npy')
+            temporal = ruta + '.tmp'
+            with open(temporal, 'wb') as f:
+                np.save(f, np.ascontiguousarray(arreglo), allow_pickle=False)
+            os.replace(temporal, ruta)
+
+        meta: Dict[str, object] = {'columnas': list(self.columnas), 'forma': list(self.forma)}
+        temporal = os.path.join(carpeta, 'meta.json.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporal, os.path.join(carpeta, 'meta.json'))
+        return carpeta
+
+    @classmethod
+    def cargar(cls, carpeta: str, mmap: bool = True) -> 'IndiceBipartito':
+        """
+        Abre un índice guardado. Con mmap=True los arreglos se mapean en memoria en modo
+        solo lectura (se leen del disco a medida que se consultan).
+        """
+        ruta_meta = os.path.join(carpeta, 'meta.json')
+        if not os.path.exists(ruta_meta):
+            raise ValueError(f"⚠️ La carpeta '{carpeta}' no contiene un índice guardado.")
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+
+        modo = 'r' if mmap else None
+
+        def abrir(nombre):
+            return np.load(os.path.join(carpeta, nombre + '.npy'), mmap_mode=modo, allow_pickle=False)
+
+        etiquetas = [EtiquetasTexto(abrir(lado + '_desplazamientos'), abrir(lado + '_datos'))
+                     for lado in _ETIQUETAS]
+        indice = cls(*etiquetas, *(abrir(nombre) for nombre in _ARREGLOS), columnas=tuple(meta['columnas']))
+        if list(indice.forma) != meta['forma']:
+            raise ValueError(f"⚠️ El índice de '{carpeta}' está incompleto: {indice.forma} != {meta['forma']}.")
+        return indice
+
+
+def _indptr(filas: np.ndarray, n: int) -> np.ndarray:
+    """indptr de CSR para filas ordenadas con valores en [0, n)."""
+    return np.concatenate(([0], np.cumsum(np.bincount(filas, minlength=n)))).astype(np.int64)
@@ -0,0 +1,347 @@
+"""
+instrumentacion.py
+------------------
+Instrumentación opcional de las funciones públicas de `utils.py`, para saber
+qué llamadas dominan un proceso largo.
+
+`activar()` reemplaza cada función pública de `utils` por una envoltura que
+registra, por llamada:
+
+  - tiempo real y tiempo de CPU,
+  - pico de memoria de Python (tracemalloc) durante la llamada,
+  - filas y columnas del DataFrame de entrada y del resultado,
+  - bytes de ambos (memory_usage sin deep, para no recorrer los textos).
+
+`desactivar()` vuelve a poner las funciones originales, así que desactivada no
+cuesta nada: no queda ninguna envoltura ni comprobación en el camino.
+
+Las funciones importadas con `from utils import ...` son otros nombres que
+apuntan a la función original; para instrumentarlas también, pase el espacio de
+nombres donde se importaron (p. ej. `globals()` en un notebook).
+
+Uso:
+    import instrumentacion
+
+    instrumentacion.activar(espacios=[globals()], log='costos.instrumentacion')
+    ...  # proceso nocturno
+    instrumentacion.resumen()
+    instrumentacion.desactivar()
+
+Las llamadas anidadas (p. ej. cargar_archivo -> leer_csv_por_bloques) se
+registran por separado con su profundidad; el pico de memoria de la llamada
+externa incluye el de las internas. Con hilos (guardar_varios_csv) el pico es
+el del proceso completo durante la llamada.
+
+Las funciones que retornan un generador (leer_csv_por_bloques, cargar_archivo
+con tamano_bloque) se registran cuando termina la iteración (o cuando se cierra
+el generador), con el tiempo de la llamada más el de cada paso, el pico del paso
+más costoso y las filas de todos los bloques. El tiempo que quien itera dedica a
+cada bloque no se cuenta. Un generador que nunca se itera no queda registrado.
+"""
+from __future__ import annotations
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+import utils
+
+__all__ = ['activar', 'desactivar', 'activa', 'registros', 'resumen', 'Recolector']
+
+
+class Recolector:
+    """Guarda en memoria los registros de cada llamada instrumentada."""
+
+    def __init__(self):
+        self.registros: List[Dict[str, Any]] = []
+        self._candado = threading.Lock()
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        with self._candado:
+            self.registros.append(registro)
+
+    def limpiar(self) -> None:
+        with self._candado:
+            self.registros.clear()
+
+    def como_dataframe(self) -> pd.DataFrame:
+        with self._candado:
+            return pd.DataFrame(self.registros)
+
+
+# Estado de la instrumentación activa
+_reemplazos: List[tuple] = []        # (espacio, nombre, original)
+_recolector = Recolector()
+_logger: Optional[logging.Logger] = None
+_medir_memoria = False
+_inicio_tracemalloc = False
+_pila = threading.local()
+
+
+def _forma(objeto) -> Optional[tuple]:
+    """(filas, columnas, bytes) de un DataFrame, Serie o dict/tupla de DataFrames."""
+    if isinstance(objeto, pd.DataFrame):
+        return len(objeto), objeto.shape[1], int(objeto.memory_usage(index=True, deep=False).sum())
+    if isinstance(objeto, pd.Series):
+        return len(objeto), 1, int(objeto.memory_usage(index=True, deep=False))
+    if isinstance(objeto, dict):
+        formas = [f for f in map(_forma, objeto.values()) if f is not None]
+        if formas:
+            return sum(f[0] for f in formas), sum(f[1] for f in formas), sum(f[2] for f in formas)
+    if isinstance(objeto, tuple) and objeto:
+        return _forma(objeto[0])
+    return None
+
+
+def _forma_entrada(args, kwargs) -> Optional[tuple]:
+    for valor in list(args) + list(kwargs.values()):
+        forma = _forma(valor) if isinstance(valor, (pd.DataFrame, pd.Series)) else None
+        if forma is not None:
+            return forma
+    return None
+
+
+def _marcos() -> List[dict]:
+    """Pila de llamadas instrumentadas en curso del hilo actual."""
+    pila = getattr(_pila, 'marcos', None)
+    if pila is None:
+        pila = _pila.marcos = []
+    return pila
+
+
+class _Medicion:
+    """
+    Tiempo y pico de memoria de una llamada, acumulados en uno o varios tramos
+    (la llamada y, si retorna un generador, cada paso de su iteración).
+    """
+
+    def __init__(self):
+        self.segundos = 0.0
+        self.segundos_cpu = 0.0
+        self.pico = None
+        self.profundidad = len(_marcos())
+
+    def iniciar(self) -> None:
+        # La pila es por hilo y un generador puede avanzar desde otra llamada instrumentada
+        self.pila = _marcos()
+        self.marco = {'pico': 0, 'base': 0}
+        if _medir_memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            if self.pila:
+                # Conservar el pico de la llamada externa antes de reiniciarlo
+                self.pila[-1]['pico'] = max(self.pila[-1]['pico'], pico)
+            tracemalloc.reset_peak()
+            self.marco = {'pico': actual, 'base': actual}
+        self.pila.append(self.marco)
+        self.inicio, self.inicio_cpu = time.perf_counter(), time.process_time()
+
+    def terminar(self) -> None:
+        self.segundos += time.perf_counter() - self.inicio
+        self.segundos_cpu += time.process_time() - self.inicio_cpu
+        self.pila.pop()
+        if _medir_memoria and tracemalloc.is_tracing():
+            absoluto = max(self.marco['pico'], tracemalloc.get_traced_memory()[1])
+            self.pico = max(self.pico or 0, absoluto - self.marco['base'])
+            if self.pila:
+                self.pila[-1]['pico'] = max(self.pila[-1]['pico'], absoluto)
+            tracemalloc.reset_peak()
+
+    def registrar(self, nombre: str, entrada: Optional[tuple], salida: Optional[tuple],
+                  error: Optional[str]) -> None:
+        _registrar({
+            'funcion': nombre,
+            'profundidad': self.profundidad,
+            'segundos': self.segundos,
+            'segundos_cpu': self.segundos_cpu,
+            'pico_bytes': self.pico,
+            'filas_entrada': entrada[0] if entrada else None,
+            'columnas_entrada': entrada[1] if entrada else None,
+            'bytes_entrada': entrada[2] if entrada else None,
+            'filas_salida': salida[0] if salida else None,
+            'columnas_salida': salida[1] if salida else None,
+            'bytes_salida': salida[2] if salida else None,
+            'error': error,
+        })
+
+
+def _iterar_medido(nombre: str, generador, medicion: _Medicion, entrada: Optional[tuple]):
+    """
+    Itera el generador que retornó una función instrumentada y registra la llamada
+    al terminar (o al cerrarse antes): suma el tiempo de cada paso (no el de quien
+    consume los bloques), el pico de memoria del paso más costoso y las filas de
+    todos los bloques.
+    """
+    filas = columnas = bytes_salida = 0
+    error = None
+    try:
+        while True:
+            medicion.iniciar()
+            try:
+                bloque = next(generador)
+            except StopIteration:
+                break
+            except BaseException as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                medicion.terminar()
+            forma = _forma(bloque)
+            if forma is not None:
+                filas, columnas, bytes_salida = filas + forma[0], forma[1], bytes_salida + forma[2]
+            yield bloque
+    finally:
+        generador.close()
+        salida = (filas, columnas, bytes_salida) if columnas else None
+        medicion.registrar(nombre, entrada, salida, error)
+
+
+def _envolver(nombre: str, funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        medicion = _Medicion()
+        entrada = _forma_entrada(args, kwargs)
+        medicion.iniciar()
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException as e:
+            medicion.terminar()
+            medicion.registrar(nombre, entrada, None, f"{type(e).__name__}: {e}")
+            raise
+        medicion.terminar()
+        if inspect.isgenerator(resultado):
+            # Los generadores (leer_csv_por_bloques, cargar_archivo con tamano_bloque) hacen
+            # el trabajo al iterarse: se registran cuando termina la iteración
+            return _iterar_medido(nombre, resultado, medicion, entrada)
+        medicion.registrar(nombre, entrada, _forma(resultado), None)
+        return resultado
+
+    return envoltura
+
+
+def _registrar(registro: Dict[str, Any]) -> None:
+    _recolector.agregar(registro)
+    if _logger is not None:
+        _logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+def _funciones_publicas() -> Dict[str, Any]:
+    return {nombre: objeto for nombre, objeto in vars(utils).items()
+            if callable(objeto) and not nombre.startswith('_') and getattr(objeto, '__module__', None) == 'utils'}
+
+
+def _reemplazar(espacio, nombre: str, nuevo) -> None:
+    if isinstance(espacio, dict):
+        espacio[nombre] = nuevo
+    else:
+        setattr(espacio, nombre, nuevo)
+
+
+def activa() -> bool:
+    """True si la instrumentación está activada."""
+    return bool(_reemplazos)
+
+
+def activar(espacios: Iterable[Union[dict, ModuleType]] = (), memoria: bool = True,
+            log: Union[None, str, logging.Logger] = None, limpiar: bool = True) -> Recolector:
+    """
+    Instrumenta las funciones públicas de `utils` (y sus copias en `espacios`).
+
+    Parámetros:
+    - espacios (list): Módulos o diccionarios (p. ej. globals()) donde se importaron
+                       funciones de utils con `from utils import ...`.
+    - memoria (bool): Si es True, mide el pico de memoria con tracemalloc (lo inicia si
+                      no estaba activo; hace más lentas todas las asignaciones).
+    - log (str | logging.Logger): Logger (o su nombre) que recibe un registro JSON por
+                                  llamada con nivel INFO. Si es None, solo se guardan en memoria.
+    - limpiar (bool): Si es True, descarta los registros de una activación anterior.
+
+    Retorna:
+    - Recolector con los registros de cada llamada.
+    """
+    global _logger, _medir_memoria, _inicio_tracemalloc
+    if activa():
+        desactivar()
+    if limpiar:
+        _recolector.limpiar()
+
+    originales = _funciones_publicas()
+    envolturas = {nombre: _envolver(nombre, funcion) for nombre, funcion in originales.items()}
+    for nombre, envoltura in envolturas.items():
+        _reemplazos.append((utils, nombre, originales[nombre]))
+        setattr(utils, nombre, envoltura)
+
+    por_identidad = {id(funcion): nombre for nombre, funcion in originales.items()}
+    for espacio in espacios:
+        contenido = espacio if isinstance(espacio, dict) else vars(espacio)
+        for alias, objeto in list(contenido.items()):
+            nombre = por_identidad.get(id(objeto))
+            if nombre is not None:
+                _reemplazos.append((espacio, alias, objeto))
+                _reemplazar(espacio, alias, envolturas[nombre])
+
+    _logger = logging.getLogger(log) if isinstance(log, str) else log
+    _medir_memoria = memoria
+    _inicio_tracemalloc = memoria and not tracemalloc.is_tracing()
+    if _inicio_tracemalloc:
+        tracemalloc.start()
+    return _recolector
+
+
+def desactivar() -> None:
+    """Restaura las funciones originales (y detiene tracemalloc si lo inició activar)."""
+    global _logger, _medir_memoria, _inicio_tracemalloc
+    while _reemplazos:
+        espacio, nombre, original = _reemplazos.pop()
+        _reemplazar(espacio, nombre, original)
+    if _inicio_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _logger, _medir_memoria, _inicio_tracemalloc = None, False, False
+
+
+def registros() -> pd.DataFrame:
+    """Retorna un DataFrame con un registro por llamada instrumentada."""
+    return _recolector.como_dataframe()
+
+
+def resumen(imprimir: bool = True) -> pd.DataFrame:
+    """
+    Resume los registros por función, ordenados por tiempo total.
+
+    El porcentaje se calcula sobre el tiempo de las llamadas de primer nivel, ya que
+    el de las anidadas está incluido en el de la llamada que las contiene.
+
+    Retorna:
+    - pd.DataFrame con llamadas, tiempos, porcentaje, pico de memoria y filas por función.
+    """
+    df = registros()
+    if df.empty:
+        tabla = pd.DataFrame(columns=['llamadas', 'segundos', 'segundos_cpu', 'porcentaje',
+                                      'pico_mb', 'filas_entrada', 'filas_salida', 'errores'])
+    else:
+        total = df.loc[df['profundidad'] == 0, 'segundos'].sum()
+        tabla = df.groupby('funcion').agg(
+            llamadas=('segundos', 'size'),
+            segundos=('segundos', 'sum'),
+            segundos_cpu=('segundos_cpu', 'sum'),
+            pico_mb=('pico_bytes', 'max'),
+            filas_entrada=('filas_entrada', 'sum'),
+            filas_salida=('filas_salida', 'sum'),
+            errores=('error', 'count'),
+        )
+        primer_nivel = df[df['profundidad'] == 0].groupby('funcion')['segundos'].sum()
+        tabla.insert(3, 'porcentaje', (primer_nivel.reindex(tabla.index, fill_value=0) / total * 100)
+                     if total else 0.0)
+        tabla['pico_mb'] = tabla['pico_mb'] / 1024**2
+        tabla[['filas_entrada', 'filas_salida']] = tabla[['filas_entrada', 'filas_salida']].astype('int64')
+        tabla = tabla.sort_values('segundos', ascending=False)
+
+    if imprimir:
+        print(tabla.to_string(float_format=lambda x: f"{x:,.3f}"))
+    return tabla
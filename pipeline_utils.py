@@ -0,0 +1,269 @@
+"""
+pipeline_utils.py
+-----------------
+Pipeline perezoso sobre las funciones de limpieza de `utils.py`.
+
+En lugar de encadenar llamadas que copian el DataFrame y convierten las mismas
+columnas a texto una y otra vez, el pipeline registra los pasos, los planifica
+y los ejecuta de una sola vez:
+
+  - Cada paso se descompone en operaciones por columna.
+  - Las operaciones consecutivas sobre la misma columna se fusionan en un grupo
+    que trabaja sobre una sola Serie y se escribe una vez en el DataFrame
+    (se pueden adelantar sobre operaciones de otras columnas que no la tocan).
+  - Dentro de un grupo se omiten las conversiones a texto redundantes.
+  - El DataFrame se copia una sola vez (o ninguna con inplace=True).
+
+Cada operación llama a la función pública de `utils.py` sobre un DataFrame de una
+sola columna (sin copiarla), así que el resultado es el mismo que encadenando las
+funciones y el pipeline no depende de los detalles internos de utils.
+
+Uso:
+    from pipeline_utils import PipelineLimpieza
+
+    pipeline = (PipelineLimpieza()
+                .limpiar_columnas(reglas)
+                .convertir_a_numerico('Costo')
+                .reemplazar_nulos('Costo', 0)
+                .formatear_fechas(['FechaInicio', 'FechaFin'], formato='d-m-a')
+                .contar_elementos({'RecursosInternos': 'numRecursos'}))
+    pipeline.explicar()
+    df_limpio = pipeline.ejecutar(df)
+    pipeline.explicar()   # ahora con el tiempo de cada operación y de cada grupo
+"""
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+import utils
+
+__all__ = ['PipelineLimpieza']
+
+
+def _aplicar(funcion: Callable, serie: pd.Series, *args, **kwargs) -> pd.Series:
+    """
+    Aplica una función de utils (DataFrame -> DataFrame) a una sola columna: la Serie
+    se pasa como DataFrame de una columna y se retorna la columna del mismo nombre.
+    """
+    return funcion(serie.to_frame(), *args, **kwargs)[serie.name]
+
+
+class _Operacion:
+    """Transformación de una sola columna: Serie de entrada -> Serie de salida."""
+
+    def __init__(self, paso: str, descripcion: str, origen: str, destino: str,
+                 funcion: Callable[[pd.Series], pd.Series], requiere_texto: bool = False,
+                 produce_texto: bool = False):
+        self.paso = paso
+        self.descripcion = descripcion
+        self.origen = origen
+        self.destino = destino
+        self.funcion = funcion
+        self.requiere_texto = requiere_texto
+        self.produce_texto = produce_texto
+        self.segundos: Optional[float] = None
+
+    @property
+    def columnas(self) -> set:
+        return {self.origen, self.destino}
+
+    @property
+    def en_sitio(self) -> bool:
+        """True si lee y escribe la misma columna (y por tanto se puede fusionar)."""
+        return self.origen == self.destino
+
+
+class _Grupo:
+    """Operaciones fusionadas que se ejecutan sobre una sola Serie."""
+
+    def __init__(self, operacion: _Operacion):
+        self.operaciones = [operacion]
+        self.segundos: Optional[float] = None
+
+    @property
+    def origen(self) -> str:
+        return self.operaciones[0].origen
+
+    @property
+    def destino(self) -> str:
+        return self.operaciones[0].destino
+
+    @property
+    def columnas(self) -> set:
+        return {self.origen, self.destino}
+
+    def admite(self, operacion: _Operacion) -> bool:
+        return operacion.en_sitio and operacion.destino == self.destino
+
+    def conversiones_texto(self) -> tuple:
+        """Retorna (conversiones necesarias, conversiones omitidas) dentro del grupo."""
+        necesarias = omitidas = 0
+        es_texto = False
+        for op in self.operaciones:
+            if op.requiere_texto:
+                if es_texto:
+                    omitidas += 1
+                else:
+                    necesarias += 1
+                    es_texto = True
+            es_texto = op.produce_texto
+        return necesarias, omitidas
+
+    def ejecutar(self, df: pd.DataFrame) -> None:
+        """
+        Ejecuta las operaciones sobre una sola Serie. Cada operación guarda su tiempo
+        (incluida la conversión a texto que necesite); el del grupo incluye además la
+        escritura en el DataFrame.
+        """
+        inicio = time.perf_counter()
+        serie = df[self.origen]
+        es_texto = False
+        for op in self.operaciones:
+            inicio_op = time.perf_counter()
+            if op.requiere_texto and not es_texto:
+                serie = serie.astype(str)
+                es_texto = True
+            serie = op.funcion(serie)
+            es_texto = op.produce_texto
+            op.segundos = time.perf_counter() - inicio_op
+        df[self.destino] = serie
+        self.segundos = time.perf_counter() - inicio
+
+
+class PipelineLimpieza:
+    """
+    Registra pasos de limpieza de `utils.py` y los ejecuta de forma fusionada.
+
+    Los métodos de registro tienen los mismos parámetros que las funciones de
+    `utils.py` (sin el DataFrame) y retornan el propio pipeline para encadenarlos.
+    """
+
+    def __init__(self):
+        self.pasos: List[str] = []
+        self._operaciones: List[_Operacion] = []
+        self._grupos: Optional[List[_Grupo]] = None
+        self.segundos_totales: Optional[float] = None
+
+    # --------- Registro de pasos ---------
+
+    def _agregar(self, paso: str, operaciones: List[_Operacion]) -> 'PipelineLimpieza':
+        self.pasos.append(paso)
+        self._operaciones.extend(operaciones)
+        self._grupos = None
+        self.segundos_totales = None
+        return self
+
+    def limpiar_columna(self, columna: str, reemplazo: str, default: str = "") -> 'PipelineLimpieza':
+        op = _Operacion('limpiar_columna', f"replace {reemplazo!r}->{default!r}", columna, columna,
+                        lambda s: s.str.replace(reemplazo, default, regex=False),
+                        requiere_texto=True, produce_texto=True)
+        return self._agregar(f"limpiar_columna({columna!r})", [op])
+
+    def limpiar_columnas(self, reglas: List[Dict[str, Any]]) -> 'PipelineLimpieza':
+        # Una operación por columna con todas sus reglas: utils.limpiar_columnas las combina
+        por_columna: Dict[str, list] = {}
+        for regla in reglas:
+            por_columna.setdefault(regla['columna'], []).append(regla)
+
+        operaciones = [_Operacion('limpiar_columnas',
+                                  f"{len(reglas_columna)} reglas: "
+                                  + " ; ".join(repr(regla['patron']) for regla in reglas_columna),
+                                  col, col,
+                                  lambda s, reglas_columna=reglas_columna: _aplicar(
+                                      utils.limpiar_columnas, s, reglas_columna),
+                                  requiere_texto=True, produce_texto=True)
+                       for col, reglas_columna in por_columna.items()]
+        return self._agregar(f"limpiar_columnas({len(reglas)} reglas)", operaciones)
+
+    def convertir_a_numerico(self, columna: str, decimales: int = 2) -> 'PipelineLimpieza':
+        op = _Operacion('convertir_a_numerico', f"numérico({decimales})", columna, columna,
+                        lambda s: _aplicar(utils.convertir_a_numerico, s, s.name, decimales))
+        return self._agregar(f"convertir_a_numerico({columna!r})", [op])
+
+    def reemplazar_nulos(self, columna: str, valor_por_defecto: Any) -> 'PipelineLimpieza':
+        op = _Operacion('reemplazar_nulos', f"fillna({valor_por_defecto!r})", columna, columna,
+                        lambda s: _aplicar(utils.reemplazar_nulos, s, s.name, valor_por_defecto))
+        return self._agregar(f"reemplazar_nulos({columna!r})", [op])
+
+    def formatear_fechas(self, columnas: List[str], formato: str = 'm-d-a', separador: str = '/',
+                         separador_salida: Optional[str] = None) -> 'PipelineLimpieza':
+        operaciones = [_Operacion('formatear_fechas', f"fecha {formato}", col, col,
+                                  lambda s: _aplicar(utils.formatear_fechas, s, [s.name], formato, separador,
+                                                     separador_salida, inplace=True),
+                                  produce_texto=True) for col in columnas]
+        return self._agregar(f"formatear_fechas({len(columnas)} columnas)", operaciones)
+
+    def contar_elementos(self, columnas_config: Dict[str, str], separador: str = ',') -> 'PipelineLimpieza':
+        operaciones = [_Operacion('contar_elementos', f"contar {separador!r}", origen, destino,
+                                  lambda s: _aplicar(utils.contar_elementos, s, {s.name: s.name}, separador,
+                                                     inplace=True))
+                       for origen, destino in columnas_config.items()]
+        return self._agregar(f"contar_elementos({len(columnas_config)} columnas)", operaciones)
+
+    # --------- Planificación ---------
+
+    def planificar(self) -> List[_Grupo]:
+        """
+        Agrupa las operaciones: cada operación se fusiona con el último grupo de su
+        columna si entre ambos no hay otra operación que lea o escriba esa columna.
+        """
+        grupos: List[_Grupo] = []
+        for op in self._operaciones:
+            destino = None
+            for grupo in reversed(grupos):
+                if grupo.admite(op):
+                    destino = grupo
+                    break
+                if grupo.columnas & op.columnas:
+                    break
+            if destino is None:
+                grupos.append(_Grupo(op))
+            else:
+                destino.operaciones.append(op)
+        self._grupos = grupos
+        return grupos
+
+    def explicar(self) -> str:
+        """Imprime y retorna el plan (con el tiempo de cada operación y grupo si ya se ejecutó)."""
+        grupos = self._grupos if self._grupos is not None else self.planificar()
+        omitidas = sum(grupo.conversiones_texto()[1] for grupo in grupos)
+        lineas = [f"Plan: {len(self.pasos)} pasos, {len(self._operaciones)} operaciones -> "
+                  f"{len(grupos)} grupos, {omitidas} conversiones a texto omitidas"]
+        for k, grupo in enumerate(grupos, start=1):
+            tiempo = f"  {grupo.segundos:.4f}s" if grupo.segundos is not None else ""
+            columna = grupo.destino if grupo.origen == grupo.destino else f"{grupo.origen} -> {grupo.destino}"
+            detalle = " | ".join(op.descripcion + (f" ({op.segundos:.4f}s)" if op.segundos is not None else "")
+                                 for op in grupo.operaciones)
+            lineas.append(f"  {k}. {columna}: {detalle}{tiempo}")
+        if self.segundos_totales is not None:
+            lineas.append(f"Total: {self.segundos_totales:.4f}s")
+        texto = "\n".join(lineas)
+        print(texto)
+        return texto
+
+    # --------- Ejecución ---------
+
+    def ejecutar(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        """
+        Ejecuta el plan sobre df. Las columnas inexistentes se avisan y se omiten.
+
+        Parámetros:
+        - df (pd.DataFrame): DataFrame original.
+        - inplace (bool): Si es True, modifica df sin copiarlo.
+
+        Retorna:
+        - pd.DataFrame con todos los pasos aplicados.
+        """
+        inicio = time.perf_counter()
+        grupos = self.planificar()
+        # Cada grupo reemplaza columnas enteras: una copia superficial no toca los datos de df
+        df_resultado = df if inplace else df.copy(deep=False)
+        for grupo in grupos:
+            if grupo.origen not in df_resultado.columns:
+                print(f"⚠️ La columna '{grupo.origen}' no existe en el DataFrame.")
+                continue
+            grupo.ejecutar(df_resultado)
+        self.segundos_totales = time.perf_counter() - inicio
+        return df_resultado
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from agregados_incrementales import AlmacenAgregados
+from utils import agrupar_y_agregar, agregar_costo_total
+
+
+class TestAlmacenAgregados(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.dias = []
+        for dia in range(3):
+            df = pd.DataFrame({
+                'troux_uid': rng.choice(['a', 'b', 'c', 'd'], 200),
+                'mes': rng.integers(1, 3, 200),
+                'unblended_cost': rng.random(200),
+            })
+            ruta = os.path.join(self.carpeta.name, f'dia{dia}.csv')
+            df.to_csv(ruta, index=False)
+            self.dias.append((ruta, df))
+        self.ruta_almacen = os.path.join(self.carpeta.name, 'almacen')
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def _almacen(self):
+        return AlmacenAgregados(self.ruta_almacen, ['troux_uid', 'mes'], 'unblended_cost',
+                                funciones=['sum', 'count', 'mean'], tamano_bloque=64)
+
+    def test_solo_incorpora_archivos_nuevos(self):
+        rutas = [ruta for ruta, _ in self.dias]
+        self.assertEqual(self._almacen().actualizar(rutas[:2]), rutas[:2])
+
+        almacen = self._almacen()   # se vuelve a abrir desde disco
+        self.assertEqual(almacen.actualizar(rutas), rutas[2:])
+        self.assertEqual(almacen.actualizar(rutas), [])
+
+        historico = pd.concat([df for _, df in self.dias], ignore_index=True)
+        esperado = agrupar_y_agregar(historico, ['troux_uid', 'mes'], 'unblended_cost', ['sum', 'count', 'mean'])
+        pd.testing.assert_frame_equal(almacen.resultado(), esperado)
+        self.assertEqual(sum(info['filas'] for info in almacen.archivos.values()), len(historico))
+
+        aplicaciones = pd.DataFrame({'troux_uid': ['a', 'z'], 'mes': [1, 1]})
+        esperado = agregar_costo_total(historico, aplicaciones, ['troux_uid', 'mes'])
+        pd.testing.assert_frame_equal(almacen.agregar_costo_total(aplicaciones), esperado)
+
+    def test_mismo_archivo_dos_veces(self):
+        ruta, df = self.dias[0]
+        relativa = os.path.join(os.path.dirname(ruta), '.', os.path.basename(ruta))
+        almacen = self._almacen()
+        self.assertEqual(almacen.actualizar([ruta, relativa, ruta]), [ruta])
+        esperado = agrupar_y_agregar(df, ['troux_uid', 'mes'], 'unblended_cost', ['sum', 'count'])
+        pd.testing.assert_frame_equal(almacen.resultado(['sum', 'count']), esperado)
+
+    def test_archivo_modificado_requiere_reconstruir(self):
+        ruta, df = self.dias[0]
+        almacen = self._almacen()
+        almacen.actualizar([ruta])
+        time.sleep(0.01)
+        df.iloc[:10].to_csv(ruta, index=False)
+        with self.assertRaises(ValueError):
+            almacen.actualizar([ruta])
+        almacen.reconstruir()
+        esperado = agrupar_y_agregar(df.iloc[:10], ['troux_uid', 'mes'], 'unblended_cost', ['sum'])
+        pd.testing.assert_frame_equal(almacen.resultado(['sum']), esperado)
+        self.assertEqual([f for f in os.listdir(self.ruta_almacen) if f.endswith('.pkl')], ['parciales_000003.pkl'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from agregados_parciales import (AcumuladorParciales, agregados_parciales, asignar_por_claves,
+                                 finalizar_parciales, parciales_necesarios)
+from utils import agrupar_y_agregar
+
+
+class TestAgregadosParciales(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'uid': rng.integers(0, 50, 5_000), 'costo': rng.random(5_000)})
+
+    def test_parciales_necesarios(self):
+        self.assertEqual(parciales_necesarios(['mean', 'max']), ['sum', 'count', 'max'])
+        with self.assertRaises(ValueError):
+            parciales_necesarios(['median'])
+
+    def test_acumulador_combina_por_tandas(self):
+        funciones = ['sum', 'count', 'min', 'max', 'mean']
+        parciales = parciales_necesarios(funciones)
+        acumulador = AcumuladorParciales(filas_minimas=120)
+        combinados = []
+        for inicio in range(0, len(self.df), 250):
+            acumulador.agregar(agregados_parciales(self.df.iloc[inicio:inicio + 250], ['uid'], 'costo', parciales))
+            combinados.append(acumulador._pendientes == [])
+        # Cada bloque trae ~50 claves: se combina cada pocos bloques, no en todos
+        self.assertIn(False, combinados)
+        self.assertIn(True, combinados)
+
+        resultado = finalizar_parciales(acumulador.combinar(), funciones).sort_index().reset_index()
+        pd.testing.assert_frame_equal(resultado, agrupar_y_agregar(self.df, 'uid', 'costo', funciones))
+        self.assertLessEqual(acumulador.filas, 50)
+
+    def test_asignar_por_claves(self):
+        tabla = pd.DataFrame({'sum': [1.0, 2.0]}, index=pd.Index(['a', 'b'], name='k'))
+        df = pd.DataFrame({'k': ['b', 'z', 'a']}, index=[10, 11, 12])
+        resultado = asignar_por_claves(df, tabla, ['k'], {'sum': 'total'})
+        self.assertEqual(resultado.index.tolist(), [0, 1, 2])
+        np.testing.assert_array_equal(resultado['total'], [2.0, np.nan, 1.0])
+        self.assertNotIn('total', df.columns)
+        asignar_por_claves(df, tabla, ['k'], {'sum': 'total'}, inplace=True)
+        self.assertEqual(df.index.tolist(), [10, 11, 12])
+        self.assertIn('total', df.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
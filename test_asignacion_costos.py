@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import asignacion_costos
+from asignacion_costos import MatrizAsignacion
+from utils import extraer_porcentajes
+
+
+class TestMatrizAsignacion(unittest.TestCase):
+    def setUp(self):
+        self.proyectos = pd.DataFrame({
+            'Codigo': ['P1', 'P2', 'P3', 'P1', 'P4'],
+            'RecursosInternos': ['Ana [50%], Luis [25%]', 'Eva [100%]', None, 'Ana [10%]', 'Luis [12.5%]'],
+        })
+        self.costos = pd.DataFrame({
+            'Codigo': ['P1', 'P1', 'P2', 'P3', 'P9', 'P4'],
+            'mes': [1, 2, 1, 1, 1, 2],
+            'unblended_cost': [100.0, 200.0, 50.0, 10.0, 5.0, 80.0],
+        })
+
+    def test_matriz_csr(self):
+        matriz = MatrizAsignacion(self.proyectos)
+        self.assertEqual(matriz.forma, (3, 3))
+        self.assertEqual(matriz.indptr.tolist(), [0, 2, 3, 4])
+        self.assertEqual(list(matriz.recursos.take(matriz.indices)), ['Ana', 'Luis', 'Eva', 'Luis'])
+        np.testing.assert_allclose(matriz.pesos, [0.6, 0.25, 1.0, 0.125])
+        self.assertEqual(matriz.asignado().round(3).to_dict(), {'P1': 0.85, 'P2': 1.0, 'P4': 0.125})
+
+    def test_reparto_por_mes(self):
+        resultado = MatrizAsignacion(self.proyectos).asignar(self.costos, columna_mes='mes')
+        self.assertEqual(resultado.loc['Ana'].tolist(), [60.0, 120.0])
+        self.assertEqual(resultado.loc['Luis'].tolist(), [25.0, 60.0])
+        self.assertEqual(resultado.loc['(sin asignar)'].tolist(), [30.0, 100.0])
+        self.assertAlmostEqual(resultado.to_numpy().sum(), self.costos['unblended_cost'].sum())
+
+    def test_sin_asignar_no_se_mezcla_con_un_recurso(self):
+        proyectos = pd.DataFrame({'Codigo': ['P1'], 'RecursosInternos': ['(sin asignar) [50%]']})
+        matriz = MatrizAsignacion(proyectos)
+        with self.assertRaises(ValueError):
+            matriz.asignar(self.costos)
+        resultado = matriz.asignar(self.costos, sin_asignar='(resto)')
+        self.assertEqual(resultado['unblended_cost'].to_dict(), {'(sin asignar)': 150.0, '(resto)': 295.0})
+
+    def test_igual_que_explotar_y_unir(self):
+        rng = np.random.default_rng(0)
+        nombres = np.array([f'R{k}' for k in range(30)])
+        proyectos = pd.DataFrame({
+            'Codigo': [f'P{k}' for k in range(200)],
+            'RecursosInternos': [', '.join(f'{nombres[j]} [{w}%]' for j, w in
+                                           zip(rng.choice(30, 3, replace=False), (50, 25, 12.5)))
+                                 for _ in range(200)],
+        })
+        costos = pd.DataFrame({'Codigo': rng.choice(proyectos['Codigo'], 1000), 'unblended_cost': rng.random(1000)})
+
+        largo = extraer_porcentajes(proyectos, unir=True)
+        unido = largo.merge(costos.groupby('Codigo', as_index=False)['unblended_cost'].sum(), on='Codigo')
+        esperado = (unido['unblended_cost'] * unido['ValorPorcentaje']).groupby(unido['Recurso']).sum()
+
+        resultado = MatrizAsignacion(proyectos).asignar(costos, decimales=None, sin_asignar=None)
+        pd.testing.assert_series_equal(resultado['unblended_cost'], esperado, check_names=False)
+
+    def test_valida_mas_del_100(self):
+        df = pd.DataFrame({'Codigo': ['X', 'X'], 'RecursosInternos': ['A [60%]', 'B [50%]']})
+        with self.assertRaises(ValueError):
+            MatrizAsignacion(df)
+        matriz = MatrizAsignacion(df, validar=False)
+        self.assertEqual(matriz.excedidos().index.tolist(), ['X'])
+
+    def _densa(self, matriz):
+        densa = np.zeros(matriz.forma)
+        filas = np.repeat(np.arange(matriz.forma[0]), np.diff(matriz.indptr))
+        densa[filas, matriz.indices] = matriz.pesos
+        return densa
+
+    def _costos(self, matriz):
+        return np.random.default_rng(0).random((matriz.forma[0], 3))
+
+    def test_producto_numpy(self):
+        matriz = MatrizAsignacion(self.proyectos)
+        costos = self._costos(matriz)
+        np.testing.assert_allclose(matriz._multiplicar_numpy(costos), self._densa(matriz).T @ costos)
+
+    @unittest.skipIf(asignacion_costos.sparse is None, "requiere scipy")
+    def test_producto_scipy(self):
+        matriz = MatrizAsignacion(self.proyectos)
+        costos = self._costos(matriz)
+        np.testing.assert_allclose(matriz._multiplicar(costos), self._densa(matriz).T @ costos)
+
+
+if __name__ == '__main__':
+    unittest.main()
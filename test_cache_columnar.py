@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+from cache_columnar import CacheColumnar
+from utils import cargar_archivo, cargar_hojas_excel
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+@unittest.skipIf(pyarrow is None, "requiere pyarrow")
+class TestCacheColumnar(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.carpeta.name, 'costos.csv')
+        self.df = pd.DataFrame({'uid': ['a', 'b', 'c'], 'costo': [1.5, 2.0, 3.25]})
+        self.df.to_csv(self.ruta, index=False)
+        self.cache = CacheColumnar(os.path.join(self.carpeta.name, 'cache'))
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_acierto_tras_primera_lectura(self):
+        primero = cargar_archivo(self.ruta, cache=self.cache)
+        segundo = cargar_archivo(self.ruta, cache=self.cache)
+        pd.testing.assert_frame_equal(primero, segundo)
+        stats = self.cache.estadisticas()
+        self.assertEqual((stats['aciertos'], stats['fallos'], stats['entradas']), (1, 1, 1))
+
+        # Otras opciones de lectura son otra entrada
+        cargar_archivo(self.ruta, usecols=['uid'], cache=self.cache)
+        self.assertEqual(self.cache.estadisticas()['entradas'], 2)
+
+    def test_motor_es_parte_de_la_clave(self):
+        cargar_archivo(self.ruta, cache=self.cache, motor='pyarrow')
+        cargar_archivo(self.ruta, cache=self.cache, motor='c')
+        stats = self.cache.estadisticas()
+        self.assertEqual((stats['aciertos'], stats['entradas']), (0, 2))
+
+    def test_aciertos_no_reescriben_el_indice(self):
+        cargar_archivo(self.ruta, cache=self.cache)
+        escrituras = []
+        guardar_indice = self.cache._guardar_indice
+        self.cache._guardar_indice = lambda: (escrituras.append(1), guardar_indice())
+        for _ in range(3):
+            self.cache.buscar(self.ruta, {'tipo': 'csv', 'sep': None, 'encoding': None, 'usecols': None,
+                                          'dtype': None, 'motor': None})
+        self.assertEqual((self.cache.estadisticas()['aciertos'], escrituras), (3, []))
+        self.cache.sincronizar()
+        self.cache.sincronizar()
+        self.assertEqual(escrituras, [1])
+
+    def test_archivo_modificado_e_invalidacion(self):
+        cargar_archivo(self.ruta, cache=self.cache)
+        time.sleep(0.01)
+        pd.concat([self.df, self.df]).to_csv(self.ruta, index=False)
+        self.assertEqual(len(cargar_archivo(self.ruta, cache=self.cache)), 6)
+        self.assertEqual(self.cache.estadisticas()['aciertos'], 0)
+
+        self.assertEqual(self.cache.invalidar(self.ruta), 2)
+        self.assertEqual(self.cache.estadisticas()['entradas'], 0)
+
+    def test_desalojo_lru(self):
+        cache = CacheColumnar(os.path.join(self.carpeta.name, 'pequena'), max_bytes=1)
+        cargar_archivo(self.ruta, cache=cache)
+        stats = cache.estadisticas()
+        self.assertEqual((stats['escrituras'], stats['desalojos'], stats['entradas']), (1, 1, 0))
+
+    def test_indice_persistente(self):
+        cargar_archivo(self.ruta, cache=self.cache)
+        otra = CacheColumnar(self.cache.carpeta)
+        cargar_archivo(self.ruta, cache=otra)
+        self.assertEqual(otra.estadisticas()['aciertos'], 1)
+
+    @unittest.skipIf(openpyxl is None, "requiere openpyxl")
+    def test_hojas_excel(self):
+        ruta = os.path.join(self.carpeta.name, 'plan.xlsx')
+        with pd.ExcelWriter(ruta) as writer:
+            self.df.to_excel(writer, sheet_name='Costos', index=False)
+            self.df.to_excel(writer, sheet_name='Otra', index=False)
+        cargar_hojas_excel(ruta, ['Costos'], cache=self.cache)
+        hojas = cargar_hojas_excel(ruta, ['Costos', 'Otra'], cache=self.cache)
+        pd.testing.assert_frame_equal(hojas['Otra'], self.df)
+        self.assertEqual(self.cache.estadisticas()['aciertos'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
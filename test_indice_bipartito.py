@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from indice_bipartito import IndiceBipartito
+from utils import dividir_registros
+
+
+class TestIndiceBipartito(unittest.TestCase):
+    def setUp(self):
+        df = pd.DataFrame({'Codigo': ['C2', 'C1', 'C3', 'C4', 'C1'],
+                           'AplicacionesImpactadas ': ['B,C', 'A, B\nC', 'C', None, 'A']})
+        self.largo = dividir_registros(df)
+        self.indice = IndiceBipartito.desde_registros(self.largo)
+
+    def test_csr_en_ambos_sentidos(self):
+        indice = self.indice
+        self.assertEqual(indice.forma, (3, 3, 6))
+        self.assertEqual(indice.codigos.tolist(), ['C1', 'C2', 'C3'])
+        self.assertEqual(indice.indptr_codigos.tolist(), [0, 3, 5, 6])
+        self.assertEqual(indice.indices_aplicaciones.tolist(), [0, 1, 2, 1, 2, 2])
+        self.assertEqual(indice.indptr_aplicaciones.tolist(), [0, 1, 3, 6])
+        self.assertEqual(indice.indices_codigos.tolist(), [0, 0, 1, 0, 1, 2])
+        self.assertEqual(indice.grados('aplicaciones').to_dict(), {'A': 1, 'B': 2, 'C': 3})
+
+    def test_consultas_y_conjuntos(self):
+        indice = self.indice
+        self.assertEqual(indice.codigos_de('C').tolist(), ['C1', 'C2', 'C3'])
+        self.assertEqual(indice.aplicaciones_de('C2').tolist(), ['B', 'C'])
+        self.assertEqual(indice.codigos_de(['A', 'B']).tolist(), ['C1', 'C2'])
+        self.assertEqual(indice.codigos_de(['B', 'C'], modo='interseccion').tolist(), ['C1', 'C2'])
+        self.assertEqual(indice.codigos_de(['A', 'Z'], modo='interseccion').tolist(), [])
+        self.assertEqual(indice.aplicaciones_de('no existe').tolist(), [])
+        with self.assertRaises(ValueError):
+            indice.codigos_de('A', modo='diferencia')
+
+    def test_etiquetas_utf8_con_desplazamientos(self):
+        largo = pd.DataFrame({'Codigo': ['Ñandú', 'b', 'año', 'Ñandú'], 'App': ['ü', 'x', 'x', 'x']})
+        indice = IndiceBipartito.desde_registros(largo, 'Codigo', 'App')
+        self.assertEqual(indice.codigos.datos.dtype, np.uint8)
+        self.assertEqual(indice.codigos.desplazamientos.tolist(), [0, 4, 5, 12])
+        self.assertEqual(indice.codigos.tolist(), sorted(['Ñandú', 'b', 'año']))
+        self.assertEqual(indice.aplicaciones_de('Ñandú').tolist(), ['x', 'ü'])
+        self.assertEqual(indice.codigos_de('x').tolist(), ['año', 'b', 'Ñandú'])
+        self.assertEqual(indice.codigos_de('ñ').tolist(), [])
+
+    def test_igual_que_filtrar(self):
+        rng = np.random.default_rng(0)
+        largo = pd.DataFrame({'Codigo': [f'C{k}' for k in rng.integers(0, 300, 3000)],
+                              'App': [f'APP-{k}' for k in rng.integers(0, 50, 3000)]})
+        indice = IndiceBipartito.desde_registros(largo, 'Codigo', 'App')
+        for app in ('APP-0', 'APP-17', 'APP-49'):
+            esperado = np.sort(largo.loc[largo['App'] == app, 'Codigo'].unique())
+            np.testing.assert_array_equal(indice.codigos_de(app), esperado)
+        esperado = largo.drop_duplicates().sort_values(['Codigo', 'App']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(indice.a_dataframe(), esperado, check_dtype=False)
+
+    def test_guardar_y_cargar_con_mmap(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            self.indice.guardar(carpeta)
+            self.assertFalse([f for f in os.listdir(carpeta) if f.endswith('.tmp')])
+            cargado = IndiceBipartito.cargar(carpeta)
+            self.assertIsInstance(cargado.indices_codigos, np.memmap)
+            self.assertIsInstance(cargado.codigos.datos, np.memmap)
+            self.assertEqual(cargado.codigos.tolist(), ['C1', 'C2', 'C3'])
+            self.assertEqual(cargado.codigos_de(['B', 'C'], modo='interseccion').tolist(), ['C1', 'C2'])
+            pd.testing.assert_frame_equal(cargado.a_dataframe(), self.indice.a_dataframe())
+            del cargado
+        with self.assertRaises(ValueError):
+            IndiceBipartito.cargar(carpeta)
+
+
+if __name__ == '__main__':
+    unittest.main()
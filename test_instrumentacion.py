@@ -0,0 +1,80 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import instrumentacion
+import utils
+from utils import agregar_costo_total
+
+
+class TestInstrumentacion(unittest.TestCase):
+    def setUp(self):
+        self.costos = pd.DataFrame({'troux_uid': np.arange(10_000) % 100, 'unblended_cost': np.ones(10_000)})
+        self.aplicaciones = pd.DataFrame({'troux_uid': np.arange(50)})
+
+    def tearDown(self):
+        instrumentacion.desactivar()
+
+    def test_registra_y_restaura(self):
+        originales = {'modulo': utils.agregar_costo_total, 'importada': agregar_costo_total}
+        espacio = {'agregar_costo_total': agregar_costo_total}
+        instrumentacion.activar(espacios=[espacio])
+        self.assertIsNot(espacio['agregar_costo_total'], originales['importada'])
+
+        espacio['agregar_costo_total'](self.costos, self.aplicaciones)
+        registros = instrumentacion.registros()
+        self.assertEqual(registros['funcion'].tolist(), ['resumir_costos', 'agregar_costo_total'])
+        externa = registros.iloc[1]
+        self.assertEqual((externa['profundidad'], externa['filas_entrada'], externa['filas_salida']), (0, 10_000, 50))
+        self.assertEqual(externa['columnas_salida'], 2)
+        # El pico de la llamada externa incluye el de la interna
+        self.assertGreaterEqual(externa['pico_bytes'], registros.iloc[0]['pico_bytes'])
+
+        tabla = instrumentacion.resumen(imprimir=False)
+        self.assertAlmostEqual(tabla['porcentaje'].sum(), 100.0)
+
+        instrumentacion.desactivar()
+        self.assertIs(utils.agregar_costo_total, originales['modulo'])
+        self.assertIs(espacio['agregar_costo_total'], originales['importada'])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_registra_errores(self):
+        instrumentacion.activar(memoria=False)
+        with self.assertRaises(KeyError):
+            utils.dividir_registros_multiple(self.costos, {'NoExiste': 'X'})
+        registro = instrumentacion.registros().iloc[0]
+        self.assertIn('KeyError', registro['error'])
+        self.assertIsNone(registro['pico_bytes'])
+
+    def test_generadores_se_registran_al_terminar(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'costos.csv')
+            self.costos.to_csv(ruta, index=False)
+            instrumentacion.activar()
+            bloques = utils.cargar_archivo(ruta, tamano_bloque=3_000)
+            self.assertTrue(instrumentacion.registros().empty)
+            self.assertEqual(sum(len(b) for b in bloques), 10_000)
+
+            registros = instrumentacion.registros().set_index('funcion')
+            self.assertEqual(sorted(registros.index), ['cargar_archivo', 'leer_csv_por_bloques'])
+            self.assertEqual(registros.loc['cargar_archivo', 'profundidad'], 0)
+            self.assertEqual(registros.loc['leer_csv_por_bloques', 'profundidad'], 1)
+            self.assertEqual(registros['filas_salida'].tolist(), [10_000, 10_000])
+            self.assertTrue((registros['pico_bytes'] > 0).all())
+            self.assertGreaterEqual(registros.loc['cargar_archivo', 'segundos'],
+                                    registros.loc['leer_csv_por_bloques', 'segundos'])
+
+            # Cerrado antes de terminar: se registran los bloques leídos hasta entonces
+            instrumentacion.activar(memoria=False)
+            bloques = utils.leer_csv_por_bloques(ruta, tamano_bloque=3_000, reportar=False)
+            next(bloques)
+            bloques.close()
+            self.assertEqual(instrumentacion.registros()['filas_salida'].tolist(), [3_000])
+
+
+if __name__ == '__main__':
+    unittest.main()
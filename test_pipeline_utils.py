@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import utils
+from pipeline_utils import PipelineLimpieza
+
+
+class TestPipelineLimpieza(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Nombre': [' Ana. ', 'Luis-', None, 'Eva  '],
+            'Costo': ['1.234', 'x', None, '10'],
+            'Fecha': ['1/2/2024', '12/31/24', '', '3/4/2025'],
+            'Recursos': ['Ana [50%], Luis [50%]', '', None, 'Eva'],
+        })
+        self.reglas = [
+            {'columna': 'Nombre', 'tipo': 'replace', 'patron': '.'},
+            {'columna': 'Costo', 'tipo': 'replace', 'patron': ' '},
+            {'columna': 'Nombre', 'tipo': 'regex', 'patron': r'-+$'},
+        ]
+
+    def construir(self):
+        return (PipelineLimpieza()
+                .limpiar_columnas(self.reglas)
+                .limpiar_columna('Nombre', 'Ana', 'ANA')
+                .convertir_a_numerico('Costo', 1)
+                .reemplazar_nulos('Costo', 0)
+                .formatear_fechas(['Fecha'])
+                .contar_elementos({'Recursos': 'numRecursos'}))
+
+    def test_mismo_resultado_que_las_funciones(self):
+        esperado = utils.limpiar_columnas(self.df, self.reglas)
+        esperado = utils.limpiar_columna(esperado, 'Nombre', 'Ana', 'ANA')
+        esperado = utils.convertir_a_numerico(esperado, 'Costo', 1)
+        esperado = utils.reemplazar_nulos(esperado, 'Costo', 0)
+        esperado = utils.formatear_fechas(esperado, ['Fecha'])
+        esperado = utils.contar_elementos(esperado, {'Recursos': 'numRecursos'})
+
+        obtenido = self.construir().ejecutar(self.df)
+        pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+        self.assertEqual(self.df['Nombre'].iloc[0], ' Ana. ')
+
+    def test_plan_fusiona_por_columna(self):
+        pipeline = self.construir()
+        grupos = pipeline.planificar()
+        # Nombre (reglas combinadas + limpiar_columna), Costo (3 ops), Fecha, Recursos -> numRecursos
+        self.assertEqual([len(g.operaciones) for g in grupos], [2, 3, 1, 1])
+        self.assertEqual(grupos[0].conversiones_texto(), (1, 1))
+
+        pipeline.ejecutar(self.df.copy(), inplace=True)
+        texto = pipeline.explicar()
+        self.assertIn('4 grupos', texto)
+        self.assertIn('Total:', texto)
+        # Tiempo por operación, no solo por grupo
+        for grupo in pipeline._grupos:
+            self.assertTrue(all(op.segundos is not None for op in grupo.operaciones))
+            self.assertGreaterEqual(grupo.segundos, sum(op.segundos for op in grupo.operaciones))
+        self.assertIn("numérico(1) (", texto)
+
+    def test_no_reordena_si_hay_dependencia(self):
+        pipeline = (PipelineLimpieza()
+                    .limpiar_columna('Recursos', '[50%]', '')
+                    .contar_elementos({'Recursos': 'numRecursos'})
+                    .limpiar_columna('Recursos', 'Ana', 'X'))
+        self.assertEqual([len(g.operaciones) for g in pipeline.planificar()], [1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,643 @@
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import dividir_registros, calcular_rangos_fechas, calcular_detalle_laborable, formatear_fechas
+from utils import separar_recursos_externos, contar_elementos, filtrar_dataframe, limpiar_indices_filtro
+from utils import cargar_archivo, leer_csv_por_bloques, cargar_hojas_excel
+from utils import limpiar_columnas, dividir_registros_1, dividir_registros_multiple, _copy_on_write_activo
+from utils import compactar_memoria, agregar_costo_total, resumir_costos, reemplazar_nulos
+from utils import agrupar_y_agregar, agrupar_y_agregar_por_bloques, estimar_filas_dividir
+from utils import separar_nombres_apellidos, guardar_columnas_csv, guardar_varios_csv
+from utils import _PATRON_NOMBRES, _PATRON_NOMBRES_ARROW
+from utils import aplicar_por_unicos, limpiar_columna, agregar_columnas_porcentaje_v1, extraer_porcentajes
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class TestDividirRegistros(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Codigo': ['A', 'B', 'C'],
+            'AplicacionesImpactadas ': ['app1, app2\napp3', None, ' ,app4,, '],
+            'Estado': ['Activo', 'Cerrado', 'Activo'],
+        })
+
+    def test_divide_por_comas_y_saltos(self):
+        res = dividir_registros(self.df)
+        self.assertEqual(list(res.columns), ['Codigo', 'AplicacionesImpactadas '])
+        self.assertEqual(res['Codigo'].tolist(), ['A', 'A', 'A', 'C'])
+        self.assertEqual(res['AplicacionesImpactadas '].tolist(), ['app1', 'app2', 'app3', 'app4'])
+
+    def test_conserva_columnas_y_separador_propio(self):
+        res = dividir_registros(self.df, separador=r'\n', conservar_columnas=True)
+        self.assertEqual(list(res.columns), list(self.df.columns))
+        self.assertEqual(res['Estado'].tolist(), ['Activo', 'Activo', 'Activo'])
+        self.assertEqual(res['AplicacionesImpactadas '].tolist(), ['app1, app2', 'app3', ',app4,,'])
+
+
+class TestCalcularRangosFechas(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Inicio': ['30/12/2024', '01/01/2025', 'sin fecha', '10/01/2025'],
+            'Fin': ['03/01/2025', '31/01/2025', '10/01/2025', '01/01/2025'],
+        })
+        self.feriados = [datetime(2025, 1, 1)]
+
+    def test_dias_laborables_y_detalle(self):
+        res = calcular_rangos_fechas(self.df, 'Inicio', 'Fin', feriados=self.feriados)
+        # 30/12 y 31/12 de 2024 + 02/01 y 03/01 de 2025 (01/01 es feriado)
+        self.assertEqual(res['DiasLaborables'].tolist(), [4, 22, 0, 0])
+        self.assertEqual(res['DetalleLaborablePorAnio'].iloc[0],
+                         {2024: {'dias': 2, 'meses': 1}, 2025: {'dias': 2, 'meses': 1}})
+        self.assertEqual(res['DetalleLaborablePorAnio'].iloc[2], {})
+
+    def test_detalle_formato_largo(self):
+        res = calcular_detalle_laborable(self.df, 'Inicio', 'Fin', feriados=self.feriados)
+        self.assertEqual(res['Fila'].tolist(), [0, 0, 1])
+        self.assertEqual(res['Anio'].tolist(), [2024, 2025, 2025])
+        self.assertEqual(res['DiasLaborables'].tolist(), [2, 2, 22])
+        self.assertEqual(res['MesesLaborables'].tolist(), [1, 1, 1])
+
+
+class TestFormatearFechas(unittest.TestCase):
+    def test_varias_columnas_y_fallidas(self):
+        df = pd.DataFrame({
+            'Inicio': ['1/2/2023', '12/31/23', '', None, 'sin fecha'],
+            'Fin': ['3/4/2024', '3/4/24', '3/4/2024', '3/4/2024', '3/4/2024'],
+        })
+        res, fallidas = formatear_fechas(df, ['Inicio', 'Fin'], devolver_fallidas=True)
+        self.assertEqual(res['Inicio'].tolist(), ['02/01/2023', '31/12/2023', '', '', 'sin fecha'])
+        self.assertEqual(res['Fin'].tolist(), ['04/03/2024'] * 5)
+        self.assertEqual(fallidas, {'Inicio': 1, 'Fin': 0})
+        # El DataFrame original no se modifica
+        self.assertEqual(df['Inicio'].iloc[0], '1/2/2023')
+
+    def test_dia_mes_anio_con_separador_salida(self):
+        df = pd.DataFrame({'Fecha': ['5-7-2025']})
+        res = formatear_fechas(df, ['Fecha'], formato='d-m-a', separador='-', separador_salida='/')
+        self.assertEqual(res['Fecha'].iloc[0], '05/07/2025')
+
+    def test_formato_desconocido(self):
+        with self.assertRaises(ValueError):
+            formatear_fechas(pd.DataFrame({'Fecha': ['1/1/2025']}), ['Fecha'], formato='a-m-d')
+
+
+class TestSepararRecursosExternos(unittest.TestCase):
+    def test_rellena_y_conserva_resto(self):
+        df = pd.DataFrame({'Recursos': ['Prov A | JIRA-1 | Ana | obs', 'Prov B|JIRA-2', None, 'P|J|C|a|b']})
+        res = separar_recursos_externos(df, 'Recursos')
+        self.assertEqual(res['Proveedor'].tolist(), ['Prov A', 'Prov B', '', 'P'])
+        self.assertEqual(res['Consultor'].tolist(), ['Ana', '', '', 'C'])
+        self.assertEqual(res['Observaciones'].tolist(), ['obs', '', '', 'a|b'])
+
+    def test_columnas_destino_configurables(self):
+        df = pd.DataFrame({'Recursos': ['A|B']})
+        res = separar_recursos_externos(df, 'Recursos', columnas_destino=['Uno', 'Dos', 'Tres'])
+        self.assertEqual(res[['Uno', 'Dos', 'Tres']].iloc[0].tolist(), ['A', 'B', ''])
+
+    def test_columna_toda_nula(self):
+        for por_unicos in (False, True):
+            df = pd.DataFrame({'Recursos': [np.nan, np.nan]})
+            res = separar_recursos_externos(df, 'Recursos', por_unicos=por_unicos)
+            self.assertEqual(res['Proveedor'].tolist(), ['', ''])
+            self.assertEqual(res['Observaciones'].tolist(), ['', ''])
+
+
+class TestContarElementos(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Recursos': ['Ana [50%], Luis [50%]', ' , Eva', None, 'a,,b, ,c'],
+            'Apps': ['APP1|APP2', '', 'APP3', None],
+        })
+
+    def test_ignora_vacios_y_varias_columnas(self):
+        res = contar_elementos(self.df, {'Recursos': 'numRecursos'})
+        self.assertEqual(res['numRecursos'].tolist(), [2, 1, 0, 3])
+        self.assertNotIn('numRecursos', self.df.columns)
+
+        res = contar_elementos(self.df, {'Apps': 'numApps'}, separador='|')
+        self.assertEqual(res['numApps'].tolist(), [2, 0, 1, 0])
+
+    def test_inplace_y_separador_multiple(self):
+        res = contar_elementos(self.df, {'Recursos': 'numRecursos'}, separador=', ', inplace=True)
+        self.assertIs(res, self.df)
+        self.assertEqual(self.df['numRecursos'].tolist(), [2, 1, 0, 2])
+
+
+class TestFiltrarDataFrame(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'TipoRequerimiento': ['Proyecto', 'Mejora', None, 'Proyecto', 'Soporte'],
+            'Costo': [10.0, 25.0, 5.0, 40.0, None],
+            'Estado': ['Activo', 'Activo', 'Cerrado', 'Cerrado', 'Activo'],
+        }, index=[10, 11, 12, 13, 14])
+
+    def tearDown(self):
+        limpiar_indices_filtro()
+
+    def comparar(self, filtros, esperado):
+        for usar_indice in (False, True):
+            res = filtrar_dataframe(self.df, filtros, usar_indice=usar_indice)
+            self.assertEqual(res.index.tolist(), esperado, (filtros, usar_indice))
+
+    def test_igualdad_compatible(self):
+        self.comparar({'TipoRequerimiento': 'Proyecto', 'Estado': 'Activo'}, [10])
+
+    def test_en_rango_nulos_y_negacion(self):
+        self.comparar({'TipoRequerimiento': ['Proyecto', 'Mejora']}, [10, 11, 13])
+        self.comparar({'Costo': {'entre': (10, 30)}}, [10, 11])
+        self.comparar({'Costo': {'entre': (None, 10)}, 'Estado': 'Cerrado'}, [12])
+        self.comparar({'TipoRequerimiento': {'nulo': True}}, [12])
+        self.comparar({'TipoRequerimiento': {'no': 'Proyecto'}}, [11, 12, 14])
+        self.comparar({'Costo': {'nulo': False}, 'TipoRequerimiento': {'no': ['Mejora']}}, [10, 12, 13])
+
+    def test_indice_se_invalida_al_modificar(self):
+        d = pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+        self.assertEqual(len(filtrar_dataframe(d, {'a': 1, 'b': 'x'}, usar_indice=True)), 1)
+        d['a'] = [5, 5, 5]
+        self.assertEqual(len(filtrar_dataframe(d, {'a': 1}, usar_indice=True)), 0)
+        d.loc[0, 'b'] = 'y'
+        self.assertEqual(filtrar_dataframe(d, {'b': 'y'}, usar_indice=True).index.tolist(), [0, 1])
+        d.iloc[2, 0] = 7
+        self.assertEqual(filtrar_dataframe(d, {'a': 7}, usar_indice=True).index.tolist(), [2])
+
+    def test_filtro_no_valido(self):
+        with self.assertRaises(ValueError):
+            filtrar_dataframe(self.df, {'Costo': {'mayor': 3}})
+
+
+class TestCargarArchivo(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.carpeta.name, 'costos.csv')
+        self.df = pd.DataFrame({
+            'uid': ['añil', 'b', 'c', 'd', 'e'],
+            'costo': [1.5, 2.0, 3.25, 4.0, 5.0],
+            'cuenta': ['x', 'y', 'x', 'y', 'x'],
+        })
+        self.df.to_csv(self.ruta, sep=';', index=False, encoding='latin-1')
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_detecta_separador_y_codificacion(self):
+        df = cargar_archivo(self.ruta)
+        pd.testing.assert_frame_equal(df, self.df, check_dtype=False)
+
+    def test_lectura_por_bloques_con_proyeccion(self):
+        metricas = []
+        bloques = list(leer_csv_por_bloques(self.ruta, tamano_bloque=2, usecols=['uid', 'costo'],
+                                            dtype={'costo': 'float32'}, reportar=False, metricas=metricas))
+        self.assertEqual([len(b) for b in bloques], [2, 2, 1])
+        self.assertEqual(list(bloques[0].columns), ['uid', 'costo'])
+        self.assertEqual(bloques[0]['costo'].dtype, np.float32)
+        self.assertEqual(bloques[2].index.tolist(), [4])
+        self.assertEqual([m['filas'] for m in metricas], [2, 2, 1])
+        self.assertTrue(all(m['pico_memoria'] > 0 for m in metricas))
+
+    def test_cargar_archivo_por_bloques(self):
+        metricas = []
+        bloques = list(cargar_archivo(self.ruta, tamano_bloque=2, compactar=True, metricas=metricas))
+        self.assertEqual([len(b) for b in bloques], [2, 2, 1])
+        self.assertEqual(bloques[0]['costo'].dtype, np.float32)
+        self.assertEqual([m['filas'] for m in metricas], [2, 2, 1])
+        with self.assertRaises(ValueError):
+            cargar_archivo(self.ruta, tamano_bloque=2, cache=object())
+
+    def test_sin_metricas_no_activa_tracemalloc(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        for bloque in leer_csv_por_bloques(self.ruta, tamano_bloque=2):
+            self.assertFalse(tracemalloc.is_tracing())
+
+
+@unittest.skipIf(openpyxl is None, "requiere openpyxl")
+class TestCargarHojasExcel(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.carpeta.name, 'plan.xlsx')
+        self.hojas = {
+            f'Hoja{k}': pd.DataFrame({'uid': [f'u{k}', 'x'], 'horas': [k, k + 0.5]}) for k in range(3)
+        }
+        with pd.ExcelWriter(self.ruta) as writer:
+            for nombre, df in self.hojas.items():
+                df.to_excel(writer, sheet_name=nombre, index=False)
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_mismo_resultado_en_serie_y_en_paralelo(self):
+        pedidas = ['Hoja2', 'Hoja0', 'Hoja1']
+        for procesos in (None, 2):
+            res = cargar_hojas_excel(self.ruta, pedidas, procesos=procesos)
+            self.assertEqual(list(res), pedidas)
+            for nombre in pedidas:
+                pd.testing.assert_frame_equal(res[nombre], self.hojas[nombre])
+
+
+class TestMemoriaSinCopias(unittest.TestCase):
+    """El pico de memoria no debe incluir una copia de las columnas que no se modifican."""
+
+    def setUp(self):
+        n = 100_000
+        self.df = pd.DataFrame({f'Valor{k}': np.arange(n, dtype='float64') for k in range(20)})
+        self.df['Fecha'] = '1/2/2024'
+        self.df['Recursos'] = 'Ana, Luis'
+        self.df['Inicio'] = '01/01/2024'
+        self.df['Fin'] = '31/01/2024'
+        self.bytes_entrada = int(self.df.memory_usage(deep=True).sum())
+
+    def pico(self, funcion):
+        tracemalloc.start()
+        try:
+            funcion()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def llamadas(self, inplace):
+        df = self.df
+        return {
+            'limpiar_columnas': lambda: limpiar_columnas(df, [{'columna': 'Recursos', 'patron': ';'}], inplace=inplace),
+            'formatear_fechas': lambda: formatear_fechas(df, ['Fecha'], inplace=inplace),
+            'contar_elementos': lambda: contar_elementos(df, {'Recursos': 'numRecursos'}, inplace=inplace),
+            'calcular_rangos_fechas': lambda: calcular_rangos_fechas(df, 'Inicio', 'Fin', detalle_por_anio=False,
+                                                                     inplace=inplace),
+        }
+
+    def test_inplace(self):
+        for nombre, llamada in self.llamadas(inplace=True).items():
+            if nombre != 'calcular_rangos_fechas':  # agrega 13 columnas nuevas
+                self.assertLess(self.pico(llamada), 0.5 * self.bytes_entrada, nombre)
+
+    @unittest.skipUnless(_copy_on_write_activo(), "requiere Copy-on-Write de pandas")
+    def test_copy_on_write(self):
+        original = self.df.copy()
+        con_inplace = {nombre: self.pico(llamada) for nombre, llamada in self.llamadas(inplace=True).items()}
+        self.df = original.copy()
+        for nombre, llamada in self.llamadas(inplace=False).items():
+            extra = self.pico(llamada) - con_inplace[nombre]
+            self.assertLess(extra, 0.1 * self.bytes_entrada, nombre)
+        pd.testing.assert_frame_equal(self.df, original)
+
+    def test_dividir_no_copia_la_entrada(self):
+        df = pd.DataFrame({'Recursos': ['Ana, Luis', None, 'Eva'], 'Valor': [1, 2, 3]}, index=[7, 7, 8])
+        res = dividir_registros_1(df, 'Recursos', 'Recurso')
+        self.assertEqual(res['Recurso'].tolist()[:2], ['Ana', 'Luis'])
+        self.assertEqual(res.index.tolist(), [7, 7, 7, 8])
+        self.assertEqual(df['Recursos'].iloc[0], 'Ana, Luis')
+
+        res = dividir_registros_multiple(df, {'Recursos': 'Recurso'})
+        self.assertEqual(list(res.columns), ['Recurso', 'Valor'])
+
+
+class TestCompactarMemoria(unittest.TestCase):
+    def test_tipos_compactados(self):
+        n = 1000
+        df = pd.DataFrame({
+            'uid': pd.Series(['a', 'b', 'c', None] * (n // 4), dtype=object),
+            'Descripcion': pd.Series([f'linea {k}' for k in range(n)], dtype=object),
+            'Mixta': pd.Series([1, 'a'] * (n // 2), dtype=object),
+            'Mes': np.arange(n) % 12,
+            'Horas': np.arange(n, dtype='float64'),
+            'Costo': np.linspace(0, 1, n),
+        })
+        res = compactar_memoria(df, reportar=False)
+        self.assertIsInstance(res['uid'].dtype, pd.CategoricalDtype)
+        self.assertEqual(res['Mixta'].dtype, object)
+        self.assertEqual(res['Mes'].dtype, np.int8)
+        self.assertEqual(res['Horas'].dtype, np.float32)
+        self.assertEqual(res['Costo'].dtype, np.float64)  # float32 perdería precisión
+        self.assertEqual(df['Mes'].dtype, np.int64)
+        self.assertLess(res.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum())
+        self.assertEqual(res['uid'].isna().sum(), n // 4)
+        self.assertEqual(res['Descripcion'].tolist(), df['Descripcion'].tolist())
+        np.testing.assert_array_equal(res['Horas'].to_numpy(dtype='float64'), df['Horas'].to_numpy())
+
+    def test_funciones_sobre_columnas_compactadas(self):
+        n = 400
+        df = pd.DataFrame({
+            'uid': pd.Series(['a', 'b', None, 'c'] * (n // 4), dtype=object),
+            'Apps': pd.Series(['A, B', 'C', None, 'A'] * (n // 4), dtype=object),
+            'Recursos': pd.Series(['Ana [50%], Luis [25%]', 'Eva [100%]', None, 'Eva'] * (n // 4), dtype=object),
+            'Externos': pd.Series(['P|J|C|O', 'P2|J2', None, ''] * (n // 4), dtype=object),
+            'Fecha': pd.Series(['1/2/2024', '12/31/24', None, ''] * (n // 4), dtype=object),
+            'Nombres': pd.Series(['Pérez Gómez, Juan', 'Ruiz, Eva', None, ''] * (n // 4), dtype=object),
+            'Inicio': pd.Series(['01/02/2024', '15/03/2024', None, '01/01/2024'] * (n // 4), dtype=object),
+            'Fin': pd.Series(['01/05/2024', '15/03/2025', '01/01/2024', None] * (n // 4), dtype=object),
+        })
+        # compactar_memoria guarda los nulos de una columna category como NaN
+        df = df.where(df.notna(), np.nan)
+        compactado = compactar_memoria(df, reportar=False)
+        self.assertIsInstance(compactado['uid'].dtype, pd.CategoricalDtype)
+
+        funciones = [
+            lambda d: contar_elementos(d, {'uid': 'n', 'Apps': 'numApps'}),
+            lambda d: separar_recursos_externos(d.copy(), 'Externos'),
+            lambda d: dividir_registros(d, 'uid', 'Apps'),
+            lambda d: formatear_fechas(d, ['Fecha']),
+            lambda d: limpiar_columnas(d, [{'columna': 'Apps', 'patron': ' '}]),
+            lambda d: filtrar_dataframe(d, {'uid': ['a', None]}, usar_indice=True),
+            lambda d: extraer_porcentajes(d, 'Recursos', unir=True),
+            # Funciones que escriben en la columna
+            lambda d: reemplazar_nulos(d.copy(), 'uid', 'SIN UID'),
+            lambda d: limpiar_columna(d.copy(), 'uid', 'a', 'z'),
+            lambda d: limpiar_columna(d.copy(), 'uid', 'a', 'z', por_unicos=True),
+            lambda d: separar_nombres_apellidos(d, 'Nombres'),
+            lambda d: agregar_columnas_porcentaje_v1(d.copy(), 'Recursos'),
+            lambda d: calcular_rangos_fechas(d, 'Inicio', 'Fin'),
+        ]
+        def normalizar(d):
+            d = d.astype(object)
+            return d.where(d.notna(), None)
+
+        for funcion in funciones:
+            pd.testing.assert_frame_equal(normalizar(funcion(compactado)), normalizar(funcion(df)))
+
+
+class TestAgregarCostoTotal(unittest.TestCase):
+    def setUp(self):
+        self.costos = pd.DataFrame({
+            'troux_uid': ['a', 'a', 'b', 'b', 'c'],
+            'mes': [1, 2, 1, 1, 1],
+            'unblended_cost': [1.004, 2.0, 3.0, 4.0, 5.0],
+            'amortized_cost': [1.0, 1.0, 1.0, 1.0, 1.0],
+        })
+        self.aplicaciones = pd.DataFrame({'troux_uid': ['b', 'z', 'a', 'b'], 'Nombre': ['B', 'Z', 'A', 'B2']},
+                                         index=[7, 5, 3, 1])
+
+    def test_igual_al_merge(self):
+        esperado = self.aplicaciones.merge(
+            self.costos.groupby('troux_uid')['unblended_cost'].sum().rename('costo_total').reset_index(),
+            on='troux_uid', how='left')
+        esperado['costo_total'] = esperado['costo_total'].round(2)
+        res = agregar_costo_total(self.costos, self.aplicaciones)
+        pd.testing.assert_frame_equal(res, esperado)
+        self.assertNotIn('costo_total', self.aplicaciones.columns)
+        self.assertEqual(res.index.tolist(), [0, 1, 2, 3])
+
+    def test_varias_claves_y_costos(self):
+        aplicaciones = pd.DataFrame({'troux_uid': ['a', 'b', 'b'], 'mes': [2, 1, 3]})
+        res = agregar_costo_total(self.costos, aplicaciones, ['troux_uid', 'mes'],
+                                  ['unblended_cost', 'amortized_cost'], decimales=None)
+        self.assertEqual(res['costo_total_unblended_cost'].tolist()[:2], [2.0, 7.0])
+        self.assertEqual(res['costo_total_amortized_cost'].tolist()[:2], [1.0, 2.0])
+        self.assertTrue(np.isnan(res['costo_total_unblended_cost'].iloc[2]))
+
+        resumen = resumir_costos(self.costos, ['troux_uid', 'mes'], 'unblended_cost', decimales=None)
+        self.assertEqual(resumen.loc[('a', 1), 'unblended_cost'], 1.004)
+
+
+class TestAgruparPorBloques(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 20_000
+        self.df = pd.DataFrame({
+            'uid': rng.integers(0, 2_000, n),
+            'mes': rng.choice(['ene', 'feb', 'mar'], n),
+            'costo': np.where(rng.random(n) < 0.05, np.nan, rng.random(n)),
+        })
+        self.funciones = ['sum', 'count', 'min', 'max', 'mean']
+
+    def test_igual_en_memoria_y_con_volcado(self):
+        esperado = agrupar_y_agregar(self.df, ['uid', 'mes'], 'costo', self.funciones)
+        bloques = [self.df.iloc[i:i + 3_000] for i in range(0, len(self.df), 3_000)]
+        for max_grupos in (10**9, 500):
+            res = agrupar_y_agregar_por_bloques(bloques, ['uid', 'mes'], 'costo', self.funciones,
+                                                max_grupos_memoria=max_grupos)
+            pd.testing.assert_frame_equal(res, esperado)
+
+    def test_desde_csv(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'costos.csv')
+            self.df.to_csv(ruta, index=False)
+            res = agrupar_y_agregar_por_bloques(ruta, 'uid', 'costo', ['mean'], tamano_bloque=4_000,
+                                                max_grupos_memoria=1_000, carpeta_temporal=carpeta)
+            self.assertEqual(os.listdir(carpeta), ['costos.csv'])
+        pd.testing.assert_frame_equal(res, agrupar_y_agregar(self.df, 'uid', 'costo', ['mean']))
+
+    def test_funcion_no_combinable(self):
+        with self.assertRaises(ValueError):
+            agrupar_y_agregar_por_bloques([self.df], 'uid', 'costo', ['median'])
+
+
+class TestDividirRegistrosMultiple(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({'Recursos': ['Ana, Luis', 'Eva', None, 'a,b,c'],
+                                'Porcentajes': ['10,20', '30', '5', '1,2'],
+                                'Codigo': [1, 2, 3, 4]})
+        self.config = {'Recursos': 'Recurso', 'Porcentajes': 'Porcentaje'}
+
+    def test_modo_pareado(self):
+        res = dividir_registros_multiple(self.df, self.config, modo='pareado')
+        self.assertEqual(res['Recurso'].tolist()[:3], ['Ana', 'Luis', 'Eva'])
+        self.assertEqual(res['Porcentaje'].tolist()[:3], ['10', '20', '30'])
+        self.assertEqual(res['Codigo'].tolist(), [1, 1, 2, 3, 4, 4, 4])
+        self.assertTrue(pd.isna(res['Recurso'].iloc[3]))
+        self.assertTrue(pd.isna(res['Porcentaje'].iloc[6]))
+
+    def test_estimacion_y_limite(self):
+        for modo in ('cartesiano', 'pareado'):
+            estimadas = estimar_filas_dividir(self.df, self.config, modo=modo)
+            self.assertEqual(estimadas, len(dividir_registros_multiple(self.df, self.config, modo=modo)))
+        with self.assertRaises(ValueError):
+            dividir_registros_multiple(self.df, self.config, max_crecimiento=2)
+        res = dividir_registros_multiple(self.df, self.config, modo='pareado', max_crecimiento=2)
+        self.assertEqual(len(res), 7)
+
+
+class TestLimpiarColumnas(unittest.TestCase):
+    def test_combinado_igual_que_por_regla(self):
+        df = pd.DataFrame({'Costo': ['$ 1,234.50 ', 'acb', None, '  $$7 '],
+                           'Nombre': [' Ana. ', 'Luis--', 'x', 'Eva']})
+        reglas = [
+            {'columna': 'Costo', 'tipo': 'replace', 'patron': 'c'},
+            {'columna': 'Costo', 'tipo': 'replace', 'patron': 'ab'},
+            {'columna': 'Costo', 'tipo': 'regex', 'patron': r'[$,]'},
+            {'columna': 'Costo', 'tipo': 'regex', 'patron': r'\s+'},
+            {'columna': 'Nombre', 'tipo': 'regex', 'patron': r'-+$'},
+            {'columna': 'Nombre', 'tipo': 'replace', 'patron': '.'},
+        ]
+        combinado = limpiar_columnas(df, reglas)
+        pd.testing.assert_frame_equal(combinado, limpiar_columnas(df, reglas, combinar=False))
+        # 'acb' -> quitar 'c' deja 'ab', que la regla siguiente también elimina
+        self.assertEqual(combinado['Costo'].tolist()[:2], ['1234.50', ''])
+        self.assertEqual(combinado['Nombre'].tolist(), ['Ana', 'Luis', 'x', 'Eva'])
+
+
+class TestAplicarPorUnicos(unittest.TestCase):
+    def test_serie_y_dataframe(self):
+        serie = pd.Series(['a|b', None, 'a|b', 'c', 'c', 'a|b'], index=[5, 4, 3, 2, 1, 0])
+        llamadas = []
+
+        def separar(valores):
+            llamadas.append(len(valores))
+            return valores.str.split('|', expand=True)
+
+        pd.testing.assert_frame_equal(aplicar_por_unicos(serie, separar, max_proporcion=None), separar(serie))
+        self.assertEqual(llamadas[0], 3)
+        mayus = aplicar_por_unicos(serie, lambda v: v.str.upper())
+        pd.testing.assert_series_equal(mayus, serie.str.upper())
+
+    def test_nulos_mezclados(self):
+        serie = pd.Series(['a', None, np.nan, 'a', None, np.nan, 'b'], dtype=object)
+        for funcion in (lambda v: v.astype(str), lambda v: v.map(repr)):
+            pd.testing.assert_series_equal(aplicar_por_unicos(serie, funcion, max_proporcion=None), funcion(serie))
+
+    def test_opcion_en_las_funciones(self):
+        df = pd.DataFrame({'R': ['Ana [50%]', None, 'Ana [50%]', 'Eva'] * 3,
+                           'E': ['P | J | C', '', None, 'P|J|C|O|mas'] * 3})
+        pd.testing.assert_frame_equal(agregar_columnas_porcentaje_v1(df.copy(), 'R', por_unicos=True),
+                                      agregar_columnas_porcentaje_v1(df.copy(), 'R'))
+        pd.testing.assert_frame_equal(separar_recursos_externos(df.copy(), 'E', por_unicos=True),
+                                      separar_recursos_externos(df.copy(), 'E'))
+        pd.testing.assert_frame_equal(limpiar_columna(df.copy(), 'R', '[', por_unicos=True),
+                                      limpiar_columna(df.copy(), 'R', '['))
+
+
+class TestExtraerPorcentajes(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({'Codigo': ['P1', 'P2', 'P3', 'P4', 'P5'],
+                                'RecursosInternos': ['Ana Ruiz [50%], Luis [12.5%]', None, 'Eva',
+                                                     'Eva, Juan [ 30 ]', 'Pedro [12,5 %],Ana Ruiz [50%]']},
+                               index=[10, 11, 12, 13, 14])
+
+    def test_tabla_larga(self):
+        largo = extraer_porcentajes(self.df)
+        self.assertEqual(largo['fila'].tolist(), [10, 10, 13, 14, 14])
+        self.assertEqual(largo['Recurso'].tolist(), ['Ana Ruiz', 'Luis', 'Juan', 'Pedro', 'Ana Ruiz'])
+        self.assertEqual(largo['Porcentaje'].tolist(), ['50%', '12.5%', '30', '12,5%', '50%'])
+        np.testing.assert_allclose(largo['ValorPorcentaje'], [0.5, 0.125, 0.3, 0.125, 0.5])
+
+    def test_unir_y_separador_propio(self):
+        unido = extraer_porcentajes(self.df, unir=True)
+        self.assertEqual(unido['Codigo'].tolist(), ['P1', 'P1', 'P2', 'P3', 'P4', 'P5', 'P5'])
+        self.assertTrue(unido['Recurso'].iloc[2:4].isna().all())
+        sin_vacias = extraer_porcentajes(self.df, unir=True, conservar_sin_porcentaje=False)
+        self.assertEqual(sin_vacias['Codigo'].tolist(), ['P1', 'P1', 'P4', 'P5', 'P5'])
+        pd.testing.assert_frame_equal(extraer_porcentajes(self.df, conservar_sin_porcentaje=False),
+                                      extraer_porcentajes(self.df))
+
+        df = pd.DataFrame({'R': ['Eva ;Pedro [12,5 %] ;Juan[30]']})
+        self.assertEqual(extraer_porcentajes(df, 'R', separador=' ;')['Recurso'].tolist(), ['Pedro', 'Juan'])
+
+    def test_v1_conserva_nulos_y_decimales(self):
+        res = agregar_columnas_porcentaje_v1(self.df.copy())
+        self.assertTrue(pd.isna(res['RecursosInternos'].iloc[1]))
+        # Mismo texto que en extraer_porcentajes: sin espacios internos
+        self.assertEqual(res['PorcentajeAsignacion'].iloc[4], '12,5%')
+        np.testing.assert_allclose(res['ValorPorcentajeAsignacion'], [0.5, np.nan, np.nan, 0.3, 0.125])
+
+
+class TestSepararNombresApellidos(unittest.TestCase):
+    def test_casos(self):
+        df = pd.DataFrame({'Nombres': ['Pérez Gómez, Juan Carlos', 'de la Fuente García, Ana',
+                                       'García del Valle, Luis', 'Ruiz, Eva', 'San Martín Soto María José',
+                                       'López', None]})
+        res = separar_nombres_apellidos(df)
+        self.assertEqual(res['Apellido1'].tolist()[:6],
+                         ['Pérez', 'de la Fuente', 'García', 'Ruiz', 'San Martín', 'López'])
+        self.assertEqual(res['Apellido2'].tolist(), ['Gómez', 'García', 'del Valle', '', 'Soto', '', ''])
+        self.assertEqual(res['Nombre1'].tolist()[:5], ['Juan', 'Ana', 'Luis', 'Eva', 'María'])
+        self.assertEqual(res['Nombre2'].tolist(), ['Carlos', '', '', '', 'José', '', ''])
+        self.assertTrue(res['Nombre1'].iloc[5:].isna().all())
+        self.assertEqual(list(df.columns), ['Nombres'])
+
+    def test_sin_coincidencia_como_split(self):
+        df = pd.DataFrame({'Nombres': ['Pérez, Ana, María', '', 'Pérez Gómez; Ana']})
+        res = separar_nombres_apellidos(df)
+        self.assertEqual(res['Apellido1'].tolist(), ['Pérez', '', 'Pérez'])
+        self.assertEqual(res['Apellido2'].tolist(), ['', '', 'Gómez; Ana'])
+        self.assertEqual(res['Nombre1'].tolist()[0], 'Ana,')
+        self.assertTrue(res['Nombre1'].iloc[1:].isna().all())
+        self.assertEqual(res['Nombre2'].tolist(), ['María', '', ''])
+        # Ninguna fila sin coincidencia tiene coma
+        res = separar_nombres_apellidos(pd.DataFrame({'Nombres': ['', 'Pérez Gómez; Ana', 'Ruiz, Eva']}))
+        self.assertEqual(res['Apellido2'].tolist(), ['', 'Gómez; Ana', ''])
+        self.assertEqual(res['Nombre1'].tolist()[2], 'Eva')
+
+    def test_patron_sin_retroceso_exponencial(self):
+        arrow = re.compile(_PATRON_NOMBRES_ARROW)
+        for valor in ['Pérez Gómez, Juan Carlos', 'de la Fuente García, Ana', 'San Martín Soto María José',
+                      'García de la, Ana', 'Fuente de ,Ana', 'de de x, y z', 'de la de', ' López ', 'a, b; c']:
+            coincide, esperado = _PATRON_NOMBRES.match(valor), arrow.match(valor)
+            self.assertEqual(coincide and coincide.groupdict(), esperado and esperado.groupdict(), valor)
+        inicio = time.perf_counter()
+        for valor in ('de ' * 200 + ';', 'de ' * 200 + ',;', 'de' + ' ' * 2000 + 'x;'):
+            self.assertIsNone(_PATRON_NOMBRES.match(valor))
+        self.assertLess(time.perf_counter() - inicio, 1)
+
+    def test_conserva_tipo_de_texto(self):
+        for dtype in (object, 'string'):
+            df = pd.DataFrame({'Nombres': pd.Series(['Ruiz, Eva', None], dtype=dtype)})
+            res = separar_nombres_apellidos(df)
+            for columna in ('Apellido1', 'Apellido2', 'Nombre1', 'Nombre2'):
+                self.assertEqual(res[columna].dtype, df['Nombres'].dtype)
+
+
+class TestGuardarColumnasCsv(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({'uid': ['a', 'b, c', 'é'], 'costo': [1.5, np.nan, 2.0], 'otra': [1, 2, 3]})
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_formatos_y_bloques(self):
+        bloques = [self.df.iloc[:2], self.df.iloc[2:]]
+        for nombre in ('s.csv', 's.csv.gz', 's.csv.bz2', 's.zip', 's.parquet'):
+            ruta = guardar_columnas_csv(iter(bloques), ['uid', 'costo', 'falta'], nombre, self.carpeta.name)
+            leido = pd.read_parquet(ruta) if nombre.endswith('.parquet') else pd.read_csv(ruta, encoding='utf-8-sig')
+            pd.testing.assert_frame_equal(leido, self.df[['uid', 'costo']])
+        ruta = guardar_columnas_csv(self.df, ['uid', 'costo'], 'p.csv', self.carpeta.name, motor='pyarrow')
+        pd.testing.assert_frame_equal(pd.read_csv(ruta, encoding='utf-8-sig'), self.df[['uid', 'costo']])
+
+    def test_parquet_con_columna_nula_en_el_primer_bloque(self):
+        bloques = [pd.DataFrame({'uid': [None, None], 'costo': [np.nan, np.nan]}),
+                   pd.DataFrame({'uid': [None], 'costo': [np.nan]}),
+                   pd.DataFrame({'uid': ['a'], 'costo': ['x']})]
+        ruta = guardar_columnas_csv(iter(bloques), ['uid', 'costo'], 'n.parquet', self.carpeta.name)
+        leido = pd.read_parquet(ruta)
+        self.assertEqual(len(leido), 4)
+        self.assertEqual(leido['uid'].tolist()[3], 'a')
+        self.assertEqual(leido['costo'].tolist()[3], 'x')
+        self.assertTrue(leido.iloc[:3].isna().all().all())
+
+    def test_pyarrow_entrecomilla_textos(self):
+        ruta = guardar_columnas_csv(self.df, ['uid', 'costo'], 'q.csv', self.carpeta.name, motor='pyarrow')
+        with open(ruta, encoding='utf-8-sig') as f:
+            self.assertEqual(f.read().splitlines(), ['uid,costo', '"a",1.5', '"b, c",', '"é",2'])
+
+    def test_escritura_atomica(self):
+        ruta = guardar_columnas_csv(self.df, ['uid'], 'a.csv', self.carpeta.name)
+
+        def bloques():
+            yield self.df
+            raise RuntimeError("fallo a mitad de la escritura")
+
+        with self.assertRaises(RuntimeError):
+            guardar_columnas_csv(bloques(), ['costo'], 'a.csv', self.carpeta.name)
+        self.assertEqual(os.listdir(self.carpeta.name), ['a.csv'])
+        self.assertEqual(list(pd.read_csv(ruta, encoding='utf-8-sig').columns), ['uid'])
+
+    def test_varios_en_paralelo(self):
+        trabajos = [{'df': self.df, 'columnas': ['uid'], 'nombre_archivo': f'{k}.csv.gz',
+                     'carpeta': self.carpeta.name} for k in range(4)]
+        rutas = guardar_varios_csv(trabajos, max_hilos=2)
+        self.assertEqual([os.path.basename(r) for r in rutas], [f'{k}.csv.gz' for k in range(4)])
+        with self.assertRaises(ValueError):
+            guardar_varios_csv(trabajos + trabajos[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
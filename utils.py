@@ -1,20 +1,231 @@
 import pandas as pd
+import numpy as np
+import bz2
+import codecs
+import contextlib
+import csv
+import gzip
+import hashlib
+import io
+import lzma
+import os
 import re
+import shutil
+import tempfile
+import tracemalloc
+import uuid
+import weakref
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain
+
+try:
+    import pyarrow  # Opcional: acelera las operaciones de texto y habilita Parquet/Feather
+except ImportError:
+    pyarrow = None
+
+from agregados_parciales import (AcumuladorParciales, agregados_parciales, asignar_por_claves,
+                                 combinar_parciales, finalizar_parciales, parciales_necesarios)
+
+def _detectar_formato_csv(ruta_csv, bytes_muestra=64 * 1024):
+    """
+    Detecta separador y codificación de un CSV a partir de sus primeros KB.
+
+    Retorna:
+    - tuple: (separador, codificación). Si no se puede detectar el separador se usa ','.
+    """
+    with open(ruta_csv, 'rb') as archivo:
+        muestra = archivo.read(bytes_muestra)
+
+    if muestra.startswith(codecs.BOM_UTF8):
+        codificacion = 'utf-8-sig'
+    else:
+        try:
+            muestra.decode('utf-8')
+            codificacion = 'utf-8'
+        except UnicodeDecodeError as e:
+            # Un carácter multibyte cortado al final de la muestra no invalida UTF-8
+            codificacion = 'utf-8' if e.start >= len(muestra) - 3 else 'latin-1'
+
+    texto = muestra.decode(codificacion, errors='ignore')
+    if len(muestra) == bytes_muestra and '\n' in texto:
+        texto = texto[:texto.rindex('\n')]
+    try:
+        separador = csv.Sniffer().sniff(texto, delimiters=',;\t|').delimiter
+    except csv.Error:
+        separador = ','
+    return separador, codificacion
+
 
-def cargar_archivo(ruta_csv):
+def _formatear_bytes(num_bytes):
+    """Convierte un tamaño en bytes a un texto legible (KB, MB, GB)."""
+    for unidad in ('B', 'KB', 'MB', 'GB'):
+        if abs(num_bytes) < 1024 or unidad == 'GB':
+            return f"{num_bytes:.1f} {unidad}" if unidad != 'B' else f"{num_bytes} B"
+        num_bytes /= 1024
+
+
+def _bloques_pyarrow(ruta_csv, tamano_bloque, sep, encoding, usecols):
+    """Lee el CSV en streaming con pyarrow.csv y genera DataFrames de `tamano_bloque` filas."""
+    from pyarrow import csv as pa_csv
+
+    lector = pa_csv.open_csv(
+        ruta_csv,
+        read_options=pa_csv.ReadOptions(encoding='utf8' if encoding.startswith('utf-8') else encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(include_columns=list(usecols) if usecols else None),
+    )
+    pendientes, filas_pendientes = [], 0
+    for lote in lector:
+        pendientes.append(lote)
+        filas_pendientes += lote.num_rows
+        while filas_pendientes >= tamano_bloque:
+            tabla = pyarrow.Table.from_batches(pendientes)
+            yield tabla.slice(0, tamano_bloque).to_pandas()
+            pendientes = tabla.slice(tamano_bloque).to_batches()
+            filas_pendientes -= tamano_bloque
+    if filas_pendientes:
+        yield pyarrow.Table.from_batches(pendientes).to_pandas()
+
+
+def leer_csv_por_bloques(ruta_csv, tamano_bloque=100_000, sep=None, encoding=None, usecols=None,
+                         dtype=None, motor=None, reportar=False, metricas=None):
+    """
+    Lee un CSV por bloques para procesar archivos que no caben en memoria.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del archivo CSV.
+    - tamano_bloque (int): Número de filas por bloque.
+    - sep (str): Separador (si None, se detecta a partir de los primeros KB).
+    - encoding (str): Codificación (si None, se detecta a partir de los primeros KB).
+    - usecols (list): Columnas a leer; el resto no se carga.
+    - dtype (dict): Tipos de dato por columna.
+    - motor (str): None para el lector de pandas o 'pyarrow' para el lector en streaming de pyarrow.
+    - reportar (bool): Si es True, imprime filas y bytes de cada bloque (y el pico de memoria
+                       si también se piden métricas).
+    - metricas (list): Lista opcional donde se agrega un diccionario de métricas por bloque.
+                       Solo en este caso se activa tracemalloc, que hace más lenta la lectura
+                       y mide únicamente la memoria de Python (no la de Arrow ni la de C).
+
+    Retorna:
+    - Generador de pd.DataFrame, con índice continuo entre bloques.
+    """
+    if sep is None or encoding is None:
+        sep_detectado, encoding_detectado = _detectar_formato_csv(ruta_csv)
+        sep = sep or sep_detectado
+        encoding = encoding or encoding_detectado
+
+    medir_memoria = metricas is not None
+    iniciar_tracemalloc = medir_memoria and not tracemalloc.is_tracing()
+    if iniciar_tracemalloc:
+        tracemalloc.start()
+
+    try:
+        with open(ruta_csv, 'rb') as archivo:
+            if motor == 'pyarrow':
+                if pyarrow is None:
+                    raise ImportError("⚠️ El motor 'pyarrow' requiere instalar pyarrow.")
+                bloques = _bloques_pyarrow(archivo, tamano_bloque, sep, encoding, usecols)
+            else:
+                bloques = pd.read_csv(archivo, sep=sep, encoding=encoding, usecols=usecols,
+                                      dtype=dtype, chunksize=tamano_bloque)
+
+            numero, filas_leidas, posicion = 0, 0, 0
+            while True:
+                if medir_memoria:
+                    tracemalloc.reset_peak()
+                bloque = next(bloques, None)
+                if bloque is None:
+                    break
+                if motor == 'pyarrow':
+                    bloque.index = pd.RangeIndex(filas_leidas, filas_leidas + len(bloque))
+                    if dtype:
+                        bloque = bloque.astype(dtype)
+
+                numero += 1
+                filas_leidas += len(bloque)
+                bytes_leidos = archivo.tell() - posicion
+                posicion = archivo.tell()
+
+                if medir_memoria or reportar:
+                    metrica = {
+                        'bloque': numero,
+                        'filas': len(bloque),
+                        'bytes_leidos': bytes_leidos,
+                        'bytes_memoria': int(bloque.memory_usage(deep=False).sum()),
+                    }
+                    if medir_memoria:
+                        metrica['pico_memoria'] = tracemalloc.get_traced_memory()[1]
+                        metricas.append(metrica)
+                    if reportar:
+                        pico = (f", pico {_formatear_bytes(metrica['pico_memoria'])}"
+                                if medir_memoria else "")
+                        print(f"Bloque {numero}: {metrica['filas']} filas, "
+                              f"{_formatear_bytes(metrica['bytes_leidos'])} leídos, "
+                              f"{_formatear_bytes(metrica['bytes_memoria'])} en memoria{pico}")
+                yield bloque
+    finally:
+        if iniciar_tracemalloc:
+            tracemalloc.stop()
+
+
+def cargar_archivo(ruta_csv, sep=None, encoding=None, usecols=None, dtype=None, motor=None,
+                   tamano_bloque=None, cache=None, compactar=False, reportar=False, metricas=None):
     """
     Lee un archivo CSV y lo carga en un DataFrame.
     
     Parámetros:
         ruta_csv (str): Ruta del archivo CSV.
+        sep (str): Separador (si None, se detecta a partir de los primeros KB).
+        encoding (str): Codificación (si None, se detecta a partir de los primeros KB).
+        usecols (list): Columnas a leer; el resto no se carga.
+        dtype (dict): Tipos de dato por columna.
+        motor (str): None para el lector de pandas o 'pyarrow' (requiere pyarrow).
+        tamano_bloque (int): Si se indica, retorna un generador de bloques de ese número
+                             de filas (ver `leer_csv_por_bloques`). No admite caché.
+        cache (CacheColumnar): Caché en disco opcional (ver cache_columnar.py). Si el
+                               archivo y las opciones no cambiaron, se lee de la caché.
+        compactar (bool): Si es True, aplica `compactar_memoria` al DataFrame leído (o a
+                          cada bloque; las categorías pueden diferir entre bloques).
+        reportar (bool): Solo por bloques: imprime filas y bytes de cada bloque.
+        metricas (list): Solo por bloques: lista donde se agregan las métricas de cada bloque.
     
     Retorna:
-        pd.DataFrame: DataFrame con los datos del inventario.
+        pd.DataFrame: DataFrame con los datos del inventario (o generador de bloques).
     """
+    if tamano_bloque:
+        if cache is not None:
+            raise ValueError("⚠️ La caché no se puede usar con tamano_bloque: "
+                             "cargue el archivo completo o lea los bloques sin caché.")
+        bloques = leer_csv_por_bloques(ruta_csv, tamano_bloque, sep=sep, encoding=encoding,
+                                       usecols=usecols, dtype=dtype, motor=motor,
+                                       reportar=reportar, metricas=metricas)
+        if compactar:
+            return (compactar_memoria(bloque, inplace=True, reportar=False) for bloque in bloques)
+        return bloques
+
+    def leer():
+        # Detectar separador (tabulación, coma, punto y coma...) y codificación
+        sep_lectura, encoding_lectura = sep, encoding
+        if sep is None or encoding is None:
+            sep_detectado, encoding_detectado = _detectar_formato_csv(ruta_csv)
+            sep_lectura = sep or sep_detectado
+            encoding_lectura = encoding or encoding_detectado
+        return pd.read_csv(ruta_csv, sep=sep_lectura, encoding=encoding_lectura,
+                           usecols=usecols, dtype=dtype, engine=motor)
+
     try:
-        # Leer el CSV con separador adecuado (tabulación o coma)
-        df = pd.read_csv(ruta_csv, sep=',', encoding='utf-8')
+        if cache is not None:
+            opciones = {'tipo': 'csv', 'sep': sep, 'encoding': encoding, 'usecols': usecols, 'dtype': dtype,
+                        'motor': motor}
+            df = cache.obtener(ruta_csv, opciones, leer)
+            cache.sincronizar()
+        else:
+            df = leer()
+        if compactar:
+            df = compactar_memoria(df, inplace=True)
         
         # Mostrar información básica
         print("Archivo cargado correctamente.")
@@ -28,11 +239,156 @@ def cargar_archivo(ruta_csv):
 
 
 
-def limpiar_columna(df, columna, reemplazo, default=""):
+def _copy_on_write_activo():
+    """True si pandas usa Copy-on-Write (siempre en pandas>=3; opcional en pandas 2)."""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except (KeyError, pd.errors.OptionError):
+        return False
+
+
+def _copia_para_escribir(df, inplace=False):
+    """
+    Retorna el DataFrame sobre el que una función debe escribir sus resultados:
+    - inplace=True: el propio df (sin copia).
+    - Con Copy-on-Write activo: una copia superficial; las columnas que no se
+      modifican siguen compartiendo memoria con df y no se duplican.
+    - En otro caso: una copia completa, como hasta ahora.
+    """
+    if inplace:
+        return df
+    return df.copy(deep=not _copy_on_write_activo())
+
+
+def compactar_memoria(df, umbral_categoria=0.5, texto_arrow=True, reducir_flotantes=True,
+                      inplace=False, reportar=True):
+    """
+    Reduce la memoria de un DataFrame recién cargado:
+    - Texto con pocos valores distintos (uid, TipoRequerimiento, extension...) -> category.
+    - Resto del texto -> cadenas respaldadas por Arrow (si pyarrow está instalado).
+    - Enteros -> el tipo entero más pequeño que admite sus valores.
+    - Flotantes -> float32 solo si todos los valores se representan exactamente.
+
+    Las funciones de este módulo que escriben en una columna category (reemplazar_nulos,
+    separar_nombres_apellidos...) agregan la categoría o devuelven texto; al asignar valores
+    nuevos a mano, agregue antes la categoría (serie.cat.add_categories). Los nulos de una
+    columna category son NaN (un None original se lee como NaN).
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame original.
+    - umbral_categoria (float): Proporción máxima de valores distintos respecto a las
+                                filas para convertir una columna de texto en category.
+    - texto_arrow (bool): Si es False, el texto con muchos valores distintos no se convierte.
+    - reducir_flotantes (bool): Si es False, no se reducen las columnas flotantes.
+    - inplace (bool): Si es True, convierte las columnas sobre df sin copiarlo.
+    - reportar (bool): Si es True, imprime la memoria antes y después.
+
+    Retorna:
+    - pd.DataFrame: DataFrame con los tipos compactados.
+    """
+    df_resultado = _copia_para_escribir(df, inplace)
+    antes = int(df_resultado.memory_usage(deep=True).sum()) if reportar else 0
+    cambios = {}
+
+    for col in df_resultado.columns:
+        serie = df_resultado[col]
+        tipo = serie.dtype
+
+        if isinstance(tipo, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(tipo):
+            continue
+        if pd.api.types.is_object_dtype(tipo) or pd.api.types.is_string_dtype(tipo):
+            if pd.api.types.infer_dtype(serie, skipna=True) not in ('string', 'empty'):
+                continue  # Tipos mezclados: convertirlos cambiaría los valores
+            if len(serie) and serie.nunique() <= umbral_categoria * len(serie):
+                nuevo = serie.astype('category')
+            elif texto_arrow and pyarrow is not None and getattr(tipo, 'storage', None) != 'pyarrow':
+                nuevo = serie.astype('string[pyarrow]')
+            else:
+                continue
+        elif pd.api.types.is_integer_dtype(tipo) and isinstance(tipo, np.dtype):
+            nuevo = pd.to_numeric(serie, downcast='integer')
+        elif pd.api.types.is_float_dtype(tipo) and isinstance(tipo, np.dtype) and reducir_flotantes:
+            reducido = serie.astype('float32')
+            if not np.array_equal(reducido.to_numpy(dtype='float64'), serie.to_numpy(), equal_nan=True):
+                continue
+            nuevo = reducido
+        else:
+            continue
+
+        if nuevo.dtype != tipo:
+            df_resultado[col] = nuevo
+            cambios[col] = f"{tipo} -> {nuevo.dtype}"
+
+    if reportar:
+        despues = int(df_resultado.memory_usage(deep=True).sum())
+        print(f"Memoria: {_formatear_bytes(antes)} -> {_formatear_bytes(despues)} "
+              f"({antes / despues if despues else 0:.1f}x menos)")
+        for col, cambio in cambios.items():
+            print(f"  {col}: {cambio}")
+
+    return df_resultado
+
+
+def aplicar_por_unicos(serie, funcion, max_proporcion=0.5):
+    """
+    Aplica una transformación solo sobre los valores distintos de una Serie y
+    reparte el resultado a cada fila (pd.factorize -> funcion(únicos) -> take).
+
+    En columnas con muchas repeticiones (nombres, recursos, fechas) el costo pasa a
+    depender del número de valores distintos y no del de filas. La función debe
+    tratar cada celda por separado (no puede depender de las demás filas); los
+    nulos se le pasan como un valor más, uno por cada tipo de nulo de la Serie (en
+    columnas object, None y NaN llegan por separado, como en la Serie original).
+
+    Parámetros:
+    - serie (pd.Series): Serie a transformar.
+    - funcion (callable): Recibe una Serie con los valores distintos y retorna una
+                          Serie o un DataFrame con una fila por valor.
+    - max_proporcion (float): Si los valores distintos superan esta proporción de las
+                              filas, se aplica la función directamente a la Serie
+                              (el resultado es el mismo). None para factorizar siempre.
+
+    Retorna:
+    - pd.Series o pd.DataFrame con el índice de la Serie original.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    if max_proporcion is not None and len(unicos) > max_proporcion * len(serie):
+        return funcion(serie)
+
+    unicos = pd.Series(unicos, name=serie.name)
+    if unicos.dtype == object:
+        # factorize unifica los nulos (None, NaN, pd.NA...) en uno solo, pero la función
+        # puede tratarlos distinto (astype(str) da 'None' y 'nan'): separar cada tipo de
+        # nulo en su propio valor único con el objeto original
+        nulos = np.flatnonzero(pd.isna(unicos.to_numpy()))
+        if len(nulos):
+            filas = np.flatnonzero(codigos == nulos[0])
+            valores = serie.to_numpy(dtype=object)[filas]
+            tipos, clases = pd.factorize(np.array([type(v).__name__ for v in valores], dtype=object))
+            primeros = np.unique(tipos, return_index=True)[1]
+            unicos.iloc[nulos[0]] = valores[primeros[0]]
+            if len(clases) > 1:
+                codigos = codigos.copy()
+                for tipo in range(1, len(clases)):
+                    codigos[filas[tipos == tipo]] = len(unicos) + tipo - 1
+                unicos = pd.concat([unicos, pd.Series(valores[primeros[1:]], dtype=object, name=serie.name)],
+                                   ignore_index=True)
+
+    resultado = funcion(unicos)
+    return resultado.take(codigos).set_axis(serie.index)
+
+
+def limpiar_columna(df, columna, reemplazo, default="", por_unicos=False):
     """
     Elimina caracteres no deseados de una columna.
+    Con por_unicos=True el reemplazo se hace una vez por valor distinto.
     """
-    df[columna] = df[columna].astype(str).str.replace(reemplazo, default, regex=False)
+    def reemplazar(serie):
+        return serie.astype(str).str.replace(reemplazo, default, regex=False)
+
+    df[columna] = aplicar_por_unicos(df[columna], reemplazar) if por_unicos else reemplazar(df[columna])
     return df
 
 def convertir_a_numerico(df, columna, decimales=2):
@@ -45,10 +401,19 @@ def convertir_a_numerico(df, columna, decimales=2):
 def reemplazar_nulos(df, columna, valor_por_defecto):
     """
     Reemplaza valores nulos en una columna por un valor por defecto.
+    En columnas category (compactar_memoria) el valor se agrega antes como categoría.
     """
-    df[columna] = df[columna].fillna(valor_por_defecto)
+    df[columna] = _con_categoria(df[columna], valor_por_defecto).fillna(valor_por_defecto)
     return df
 
+
+def _con_categoria(serie, valor):
+    """Si serie es category y valor no es una de sus categorías, la agrega (sin copiar los códigos)."""
+    if (isinstance(serie.dtype, pd.CategoricalDtype) and not pd.isna(valor)
+            and valor not in serie.cat.categories):
+        return serie.cat.add_categories([valor])
+    return serie
+
 def agrupar_y_agregar(df, columnas_agrupacion, columna_valor, funciones=['sum']):
     """
     Agrupa un DataFrame por una o más columnas y aplica funciones agregadas sobre otra columna.
@@ -65,6 +430,108 @@ def agrupar_y_agregar(df, columnas_agrupacion, columna_valor, funciones=['sum'])
     resultado = df.groupby(columnas_agrupacion)[columna_valor].agg(funciones).reset_index()
     return resultado
 
+def _particion_claves(parciales, num_particiones):
+    """Número de partición (por hash de las claves) de cada fila de parciales."""
+    claves = parciales.index.to_frame(index=False)
+    return (pd.util.hash_pandas_object(claves, index=False).to_numpy() % num_particiones).astype(np.intp)
+
+
+def _bloques_fuente(fuente, columnas, tamano_bloque, opciones_lectura):
+    """Itera los bloques de una ruta CSV, de un DataFrame o de un iterable de DataFrames."""
+    if isinstance(fuente, (str, os.PathLike)):
+        return leer_csv_por_bloques(fuente, tamano_bloque=tamano_bloque, usecols=columnas,
+                                    reportar=False, **opciones_lectura)
+    if isinstance(fuente, pd.DataFrame):
+        return iter([fuente])
+    return iter(fuente)
+
+
+def agrupar_y_agregar_por_bloques(fuente, columnas_agrupacion, columna_valor, funciones=['sum'],
+                                  tamano_bloque=1_000_000, max_grupos_memoria=5_000_000,
+                                  num_particiones=16, carpeta_temporal=None, **opciones_lectura):
+    """
+    Versión de `agrupar_y_agregar` para datos que no caben en memoria: procesa la
+    fuente por bloques y mantiene solo agregados parciales combinables.
+
+    Si los grupos acumulados superan `max_grupos_memoria`, los parciales se vuelcan
+    a disco repartidos por hash de las claves en `num_particiones` particiones, que
+    al final se combinan una a una (cada grupo cae siempre en la misma partición).
+
+    Parámetros:
+    - fuente (str | pd.DataFrame | iterable): Ruta de un CSV o iterable de DataFrames.
+    - columnas_agrupacion (str | list): Columna(s) por las que se agrupa.
+    - columna_valor (str): Columna sobre la que se aplican las funciones.
+    - funciones (list): Subconjunto de 'sum', 'count', 'min', 'max' y 'mean'.
+    - tamano_bloque (int): Filas por bloque al leer un CSV.
+    - max_grupos_memoria (int): Grupos acumulados a partir de los cuales se vuelca a disco.
+    - num_particiones (int): Particiones del volcado a disco.
+    - carpeta_temporal (str): Carpeta del volcado (por defecto la del sistema); se borra al terminar.
+    - **opciones_lectura: sep, encoding, dtype o motor para `leer_csv_por_bloques`.
+                          Las claves deben tener el mismo tipo en todos los bloques
+                          (use dtype si un bloque puede inferir otro tipo).
+
+    Retorna:
+    - DataFrame con el mismo resultado que `agrupar_y_agregar` (ordenado por las claves).
+    """
+    claves = [columnas_agrupacion] if isinstance(columnas_agrupacion, str) else list(columnas_agrupacion)
+    parciales = parciales_necesarios(funciones)
+    bloques = _bloques_fuente(fuente, claves + [columna_valor], tamano_bloque, opciones_lectura)
+
+    acumulador = AcumuladorParciales(filas_minimas=min(1_000_000, max_grupos_memoria))
+    carpeta = None
+    volcados = 0
+    try:
+        for bloque in bloques:
+            acumulador.agregar(agregados_parciales(bloque, claves, columna_valor, parciales))
+            if acumulador.filas > max_grupos_memoria:
+                # Combinar antes de decidir: los pendientes pueden repetir claves
+                acumulado = acumulador.combinar()
+                if acumulado is not None and len(acumulado) > max_grupos_memoria:
+                    if carpeta is None:
+                        carpeta = tempfile.mkdtemp(prefix='agregados_', dir=carpeta_temporal)
+                    _volcar_particiones(acumulado, carpeta, num_particiones, volcados)
+                    volcados += 1
+                    acumulador.vaciar()
+
+        acumulado = acumulador.combinar()
+        if carpeta is None:
+            if acumulado is None:
+                return pd.DataFrame(columns=claves + list(funciones))
+            finales = [finalizar_parciales(acumulado, funciones)]
+        else:
+            if acumulado is not None:
+                _volcar_particiones(acumulado, carpeta, num_particiones, volcados)
+                volcados += 1
+            finales = []
+            for particion in range(num_particiones):
+                rutas = [_ruta_particion(carpeta, particion, k) for k in range(volcados)]
+                partes = [pd.read_pickle(ruta) for ruta in rutas if os.path.exists(ruta)]
+                combinados = combinar_parciales(partes)
+                if combinados is not None:
+                    finales.append(finalizar_parciales(combinados, funciones))
+    finally:
+        if carpeta is not None:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    resultado = pd.concat(finales) if len(finales) > 1 else finales[0]
+    return resultado.sort_index().reset_index()
+
+
+def _volcar_particiones(parciales, carpeta, num_particiones, numero):
+    """Escribe en disco los parciales repartidos por hash de las claves."""
+    particiones = _particion_claves(parciales, num_particiones)
+    orden = np.argsort(particiones, kind='stable')
+    limites = np.searchsorted(particiones[orden], np.arange(num_particiones + 1))
+    for particion in range(num_particiones):
+        inicio, fin = limites[particion], limites[particion + 1]
+        if fin > inicio:
+            parciales.iloc[orden[inicio:fin]].to_pickle(_ruta_particion(carpeta, particion, numero))
+
+
+def _ruta_particion(carpeta, particion, numero):
+    return os.path.join(carpeta, f'p{particion:03d}_{numero:05d}.pkl')
+
+
 def extraer_columnas(df, columnas, incluir_duplicados=True):
     """
     Extrae columnas específicas de un DataFrame con opción de eliminar duplicados.
@@ -87,93 +554,255 @@ def extraer_columnas(df, columnas, incluir_duplicados=True):
 
 
 
-def agregar_costo_total(df, aplicaciones, columna_uid='troux_uid', columna_costo='unblended_cost'):
+def resumir_costos(df, claves, columnas_costo, decimales=2):
+    """
+    Suma una o más columnas de costo por una o más claves en una sola pasada.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame con el detalle de costos.
+    - claves (str | list): Columna(s) de agrupación (p. ej. ['troux_uid', 'mes', 'cuenta']).
+    - columnas_costo (str | list): Columna(s) de costo a sumar.
+    - decimales (int | None): Decimales del redondeo; None no redondea.
+
+    Retorna:
+    - pd.DataFrame indexado por las claves (MultiIndex si son varias) con una
+      columna por cada costo.
+    """
+    claves = [claves] if isinstance(claves, str) else list(claves)
+    columnas_costo = [columnas_costo] if isinstance(columnas_costo, str) else list(columnas_costo)
+    costos = df.groupby(claves, sort=False, observed=True)[columnas_costo].sum()
+    if decimales is not None:
+        costos = costos.round(decimales)
+    return costos
+
+
+def agregar_costo_total(df, aplicaciones, columna_uid='troux_uid', columna_costo='unblended_cost',
+                        decimales=2, inplace=False):
     """
     Agrega una columna 'costo_total' al DataFrame de aplicaciones con la suma de costos por troux_uid.
+
+    En lugar de un merge (que copia todo `aplicaciones`), busca la posición de
+    cada clave en el índice de los costos agregados y toma los valores.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame con el detalle de costos.
+    - aplicaciones (pd.DataFrame): DataFrame al que se agregan los costos.
+    - columna_uid (str | list): Columna(s) clave presentes en ambos DataFrames
+                                (p. ej. ['troux_uid', 'mes', 'cuenta']).
+    - columna_costo (str | list): Columna(s) de costo. Con una sola columna el
+                                  resultado se llama 'costo_total'; con varias,
+                                  'costo_total_<columna>'.
+    - decimales (int | None): Decimales del redondeo; None no redondea.
+    - inplace (bool): Si es True, agrega las columnas sobre aplicaciones sin copiarlo
+                      (y conserva su índice).
+
+    Retorna:
+    - pd.DataFrame de aplicaciones con las columnas de costo (NaN si la clave no tiene costos)
+      y, como el merge anterior, un índice nuevo 0..n-1.
+    """
+    claves = [columna_uid] if isinstance(columna_uid, str) else list(columna_uid)
+    columnas_costo = [columna_costo] if isinstance(columna_costo, str) else list(columna_costo)
+    costos = resumir_costos(df, claves, columnas_costo, decimales)
+    destinos = {columna: 'costo_total' if len(columnas_costo) == 1 else f'costo_total_{columna}'
+                for columna in columnas_costo}
+    return asignar_por_claves(aplicaciones, costos, claves, destinos, inplace)
+
+
+# Un apellido puede llevar partículas delante: "de la Fuente", "del Valle", "San Martín"
+_APELLIDO = r'(?:(?i:de|del|la|las|los|san|van|von|da|das|do|dos|di)\s+)*[^\s,;]+'
+# "Apellidos, Nombres" o, sin coma, "Apellido1 Apellido2 Nombre1 Nombre2". Con coma,
+# Apellido2 es todo lo que queda antes de la coma; la parte de nombres no admite comas,
+# así que si hay una la consume siempre el separador. Los valores que no encajan (vacíos,
+# varias comas, ';') no coinciden y se separan como antes, con split.
+_PARTE_NOMBRES = r'(?:(?:\s*,\s*|\s+)(?P<Nombre1>[^\s,;]+)?(?:\s+(?P<Nombre2>[^,;]*?))?)?\s*$'
+# Para el motor de Arrow (RE2, tiempo lineal, sin grupos atómicos ni lookahead)
+_PATRON_NOMBRES_ARROW = (rf'^\s*(?P<Apellido1>{_APELLIDO})(?:\s+(?P<Apellido2>{_APELLIDO}(?:\s+{_APELLIDO})*?))?'
+                         + _PARTE_NOMBRES)
+# Para `re`, que sí retrocede: con los apellidos en grupos atómicos y el resto de Apellido2
+# tomado de una vez solo si le sigue una coma, un valor como 'de ' * 20 + ';' ya no prueba
+# todas las formas de repartir las palabras antes de fallar. Coincide igual que el de Arrow.
+_PATRON_NOMBRES = re.compile(
+    rf'^\s*(?P<Apellido1>(?>{_APELLIDO}))'
+    rf'(?:\s+(?P<Apellido2>(?>{_APELLIDO})(?:(?:\s+[^\s,;]+)*+(?=\s*,))?))?'
+    + _PARTE_NOMBRES
+)
+
+
+def _dividir_en_dos(serie, separador):
+    """split(separador, n=1) en dos Series (la segunda con None si ninguna fila lo contiene)."""
+    partes = serie.str.split(separador, n=1, expand=True)
+    segunda = partes[1] if 1 in partes.columns else pd.Series(None, index=serie.index, dtype=object)
+    return partes[0], segunda
+
+
+def _separar_nombres_split(nombres):
+    """Separación original con split: "Apellido1 Apellido2, Nombre1 Nombre2"."""
+    apellidos, resto = _dividir_en_dos(nombres, ',')
+    apellido1, apellido2 = _dividir_en_dos(apellidos.str.strip(), ' ')
+    nombre1, nombre2 = _dividir_en_dos(resto.str.strip(), ' ')
+    return pd.DataFrame({'Apellido1': apellido1, 'Apellido2': apellido2.fillna(''),
+                         'Nombre1': nombre1, 'Nombre2': nombre2.fillna('')})
+
+
+def _como_tipo_texto(serie, dtype):
+    """
+    Convierte serie al tipo de texto de la columna original (object conserva None). Con
+    una columna category (compactar_memoria) se usa el tipo de sus categorías: los
+    valores nuevos no están entre ellas.
     """
-    costos = df.groupby(columna_uid)[columna_costo].sum().reset_index()
-    costos.rename(columns={columna_costo: 'costo_total'}, inplace=True)
-    aplicaciones = aplicaciones.merge(costos, on=columna_uid, how='left')
-    aplicaciones['costo_total'] = aplicaciones['costo_total'].round(2)
-    return aplicaciones
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if dtype == object:
+        return serie.astype(object).where(serie.notna(), None)
+    return serie.astype(dtype)
 
 
-def separar_nombres_apellidos(df):
+def separar_nombres_apellidos(df, columna='Nombres', inplace=False):
     """
     Separa la columna 'Nombres' en Apellido1, Apellido2, Nombre1 y Nombre2.
     Maneja casos donde puede haber solo un apellido o un nombre.
-    """
-    # Separar por coma: [apellidos, nombres]
-    nombres_split = df['Nombres'].str.split(',', n=1, expand=True)
-    df['Apellidos'] = nombres_split[0].str.strip()
-    df['Nombres_'] = nombres_split[1].str.strip()
-
-    # Separar apellidos
-    apellidos_split = df['Apellidos'].str.split(' ', n=1, expand=True)
-    df['Apellido1'] = apellidos_split[0]
-    df['Apellido2'] = apellidos_split[1].fillna('')
 
-    # Separar nombres
-    nombres_split = df['Nombres_'].str.split(' ', n=1, expand=True)
-    df['Nombre1'] = nombres_split[0]
-    df['Nombre2'] = nombres_split[1].fillna('')
+    Usa una sola extracción con expresión regular (con pyarrow, en C). Reconoce
+    apellidos compuestos con partículas ("de la Fuente García, Ana" -> Apellido1
+    'de la Fuente') y nombres sin coma, que se leen como
+    "Apellido1 Apellido2 Nombre1 Nombre2". Los valores que la expresión no
+    reconoce (vacíos, con varias comas o con ';') se separan con split como en
+    la versión anterior.
 
-    # Eliminar columnas auxiliares
-    df = df.drop(columns=['Apellidos', 'Nombres_'])
+    Parámetros:
+    - df (pd.DataFrame): DataFrame original.
+    - columna (str): Columna con los nombres completos (por defecto 'Nombres').
+    - inplace (bool): Si es True, agrega las columnas sobre df sin copiarlo.
 
+    Retorna:
+    - pd.DataFrame con las columnas Apellido1, Apellido2, Nombre1 y Nombre2, del mismo
+      tipo de texto que la columna original (Apellido2 y Nombre2 vacíos si no existen;
+      Nombre1 nulo si no hay nombres).
+    """
+    original = df[columna]
+    nombres, patron = original, _PATRON_NOMBRES.pattern
+    if pyarrow is not None:
+        # Con ArrowDtype, str.extract usa el motor de regex de Arrow
+        nombres = nombres.astype(pd.ArrowDtype(pyarrow.string()))
+        patron = _PATRON_NOMBRES_ARROW
+    partes = nombres.str.extract(patron)
+    # El motor de Arrow devuelve '' (no nulo) para los grupos que no participan
+    partes['Nombre1'] = partes['Nombre1'].mask(partes['Nombre1'] == '')
+    partes['Apellido2'] = partes['Apellido2'].fillna('')
+    partes['Nombre2'] = partes['Nombre2'].fillna('')
+    partes = partes.astype(object).where(partes.notna(), None)
+
+    sin_coincidencia = (partes['Apellido1'].isna() & original.notna()).to_numpy()
+    if sin_coincidencia.any():
+        partes.loc[sin_coincidencia] = _separar_nombres_split(
+            original[sin_coincidencia].astype(object)).to_numpy()
+
+    df = _copia_para_escribir(df, inplace)
+    for nombre in ('Apellido1', 'Apellido2', 'Nombre1', 'Nombre2'):
+        df[nombre] = _como_tipo_texto(partes[nombre], original.dtype)
     return df
 
-def cargar_hojas_excel(ruta_archivo, hojas):
+def _leer_hojas_excel(ruta_archivo, hojas, motor='openpyxl'):
+    """
+    Abre el libro una sola vez y lee las hojas indicadas. Con openpyxl, pandas abre
+    el libro en modo solo lectura, que recorre cada hoja en streaming.
+    """
+    with pd.ExcelFile(ruta_archivo, engine=motor) as libro:
+        return {hoja: libro.parse(hoja) for hoja in hojas}
+
+
+def cargar_hojas_excel(ruta_archivo, hojas, cache=None, procesos=None, motor='openpyxl', compactar=False):
     """
     Carga varias hojas de un archivo Excel y retorna un diccionario de DataFrames.
 
+    El libro se abre una sola vez para todas las hojas (no una vez por hoja).
+
     Parámetros:
     - ruta_archivo (str): Ruta del archivo Excel.
     - hojas (list): Lista con los nombres de las hojas a cargar.
+    - cache (CacheColumnar): Caché en disco opcional (ver cache_columnar.py). Cada hoja
+                             se guarda por separado, así solo se leen del Excel las que faltan.
+    - procesos (int): Si es mayor que 1, reparte las hojas entre ese número de procesos;
+                      cada proceso abre el libro una vez y lee solo sus hojas.
+                      En Windows, el script que lo llame debe usar `if __name__ == '__main__':`.
+    - motor (str): Motor de lectura de pandas (por defecto 'openpyxl'). Con python-calamine
+                   instalado (pandas>=2.2), 'calamine' es bastante más rápido.
+    - compactar (bool): Si es True, aplica `compactar_memoria` a cada hoja leída.
 
     Retorna:
     - dict: Diccionario {nombre_hoja: DataFrame}
     """
     dataframes = {}
+    pendientes = []
     for hoja in hojas:
         print(hoja)
-        dataframes[hoja] = pd.read_excel(ruta_archivo, sheet_name=hoja, engine='openpyxl')
-    return dataframes  # ¡Este return es clave!
+        df = cache.buscar(ruta_archivo, {'tipo': 'excel', 'hoja': hoja, 'motor': motor}) if cache is not None else None
+        if df is None:
+            pendientes.append(hoja)
+        else:
+            dataframes[hoja] = df
+
+    if procesos and procesos > 1 and len(pendientes) > 1:
+        grupos = [pendientes[k::procesos] for k in range(min(procesos, len(pendientes)))]
+        with ProcessPoolExecutor(max_workers=len(grupos)) as ejecutor:
+            for leidas in ejecutor.map(_leer_hojas_excel, [ruta_archivo] * len(grupos), grupos,
+                                       [motor] * len(grupos)):
+                dataframes.update(leidas)
+    elif pendientes:
+        dataframes.update(_leer_hojas_excel(ruta_archivo, pendientes, motor))
+
+    if cache is not None:
+        for hoja in pendientes:
+            cache.guardar(ruta_archivo, {'tipo': 'excel', 'hoja': hoja, 'motor': motor}, dataframes[hoja])
+        cache.sincronizar()
+
+    if compactar:
+        for hoja in hojas:
+            print(f"Compactando {hoja}")
+            dataframes[hoja] = compactar_memoria(dataframes[hoja], inplace=True)
+
+    return {hoja: dataframes[hoja] for hoja in hojas}  # ¡Este return es clave!
 
 import pandas as pd
 import re
 
-def dividir_registros(df, columna_codigo='Codigo', columna_valor='AplicacionesImpactadas '):
+def dividir_registros(df, columna_codigo='Codigo', columna_valor='AplicacionesImpactadas ',
+                      separador=r'[\n,]+', conservar_columnas=False):
     """
     Divide los registros de un DataFrame en múltiples filas si la columna especificada
     contiene separadores por saltos de línea o comas.
+
+    Trabaja columna a columna (split + explode) en lugar de recorrer filas con
+    iterrows, por lo que escala a millones de registros.
     
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - columna_codigo (str): Nombre de la columna que contiene el código.
     - columna_valor (str): Nombre de la columna que contiene los valores a dividir.
+    - separador (str): Expresión regular usada para dividir (por defecto saltos de línea o comas).
+    - conservar_columnas (bool): Si es True, conserva el resto de columnas de df en cada
+                                 registro generado. Si es False, solo devuelve código y valor.
     
     Retorna:
     - pd.DataFrame: Nuevo DataFrame con los registros descompuestos.
+      Los valores nulos no generan registros.
     """
-    registros = []
-
-    for _, fila in df.iterrows():
-        codigo = fila[columna_codigo]
-        valores = str(fila[columna_valor])
+    # Índice posicional para poder recuperar las filas originales tras el explode
+    partes = pd.Series(df[columna_valor].to_numpy(), index=np.arange(len(df)), dtype=object)
+    partes = partes[partes.notna()].astype(str).str.split(separador, regex=True).explode()
 
-        # Dividir por saltos de línea o comas
-        partes = re.split(r'[\n,]+', valores)
+    # Limpiar espacios y descartar vacíos
+    partes = partes.str.strip()
+    partes = partes[partes.notna() & (partes != '')]
 
-        # Limpiar espacios y crear nuevos registros
-        for parte in partes:
-            parte = parte.strip()
-            if parte:  # Evitar vacíos
-                registros.append({columna_codigo: codigo, columna_valor: parte})
+    posiciones = partes.index.to_numpy()
+    columnas = list(df.columns) if conservar_columnas else [columna_codigo]
+    nuevo_df = df[[col for col in columnas if col != columna_valor]].iloc[posiciones].reset_index(drop=True)
+    nuevo_df[columna_valor] = partes.to_numpy()
 
-    # Crear nuevo DataFrame
-    nuevo_df = pd.DataFrame(registros)
-    return nuevo_df
+    if conservar_columnas:
+        return nuevo_df[list(df.columns)]
+    return nuevo_df[[columna_codigo, columna_valor]]
 
 
 import re
@@ -196,85 +825,398 @@ def agregar_columnas_porcentaje(df, columna_fuente='RecursosInternos'):
 
     return df
 
-def separar_recursos_externos(df, columna_origen):
+def separar_recursos_externos(df, columna_origen,
+                              columnas_destino=('Proveedor', 'ContratoJira', 'Consultor', 'Observaciones'),
+                              separador='|', por_unicos=False):
     """
     Separa la columna 'RecursosExternosProveedoSM' en:
     Proveedor, ContratoJira, Consultor, Observaciones.
     
-    Si faltan posiciones, se completa con cadenas vacías.
+    Si faltan posiciones, se completa con cadenas vacías. La última columna
+    conserva el resto del texto si hay más separadores de la cuenta.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame original.
+    - columna_origen (str): Columna con los campos separados por '|'.
+    - columnas_destino (list): Nombres de las columnas a crear (por defecto 4).
+    - separador (str): Separador de los campos (por defecto '|').
+    - por_unicos (bool): Si es True, separa cada valor distinto una sola vez (ver aplicar_por_unicos).
     
     Retorna:
     - pd.DataFrame con las nuevas columnas agregadas.
     """
-    def procesar_fila(valor):
-        if pd.isna(valor):
-            return ["", "", "", ""]
-        partes = [p.strip() for p in valor.split('|')]
-        # Completar con blancos si faltan posiciones
-        while len(partes) < 4:
-            partes.append("")
-        return partes[:4]
-
-    # Aplicar la función fila por fila
-    nuevas_columnas = df[columna_origen].apply(procesar_fila)
-    
-    # Crear nuevas columnas
-    df[['Proveedor', 'ContratoJira', 'Consultor', 'Observaciones']] = pd.DataFrame(nuevas_columnas.tolist(), index=df.index)
+    columnas_destino = list(columnas_destino)
+
+    def separar(serie):
+        return serie.str.split(separador, n=len(columnas_destino) - 1, expand=True, regex=False)
+
+    # Columnas sin texto (p. ej. todas nulas, que pandas lee como float) no admiten .str
+    origen = _texto_o_nulo(df[columna_origen])
+    partes = aplicar_por_unicos(origen, separar) if por_unicos else separar(origen)
+
+    # Asignar columna a columna para no materializar listas intermedias
+    for k, nombre in enumerate(columnas_destino):
+        if k in partes.columns:
+            df[nombre] = partes[k].str.strip().fillna('')
+        else:
+            df[nombre] = ''
     return df
     
-def agregar_columnas_porcentaje_v1(df, columna_fuente='RecursosInternos'):
+# Porcentaje entre corchetes con decimales opcionales: [10%], [12.5%], [12,5 %], [50]
+_PORCENTAJE = r'\[\s*(\d+(?:[.,]\d+)?\s*%?)\s*\]'
+
+
+@lru_cache(maxsize=None)
+def _patron_porcentajes(patron):
+    return re.compile(patron)
+
+
+def _normalizar_porcentaje(porcentaje):
+    """Texto del porcentaje sin espacios internos: '12,5 %' -> '12,5%'. Los nulos se conservan."""
+    return porcentaje.str.replace(r'\s+', '', regex=True)
+
+
+def _valor_porcentaje(porcentaje):
+    """'12,5%' -> 0.125 (recibe el texto ya normalizado). Los nulos se conservan."""
+    return porcentaje.str.replace('%', '', regex=False).str.replace(',', '.', regex=False).astype(float).div(100)
+
+
+def _texto_o_nulo(serie):
+    """Serie de texto sin convertir los nulos en 'nan' (para columnas no textuales)."""
+    if serie.dtype == object or pd.api.types.is_string_dtype(serie):
+        return serie
+    return serie.astype(str).where(serie.notna())
+
+
+def agregar_columnas_porcentaje_v1(df, columna_fuente='RecursosInternos', por_unicos=False):
     """
     Agrega dos columnas:
     - PorcentajeAsignacion: el valor dentro de corchetes (ej. '5%')
     - ValorPorcentajeAsignacion: el valor numérico en formato decimal (ej. 0.05)
     
     Mejoras:
-    ✅ Maneja valores nulos sin error.
-    ✅ Extrae solo números y símbolo %.
+    ✅ Maneja valores nulos sin error (y sin modificar la columna fuente).
+    ✅ Extrae solo números y símbolo %, con decimales ([12.5%] o [12,5%]).
     ✅ Si no hay porcentaje, deja NaN.
+    ✅ Con por_unicos=True extrae una vez por valor distinto (ver aplicar_por_unicos).
+
+    Solo toma el primer porcentaje de cada celda; para todos use extraer_porcentajes.
     """
-    # Asegurar que la columna es string para evitar errores
-    df[columna_fuente] = df[columna_fuente].astype(str)
+    def extraer(serie):
+        # Extraer el texto dentro de corchetes (ej. [10%])
+        porcentaje = _normalizar_porcentaje(serie.str.extract(_PORCENTAJE)[0])
+        return pd.DataFrame({'PorcentajeAsignacion': porcentaje,
+                             'ValorPorcentajeAsignacion': _valor_porcentaje(porcentaje)})
 
-    # Extraer el texto dentro de corchetes (ej. [10%])
-    df['PorcentajeAsignacion'] = df[columna_fuente].str.extract(r'\[(\d+%?)\]')
-
-    # Convertir a decimal (quitando el % y dividiendo entre 100)
-    df['ValorPorcentajeAsignacion'] = (
-        df['PorcentajeAsignacion']
-        .str.replace('%', '', regex=False)
-        .astype(float)
-        .div(100)
-    )
+    fuente = _texto_o_nulo(df[columna_fuente])
+    resultado = aplicar_por_unicos(fuente, extraer) if por_unicos else extraer(fuente)
+    df['PorcentajeAsignacion'] = resultado['PorcentajeAsignacion']
+    df['ValorPorcentajeAsignacion'] = resultado['ValorPorcentajeAsignacion']
 
     return df
 
 
-def filtrar_dataframe(df, filtros):
+def extraer_porcentajes(df, columna_fuente='RecursosInternos', separador=',', unir=False,
+                        conservar_sin_porcentaje=True):
+    """
+    Extrae todos los recursos con porcentaje de una columna ('Ana [50%], Luis [12.5%]')
+    en una tabla larga con una fila por recurso.
+
+    El texto se analiza en una sola pasada sobre los valores distintos de la columna
+    (como str.extractall) y el resultado se reparte a las filas, así que no hace
+    falta explotar la columna ni volver a analizarla después de explotarla.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame original.
+    - columna_fuente (str): Columna con los recursos y sus porcentajes entre corchetes.
+    - separador (str): Separador entre recursos (por defecto ',').
+    - unir (bool): Si es True, retorna las filas de df repetidas una vez por recurso con
+                   las columnas Recurso, Porcentaje y ValorPorcentaje agregadas (en lugar de
+                   dividir_registros_1 + agregar_columnas_porcentaje_v1).
+    - conservar_sin_porcentaje (bool): Con unir=True, conserva una vez (con nulos) las filas
+                                       sin ningún porcentaje. No tiene efecto con unir=False:
+                                       la tabla larga solo lista recursos con porcentaje.
+
+    Retorna:
+    - pd.DataFrame: con unir=False, columnas fila (etiqueta del índice de df), Recurso,
+      Porcentaje (texto sin espacios, ej. '12.5%') y ValorPorcentaje (ej. 0.125).
+    """
+    if columna_fuente not in df.columns:
+        raise ValueError(f"⚠️ La columna '{columna_fuente}' no existe en el DataFrame.")
+
+    # Un recurso no puede contener el separador ni corchetes: el patrón se corta en ellos
+    sep = _patron_separador(separador)
+    if len(separador) == 1:
+        patron = _patron_porcentajes(rf'([^\[\]{sep}]*){_PORCENTAJE}')
+    else:
+        patron = _patron_porcentajes(rf'(?:^|{sep})((?:(?!{sep})[^\[\]])*){_PORCENTAJE}')
+
+    fuente = _texto_o_nulo(df[columna_fuente])
+    codigos, unicos = pd.factorize(fuente)   # los nulos quedan con código -1 y sin recursos
+    # re.findall por valor distinto: mismo resultado que str.extractall, sin construir su
+    # MultiIndex celda a celda (unas 3 veces más rápido)
+    encontrados = [patron.findall(valor) if isinstance(valor, str) else [] for valor in unicos]
+    pares = list(chain.from_iterable(encontrados))
+    # El último elemento (None) es el de las filas sin porcentaje
+    recurso = np.array([r.strip() for r, _ in pares] + [None], dtype=object)
+    porcentaje = _normalizar_porcentaje(pd.Series([p for _, p in pares] + [None], dtype=object))
+    valor = _valor_porcentaje(porcentaje).to_numpy()
+    porcentaje = porcentaje.to_numpy()
+    cantidad = np.fromiter(map(len, encontrados), dtype='int64', count=len(encontrados))
+    cantidad = np.append(cantidad, 0)
+
+    # Repartir las coincidencias de cada valor distinto a sus filas (como un CSR):
+    # las del valor k ocupan [inicio[k], inicio[k] + cantidad[k])
+    inicio = np.concatenate(([0], np.cumsum(cantidad)[:-1]))
+    por_fila = np.where(codigos >= 0, cantidad[codigos], 0)
+    repeticiones = np.maximum(por_fila, 1) if unir and conservar_sin_porcentaje else por_fila
+
+    filas = np.repeat(np.arange(len(df)), repeticiones)
+    desplazamiento = np.arange(len(filas)) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    posiciones = np.where(por_fila[filas] > 0, inicio[codigos[filas]] + desplazamiento, -1)
+
+    largo = pd.DataFrame({'Recurso': pd.Series(recurso[posiciones], dtype=object),
+                          'Porcentaje': pd.Series(porcentaje[posiciones], dtype=object),
+                          'ValorPorcentaje': valor[posiciones]})
+
+    if not unir:
+        largo.insert(0, 'fila', df.index.take(filas))
+        return largo
+
+    resultado = df.iloc[filas].reset_index(drop=True)
+    for col in largo.columns:
+        resultado[col] = largo[col].to_numpy()
+    return resultado
+
+
+# Índices ordenados por (id(df), columna) para filtros repetidos sobre el mismo DataFrame.
+# Cada índice guarda la columna con la que se construyó y solo se reutiliza si la
+# columna actual es la misma (ver _huella_columna).
+_INDICES_FILTRO = {}
+
+
+def _huella_columna(serie):
+    """
+    Identifica los datos de una columna para saber si cambió desde que se indexó.
+
+    Con Copy-on-Write, el índice conserva una referencia a la columna, así que
+    cualquier escritura posterior en el DataFrame (reemplazo o asignación en sitio)
+    copia los datos y cambia su dirección: basta comparar la dirección del búfer.
+    Sin Copy-on-Write las asignaciones en sitio no cambian el búfer y se compara
+    un hash de los valores.
+    """
+    if not _copy_on_write_activo():
+        valores = pd.util.hash_pandas_object(serie, index=False).to_numpy()
+        return ('hash', len(serie), hashlib.blake2b(valores.tobytes(), digest_size=16).digest())
+    datos = serie.array
+    if isinstance(datos, pd.arrays.NumpyExtensionArray):
+        return ('numpy', len(serie), serie.dtype, np.asarray(datos).__array_interface__['data'][0])
+    return ('extension', len(serie), serie.dtype, id(datos))
+
+
+def _normalizar_predicado(valor):
+    """
+    Convierte el valor de un filtro en una tupla (tipo, argumento).
+
+    Formatos admitidos:
+    - valor escalar                 -> igualdad
+    - lista, tupla, set o Serie     -> pertenencia ('en')
+    - {'igual': v}, {'en': [...]}, {'entre': (min, max)}, {'nulo': True/False}
+    - {'no': <cualquier filtro>}    -> negación
+    """
+    if isinstance(valor, dict):
+        if len(valor) != 1:
+            raise ValueError(f"⚠️ Filtro no válido: {valor}. Use una sola clave por columna.")
+        tipo, argumento = next(iter(valor.items()))
+        if tipo == 'no':
+            return ('no', _normalizar_predicado(argumento))
+        if tipo not in ('igual', 'en', 'entre', 'nulo'):
+            raise ValueError(f"⚠️ Tipo de filtro desconocido: '{tipo}'.")
+        return (tipo, list(argumento) if tipo == 'en' else argumento)
+    if isinstance(valor, (list, tuple, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        return ('en', list(valor))
+    return ('igual', valor)
+
+
+def _mascara_predicado(serie, predicado):
+    """Evalúa un predicado normalizado sobre una Serie y devuelve un arreglo booleano."""
+    tipo, argumento = predicado
+    if tipo == 'no':
+        return ~_mascara_predicado(serie, argumento)
+    if tipo == 'igual':
+        mascara = serie == argumento
+    elif tipo == 'en':
+        mascara = serie.isin(argumento)
+    elif tipo == 'nulo':
+        mascara = serie.isna() if argumento else serie.notna()
+    else:
+        minimo, maximo = argumento
+        mascara = serie.notna()
+        if minimo is not None:
+            mascara &= serie >= minimo
+        if maximo is not None:
+            mascara &= serie <= maximo
+    return np.asarray(mascara, dtype=bool)
+
+
+def _indice_filtro(df, columna):
+    """
+    Devuelve (creándolo si hace falta) el índice ordenado de una columna:
+    los códigos de pd.factorize(sort=True) agrupan las filas de cada valor en un
+    bloque contiguo de `orden`, de modo que igualdad, pertenencia, rangos y nulos
+    se resuelven con búsquedas binarias en lugar de recorrer la columna.
+    """
+    clave = (id(df), columna)
+    serie = df[columna]
+    huella = _huella_columna(serie)
+    indice = _INDICES_FILTRO.get(clave)
+    if indice is not None and indice['huella'] == huella:
+        return indice
+
+    try:
+        codigos, unicos = pd.factorize(serie, sort=True)
+        ordenado = True
+    except TypeError:
+        # Tipos mezclados que no se pueden ordenar: sin soporte de rangos
+        codigos, unicos = pd.factorize(serie)
+        ordenado = False
+
+    # El bloque 0 corresponde a los nulos (código -1) y el bloque k+1 al valor unicos[k]
+    conteos = np.bincount(codigos + 1, minlength=len(unicos) + 1)
+    indice = {
+        'columna': serie,   # mantiene la referencia que fuerza la copia al escribir (Copy-on-Write)
+        'huella': huella,
+        'unicos': pd.Index(unicos),
+        'ordenado': ordenado,
+        'orden': np.argsort(codigos, kind='stable'),
+        'inicios': np.concatenate([[0], np.cumsum(conteos)]),
+    }
+    if clave not in _INDICES_FILTRO:
+        weakref.finalize(df, _INDICES_FILTRO.pop, clave, None)
+    _INDICES_FILTRO[clave] = indice
+    return indice
+
+
+def _posiciones_predicado(indice, predicado):
+    """
+    Resuelve un predicado con el índice ordenado. Retorna las posiciones de las filas
+    que lo cumplen, o None si el predicado no se puede resolver con el índice.
+    """
+    tipo, argumento = predicado
+    orden, inicios, unicos = indice['orden'], indice['inicios'], indice['unicos']
+
+    def bloques(desde, hasta):
+        return orden[inicios[desde]:inicios[hasta]]
+
+    if tipo == 'nulo':
+        return bloques(0, 1) if argumento else bloques(1, len(inicios) - 1)
+    if tipo in ('igual', 'en'):
+        valores = [argumento] if tipo == 'igual' else argumento
+        codigos = unicos.get_indexer(pd.Index(valores).dropna().unique())
+        partes = [bloques(c + 1, c + 2) for c in codigos if c >= 0]
+        if tipo == 'en' and pd.isna(valores).any():
+            partes.append(bloques(0, 1))
+        return np.concatenate(partes) if partes else np.array([], dtype=np.intp)
+    if tipo == 'entre' and indice['ordenado']:
+        minimo, maximo = argumento
+        try:
+            desde = 0 if minimo is None else unicos.searchsorted(minimo, side='left')
+            hasta = len(unicos) if maximo is None else unicos.searchsorted(maximo, side='right')
+        except TypeError:
+            return None
+        return bloques(desde + 1, max(desde, hasta) + 1)
+    return None
+
+
+def limpiar_indices_filtro(df=None):
+    """
+    Elimina los índices guardados por `filtrar_dataframe(..., usar_indice=True)`.
+    No hace falta llamarla tras modificar el DataFrame (los índices de columnas que
+    cambiaron se reconstruyen solos); sirve para liberar su memoria.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame cuyos índices se eliminan (si None, se eliminan todos).
+    """
+    for clave in list(_INDICES_FILTRO):
+        if df is None or clave[0] == id(df):
+            del _INDICES_FILTRO[clave]
+
+
+def filtrar_dataframe(df, filtros, usar_indice=False):
     """
     Filtra un DataFrame según uno o varios criterios.
 
+    Todos los criterios se combinan en una sola máscara que se aplica una vez,
+    sin copiar el DataFrame completo.
+
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - filtros (dict): Diccionario con {columna: valor} para filtrar.
                       Ejemplo: {'TipoRequerimiento': 'Proyecto'} 
                       o {'TipoRequerimiento': 'Proyecto', 'EstadoProyecto': 'Activo'}
+                      El valor también puede ser:
+                      - una lista de valores: {'TipoRequerimiento': ['Proyecto', 'Mejora']}
+                      - {'entre': (min, max)} (extremos incluidos, None = sin límite)
+                      - {'nulo': True} o {'nulo': False}
+                      - {'no': <filtro>} para negar cualquiera de los anteriores
+    - usar_indice (bool): Si es True, guarda un índice ordenado por columna para que los
+                          filtros repetidos sobre el mismo DataFrame no recorran la columna.
+                          Si la columna cambia, su índice se reconstruye en el siguiente filtro.
 
     Retorna:
     - pd.DataFrame: DataFrame filtrado.
     """
-    df_filtrado = df.copy()
-    for columna, valor in filtros.items():
-        df_filtrado = df_filtrado[df_filtrado[columna] == valor]
-    return df_filtrado
+    if not filtros:
+        return df.copy()
+    predicados = {columna: _normalizar_predicado(valor) for columna, valor in filtros.items()}
+
+    if usar_indice:
+        posiciones = None
+        pendientes = {}
+        for columna, predicado in predicados.items():
+            encontradas = _posiciones_predicado(_indice_filtro(df, columna), predicado)
+            if encontradas is None:
+                pendientes[columna] = predicado
+            elif posiciones is None:
+                # Los bloques del índice no se solapan: las posiciones ya son únicas
+                posiciones = np.sort(encontradas)
+            else:
+                posiciones = np.intersect1d(posiciones, encontradas, assume_unique=True)
+
+        if posiciones is not None:
+            # Los criterios sin índice solo se evalúan sobre las filas candidatas
+            candidatas = df.iloc[posiciones]
+            mascara = np.ones(len(candidatas), dtype=bool)
+            for columna, predicado in pendientes.items():
+                mascara &= _mascara_predicado(candidatas[columna], predicado)
+            return candidatas[mascara]
+
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, predicado in predicados.items():
+        mascara &= _mascara_predicado(df[columna], predicado)
+    return df[mascara]
 
 import pandas as pd
 
+def _explotar_columna(df, columna, separador):
+    """
+    Divide `columna` por `separador` y genera una fila por elemento (sin espacios extra).
+    Construye el resultado con df.take, por lo que nunca copia ni modifica df.
+    """
+    partes = pd.Series(df[columna].to_numpy(), index=np.arange(len(df))).str.split(separador).explode()
+    df_expandido = df.take(partes.index.to_numpy())
+    df_expandido[columna] = partes.str.strip().to_numpy()
+    return df_expandido
+
+
 def dividir_registros_1(df, columna, nuevo_nombre=None, separador=','):
     """
     Divide los valores separados por un separador en la columna indicada
     y genera nuevos registros por cada valor.
 
+    El DataFrame original no se copia ni se modifica: el resultado se arma
+    directamente a partir de las posiciones de cada elemento.
+
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - columna (str): Nombre de la columna a dividir.
@@ -284,16 +1226,8 @@ def dividir_registros_1(df, columna, nuevo_nombre=None, separador=','):
     Retorna:
     - pd.DataFrame: DataFrame expandido con la columna dividida.
     """
-    df_expandido = df.copy()
-
-    # Dividir la columna en listas
-    df_expandido[columna] = df_expandido[columna].str.split(separador)
-
-    # Explode para generar filas por cada elemento
-    df_expandido = df_expandido.explode(columna)
-
-    # Limpiar espacios extra
-    df_expandido[columna] = df_expandido[columna].str.strip()
+    # Dividir, generar filas por cada elemento y limpiar espacios extra
+    df_expandido = _explotar_columna(df, columna, separador)
 
     # Renombrar la columna si se especifica
     if nuevo_nombre:
@@ -301,48 +1235,155 @@ def dividir_registros_1(df, columna, nuevo_nombre=None, separador=','):
 
     return df_expandido
 
-def dividir_registros_multiple(df, columnas_config, separador=','):
+def _patron_separador(separador):
+    """Patrón regex equivalente al separador tal como lo interpreta str.split."""
+    return re.escape(separador) if len(separador) == 1 else separador
+
+
+def estimar_filas_dividir(df, columnas_config, separador=',', modo='cartesiano'):
+    """
+    Estima, sin dividir nada, cuántas filas tendrá el resultado de
+    `dividir_registros_multiple`. Cuenta los separadores de cada celda
+    (los nulos cuentan como un elemento, igual que al dividir).
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame original.
+    - columnas_config (dict | list): Columnas a dividir.
+    - separador (str): Separador de los valores (por defecto ',').
+    - modo (str): 'cartesiano' o 'pareado' (ver `dividir_registros_multiple`).
+
+    Retorna:
+    - int: Número de filas del resultado.
+    """
+    if modo not in ('cartesiano', 'pareado'):
+        raise ValueError(f"⚠️ Modo desconocido: '{modo}'. Use 'cartesiano' o 'pareado'.")
+    patron = _patron_separador(separador)
+    filas = np.ones(len(df), dtype=np.int64)
+    for columna in columnas_config:
+        elementos = df[columna].astype('string').str.count(patron).fillna(0).to_numpy(dtype=np.int64) + 1
+        filas = filas * elementos if modo == 'cartesiano' else np.maximum(filas, elementos)
+    return int(filas.sum())
+
+
+def _explotar_pareado(df, columnas, separador):
+    """
+    Divide varias columnas con listas alineadas y las expande juntas: el elemento
+    k de cada columna va en la misma fila. Las listas más cortas se completan con nulos.
+    """
+    posiciones = np.arange(len(df))
+    partes = {columna: pd.Series(df[columna].to_numpy(), index=posiciones).str.split(separador).explode()
+              for columna in columnas}
+    cantidades = {columna: np.bincount(parte.index.to_numpy(dtype=np.intp), minlength=len(df))
+                  for columna, parte in partes.items()}
+    filas = np.maximum.reduce(list(cantidades.values())) if columnas else np.ones(len(df), dtype=np.intp)
+    inicio_salida = np.cumsum(filas) - filas
+
+    df_expandido = df.take(np.repeat(posiciones, filas))
+    for columna, parte in partes.items():
+        fila = parte.index.to_numpy(dtype=np.intp)
+        inicio = np.cumsum(cantidades[columna]) - cantidades[columna]
+        ordinal = np.arange(len(parte)) - inicio[fila]
+        valores = np.full(len(df_expandido), None, dtype=object)
+        valores[inicio_salida[fila] + ordinal] = parte.str.strip().to_numpy()
+        df_expandido[columna] = valores
+    return df_expandido
+
+
+def dividir_registros_multiple(df, columnas_config, separador=',', modo='cartesiano', max_crecimiento=None):
     """
     Divide los valores separados por un separador en múltiples columnas y genera nuevos registros.
 
+    El DataFrame original no se copia ni se modifica.
+
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - columnas_config (dict): Diccionario {columna_original: nuevo_nombre}.
                                Ejemplo: {'PorcentajeAsignación': 'RecursoAsignado', 'OtraColumna': 'NuevoNombre'}
     - separador (str): Separador de los valores (por defecto ',').
+    - modo (str): 'cartesiano' (por defecto) expande cada columna por separado, por lo que
+                  genera todas las combinaciones; 'pareado' expande las columnas juntas
+                  cuando sus listas están alineadas (p. ej. recurso <-> porcentaje), una
+                  fila por posición, completando con nulos las listas más cortas.
+    - max_crecimiento (float): Si se indica, lanza ValueError antes de dividir cuando el
+                               resultado tendría más de max_crecimiento * len(df) filas.
 
     Retorna:
     - pd.DataFrame: DataFrame expandido con las columnas divididas y renombradas.
     """
-    df_expandido = df.copy()
-
-    for columna_original, nuevo_nombre in columnas_config.items():
-        # Dividir la columna en listas
-        df_expandido[columna_original] = df_expandido[columna_original].str.split(separador)
-        # Explode para generar filas por cada elemento
-        df_expandido = df_expandido.explode(columna_original)
-        # Limpiar espacios extra
-        df_expandido[columna_original] = df_expandido[columna_original].str.strip()
-        # Renombrar la columna
-        df_expandido = df_expandido.rename(columns={columna_original: nuevo_nombre})
-
-    return df_expandido
+    if max_crecimiento is not None:
+        estimadas = estimar_filas_dividir(df, columnas_config, separador, modo)
+        if estimadas > max_crecimiento * max(len(df), 1):
+            raise ValueError(f"⚠️ La división generaría {estimadas:,} filas a partir de {len(df):,} "
+                             f"(más de {max_crecimiento}x). Revise las columnas o use modo='pareado'.")
+    elif modo not in ('cartesiano', 'pareado'):
+        raise ValueError(f"⚠️ Modo desconocido: '{modo}'. Use 'cartesiano' o 'pareado'.")
+
+    if modo == 'pareado':
+        df_expandido = _explotar_pareado(df, list(columnas_config), separador)
+    else:
+        df_expandido = df
+        for columna_original in columnas_config:
+            # Dividir, generar filas por cada elemento y limpiar espacios extra
+            df_expandido = _explotar_columna(df_expandido, columna_original, separador)
+
+    # Renombrar las columnas
+    return df_expandido.rename(columns=dict(columnas_config))
+
+
+def _texto_arrow(serie):
+    """
+    Devuelve la Serie de texto respaldada por Arrow si pyarrow está instalado,
+    para que los métodos .str se ejecuten en C en lugar de celda a celda.
+    """
+    if pyarrow is None or (isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage == 'pyarrow'):
+        return serie
+    return serie.astype('string[pyarrow]')
 
 
-def contar_elementos(df, columnas_config, separador=','):
+def _contar_serie(serie, separador=','):
+    """
+    Cuenta los elementos no vacíos de cada celda de una Serie de texto sin
+    dividir la celda en listas. Los nulos cuentan como 0 elementos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Columnas compactadas: contar una vez por categoría y repartir por los códigos
+        # (fillna('') fallaría si '' no es una categoría; los nulos tienen código -1 -> 0)
+        conteo = np.append(_contar_serie(pd.Series(serie.cat.categories), separador).to_numpy(), 0)
+        return pd.Series(conteo[serie.cat.codes.to_numpy()], index=serie.index)
+
+    valores = serie.fillna('')
+    if pd.api.types.infer_dtype(valores, skipna=True) not in ('string', 'empty'):
+        valores = valores.astype(str)
+
+    if len(separador) == 1:
+        valores = _texto_arrow(valores)
+        # Un elemento empieza tras el separador (se antepone uno) y tiene algún carácter
+        # visible; se evita '^' porque no se comporta igual en todos los motores de regex.
+        sep = re.escape(separador)
+        valores = separador + valores
+        return valores.str.count(rf'{sep}[^\S{sep}]*[^\s{sep}]').fillna(0).astype('int64')
+
+    partes = pd.Series(valores.to_numpy(), dtype=object).str.split(separador, regex=False).explode().str.strip()
+    conteo = (partes.notna() & (partes != '')).groupby(level=0).sum().astype('int64')
+    return pd.Series(conteo.to_numpy(), index=serie.index)
+
+
+def contar_elementos(df, columnas_config, separador=',', inplace=False):
     """
     Agrega nuevas columnas con el conteo de elementos separados por un delimitador.
+    Los elementos vacíos (o solo con espacios) no se cuentan.
 
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - columnas_config (dict): Diccionario {columna_original: nueva_columna_conteo}.
                                Ejemplo: {'PorcentajeAsignación': 'numRecursosAsignados'}
     - separador (str): Separador de los valores (por defecto ',').
+    - inplace (bool): Si es True, agrega las columnas sobre df sin copiarlo.
 
     Retorna:
     - pd.DataFrame: DataFrame con las nuevas columnas de conteo.
     """
-    df_resultado = df.copy()
+    df_resultado = _copia_para_escribir(df, inplace)
 
     for columna_original, nueva_columna in columnas_config.items():
         
@@ -350,25 +1391,133 @@ def contar_elementos(df, columnas_config, separador=','):
             print(f"⚠️ La columna '{columna_original}' no existe en el DataFrame.")
             continue
 
-        df_resultado[nueva_columna] = (
-            df_resultado[columna_original]
-            .fillna('')  # Maneja valores nulos
-            .apply(lambda x: len([item for item in x.split(separador) if item.strip() != '']))
-        )
+        df_resultado[nueva_columna] = _contar_serie(df_resultado[columna_original], separador)
 
     return df_resultado
 
 import os
 
-def guardar_columnas_csv(df, columnas, nombre_archivo, carpeta="ProccesData"):
+# Compresión de CSV según la extensión del archivo (la misma convención que pandas)
+_COMPRESION_POR_EXTENSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zip': 'zip'}
+
+
+def _normalizar_compresion(compresion, nombre_archivo):
+    """Retorna (método, opciones) a partir de un nombre, un dict estilo pandas o la extensión."""
+    if compresion == 'infer':
+        compresion = _COMPRESION_POR_EXTENSION.get(os.path.splitext(nombre_archivo)[1].lower())
+    if compresion is None:
+        return None, {}
+    opciones = dict(compresion) if isinstance(compresion, dict) else {'method': compresion}
+    metodo = opciones.pop('method')
+    if metodo not in ('gzip', 'bz2', 'xz', 'zip'):
+        raise ValueError(f"⚠️ Compresión desconocida: '{metodo}'. Use 'gzip', 'bz2', 'xz' o 'zip'.")
+    return metodo, opciones
+
+
+def _abrir_texto_csv(pila, ruta, metodo, opciones, nombre_en_zip):
+    """Abre ruta para escribir texto UTF-8 con BOM, comprimido si se indica un método."""
+    if metodo is None:
+        binario = pila.enter_context(open(ruta, 'wb'))
+    elif metodo == 'gzip':
+        binario = pila.enter_context(gzip.open(ruta, 'wb', **opciones))
+    elif metodo == 'bz2':
+        binario = pila.enter_context(bz2.open(ruta, 'wb', **opciones))
+    elif metodo == 'xz':
+        binario = pila.enter_context(lzma.open(ruta, 'wb', **opciones))
+    else:
+        opciones.setdefault('compression', zipfile.ZIP_DEFLATED)
+        archivo_zip = pila.enter_context(zipfile.ZipFile(ruta, 'w', **opciones))
+        binario = pila.enter_context(archivo_zip.open(nombre_en_zip, 'w', force_zip64=True))
+    return pila.enter_context(io.TextIOWrapper(binario, encoding='utf-8-sig', newline=''))
+
+
+def _escribir_csv(bloques, ruta, columnas, metodo, opciones, nombre_en_zip, motor):
+    with contextlib.ExitStack() as pila:
+        texto = _abrir_texto_csv(pila, ruta, metodo, opciones, nombre_en_zip)
+        for numero, bloque in enumerate(bloques):
+            if motor == 'pyarrow':
+                import pyarrow.csv as pa_csv
+                if numero == 0:
+                    # Encabezado con el módulo csv para que quede igual que con pandas
+                    csv.writer(texto, lineterminator='\n').writerow(columnas)
+                texto.flush()
+                # 'needed' entrecomilla todos los textos (pueden contener comillas) y deja sin
+                # comillas los números y los nulos
+                pa_csv.write_csv(pyarrow.Table.from_pandas(bloque[columnas], preserve_index=False),
+                                 texto.buffer,
+                                 pa_csv.WriteOptions(include_header=False, quoting_style='needed'))
+            else:
+                bloque[columnas].to_csv(texto, index=False, header=(numero == 0))
+
+
+def _escribir_parquet(bloques, ruta, columnas):
+    import pyarrow.parquet as pq
+    # Una columna toda nula en el primer bloque no dice su tipo (pyarrow la infiere como
+    # null o, si viene de un CSV, como double): se retienen los bloques hasta ver un valor
+    # en cada una de esas columnas y se toma el tipo de ese bloque.
+    retenidas, sin_tipo, campos = [], None, None
+    escritor = None
+    try:
+        for bloque in bloques:
+            tabla = pyarrow.Table.from_pandas(bloque[columnas], preserve_index=False)
+            if escritor is not None:
+                escritor.write_table(tabla.cast(escritor.schema))
+                continue
+            if campos is None:
+                campos, metadatos = list(tabla.schema), tabla.schema.metadata
+                sin_tipo = {i for i, columna in enumerate(tabla.columns) if columna.null_count == len(columna)}
+            else:
+                for i in [i for i in sin_tipo if tabla.column(i).null_count < len(tabla)]:
+                    campos[i] = tabla.schema.field(i)
+                    sin_tipo.discard(i)
+                    metadatos = None  # Los tipos de pandas guardados ya no corresponden
+            retenidas.append(tabla)
+            if not sin_tipo:
+                escritor = _escribir_retenidas(pq, ruta, campos, metadatos, retenidas)
+                retenidas = []
+        if escritor is None and retenidas:
+            escritor = _escribir_retenidas(pq, ruta, campos, metadatos, retenidas)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _escribir_retenidas(pq, ruta, campos, metadatos, tablas):
+    """Abre el ParquetWriter con el esquema final y escribe las tablas retenidas."""
+    esquema = pyarrow.schema(campos, metadata=metadatos)
+    escritor = pq.ParquetWriter(ruta, esquema)
+    try:
+        for tabla in tablas:
+            escritor.write_table(tabla.cast(esquema))
+    except BaseException:
+        escritor.close()
+        raise
+    return escritor
+
+
+def guardar_columnas_csv(df, columnas, nombre_archivo, carpeta="ProccesData", formato=None,
+                         compresion='infer', motor=None):
     """
     Guarda solo las columnas especificadas de un DataFrame en un archivo CSV.
 
+    La escritura es atómica: se escribe un archivo temporal en la misma carpeta y
+    al terminar se renombra, de modo que nadie lee nunca un archivo a medias.
+
     Parámetros:
-    - df (pd.DataFrame): DataFrame original.
+    - df (pd.DataFrame | iterable): DataFrame original o iterable de DataFrames
+                                    (p. ej. `leer_csv_por_bloques`), que se escriben
+                                    uno tras otro sin juntarlos en memoria.
     - columnas (list): Lista de columnas a guardar.
     - nombre_archivo (str): Nombre del archivo CSV.
     - carpeta (str): Carpeta donde se guardará el archivo (por defecto 'ProccesData').
+    - formato (str): 'csv' o 'parquet'; si None, 'parquet' si el nombre termina en
+                     '.parquet' y 'csv' en otro caso. Parquet requiere pyarrow.
+    - compresion (str | dict): Compresión del CSV: 'gzip', 'bz2', 'xz', 'zip', None o un
+                               dict como en pandas ({'method': 'gzip', 'compresslevel': 1}).
+                               Por defecto se deduce de la extensión (.gz, .bz2, .xz, .zip).
+    - motor (str): None para pandas o 'pyarrow' para escribir el CSV con pyarrow (mucho
+                   más rápido; los textos salen entre comillas, los booleanos como
+                   true/false y los flotantes enteros sin '.0').
 
     Retorna:
     - str: Ruta completa del archivo guardado.
@@ -376,28 +1525,204 @@ def guardar_columnas_csv(df, columnas, nombre_archivo, carpeta="ProccesData"):
     # Crear carpeta si no existe
     os.makedirs(carpeta, exist_ok=True)
 
+    bloques = iter([df]) if isinstance(df, pd.DataFrame) else iter(df)
+    primero = next(bloques, None)
+    if primero is None:
+        raise ValueError("⚠️ No se recibió ningún DataFrame para guardar.")
+
     # Validar columnas existentes
-    columnas_existentes = [col for col in columnas if col in df.columns]
+    columnas_existentes = [col for col in columnas if col in primero.columns]
     if not columnas_existentes:
         raise ValueError("⚠️ Ninguna de las columnas especificadas existe en el DataFrame.")
 
-    # Filtrar el DataFrame
-    df_filtrado = df[columnas_existentes]
+    if formato is None:
+        formato = 'parquet' if nombre_archivo.lower().endswith('.parquet') else 'csv'
+    if formato not in ('csv', 'parquet'):
+        raise ValueError(f"⚠️ Formato desconocido: '{formato}'. Use 'csv' o 'parquet'.")
+    if (formato == 'parquet' or motor == 'pyarrow') and pyarrow is None:
+        raise ImportError("⚠️ Parquet y el motor 'pyarrow' requieren instalar pyarrow.")
+    metodo, opciones = _normalizar_compresion(compresion, nombre_archivo) if formato == 'csv' else (None, {})
 
     # Ruta completa
     ruta = os.path.join(carpeta, nombre_archivo)
 
-    # Guardar con codificación UTF-8 BOM para evitar problemas con acentos
-    df_filtrado.to_csv(ruta, index=False, encoding="utf-8-sig")
+    def todos_los_bloques():
+        yield primero
+        yield from bloques
+
+    temporal = os.path.join(os.path.dirname(ruta), f'.{os.path.basename(ruta)}.{uuid.uuid4().hex}.tmp')
+    try:
+        if formato == 'parquet':
+            _escribir_parquet(todos_los_bloques(), temporal, columnas_existentes)
+        else:
+            # Guardar con codificación UTF-8 BOM para evitar problemas con acentos
+            nombre_en_zip = os.path.splitext(nombre_archivo)[0] if metodo == 'zip' else None
+            _escribir_csv(todos_los_bloques(), temporal, columnas_existentes, metodo, opciones,
+                          nombre_en_zip, motor)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
 
     return ruta
 
+
+def guardar_varios_csv(trabajos, max_hilos=None):
+    """
+    Ejecuta varias llamadas a `guardar_columnas_csv` en paralelo con hilos. La
+    compresión y la escritura de Parquet/pyarrow liberan el GIL, así que varias
+    salidas se escriben a la vez.
+
+    Parámetros:
+    - trabajos (list): Lista de dicts con los argumentos de `guardar_columnas_csv`.
+                       Ejemplo: [{'df': df, 'columnas': cols, 'nombre_archivo': 'a.csv.gz'}, ...]
+    - max_hilos (int): Número máximo de hilos (por defecto, el de ThreadPoolExecutor).
+
+    Retorna:
+    - list: Rutas guardadas, en el mismo orden que los trabajos.
+    """
+    rutas = [os.path.join(t.get('carpeta', 'ProccesData'), t['nombre_archivo']) for t in trabajos]
+    repetidas = sorted({ruta for ruta in rutas if rutas.count(ruta) > 1})
+    if repetidas:
+        raise ValueError(f"⚠️ Varios trabajos escriben el mismo archivo: {repetidas}")
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+        futuros = [ejecutor.submit(guardar_columnas_csv, **trabajo) for trabajo in trabajos]
+        return [futuro.result() for futuro in futuros]
+
 import re
 
-def limpiar_columnas(df, reglas):
+# Regex que eliminan exactamente un carácter por coincidencia (opcionalmente en
+# rachas con + o *): borrar la racha equivale a borrar cada carácter, así que se
+# pueden combinar con otras reglas sin cambiar el resultado.
+_REGEX_UN_CARACTER = re.compile(r'(?:\[(?:\\.|[^\]\\])+\]|\\[sdwSDW]|\\[^0-9A-Za-z]|[^.^$*+?{}\[\]\\|()])[+*]?')
+
+
+def _literales_se_solapan(a, b):
+    """True si una coincidencia de a puede compartir caracteres con una de b."""
+    if a in b or b in a:
+        return True
+    return any(a[-k:] == b[:k] or b[-k:] == a[:k] for k in range(1, min(len(a), len(b))))
+
+
+class _SegmentoLimpieza:
+    """Reglas consecutivas de una columna que se aplican con un solo reemplazo."""
+
+    def __init__(self):
+        self.reglas = []          # (tipo, patron) en el orden original
+        self.literales = []       # literales de más de un carácter
+        self.caracteres = []      # patrones de un solo carácter (regex)
+        self.general = None       # patrón de una regla regex que no se combina
+
+    def admite(self, tipo, patron):
+        if self.general is not None:
+            return False
+        if tipo == 'replace':
+            if len(patron) == 1:
+                return not any(patron in literal for literal in self.literales)
+            if patron != patron.strip() or not patron:
+                return False
+            return (not any(_literales_se_solapan(patron, otro) for otro in self.literales)
+                    and not any(re.search(c, patron) for c in self.caracteres))
+        if _REGEX_UN_CARACTER.fullmatch(patron):
+            return not any(re.search(patron, literal) for literal in self.literales)
+        return not self.reglas
+
+    def agregar(self, tipo, patron):
+        self.reglas.append((tipo, patron))
+        if tipo == 'replace' and len(patron) == 1:
+            self.caracteres.append(re.escape(patron))
+        elif tipo == 'replace':
+            self.literales.append(patron)
+        elif _REGEX_UN_CARACTER.fullmatch(patron):
+            self.caracteres.append(patron)
+        else:
+            self.general = patron
+
+    @property
+    def patron(self):
+        if self.general is not None:
+            return self.general
+        return '|'.join([re.escape(literal) for literal in self.literales] + self.caracteres)
+
+    @property
+    def verificar(self):
+        """
+        Un literal puede aparecer al borrar otra coincidencia ('acb' sin 'c' -> 'ab');
+        si el segmento tiene literales y más de una regla se revisan esas filas.
+        """
+        return bool(self.literales) and len(self.reglas) > 1
+
+
+@lru_cache(maxsize=256)
+def _segmentos_limpieza(reglas):
+    """
+    Agrupa las reglas (tipo, patron) de una columna en segmentos combinables.
+    Se cachea por conjunto de reglas, así que cada patrón se analiza una sola vez.
+    """
+    segmentos = []
+    for tipo, patron in reglas:
+        if not segmentos or not segmentos[-1].admite(tipo, patron):
+            segmentos.append(_SegmentoLimpieza())
+        segmentos[-1].agregar(tipo, patron)
+    return tuple(segmentos)
+
+
+def _limpiar_serie_secuencial(serie, reglas):
+    """Aplica las reglas una por una, con su strip, como la versión original."""
+    for tipo, patron in reglas:
+        serie = serie.str.replace(patron, '', regex=(tipo == 'regex')).str.strip()
+    return serie
+
+
+def _es_texto_arrow(serie):
+    """True si la Serie es texto respaldado por Arrow."""
+    return (isinstance(serie.dtype, pd.ArrowDtype)
+            or (isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage == 'pyarrow'))
+
+
+def _limpiar_serie(serie, reglas):
+    """
+    Limpia una Serie (ya en texto) con un reemplazo y un strip por segmento. Las
+    filas donde un literal reaparece tras el reemplazo se recalculan regla por regla.
+    Con texto Arrow se hace un reemplazo por regla (en C) y un strip por segmento.
+    """
+    for segmento in _segmentos_limpieza(tuple(reglas)):
+        if len(segmento.reglas) == 1:
+            serie = _limpiar_serie_secuencial(serie, segmento.reglas)
+            continue
+        if _es_texto_arrow(serie):
+            # En Arrow cada reemplazo literal es una pasada en C más rápida que la
+            # alternancia de regex: se aplican en orden y solo se omiten los strip intermedios
+            for tipo, patron in segmento.reglas:
+                serie = serie.str.replace(patron, '', regex=(tipo == 'regex'))
+            serie = serie.str.strip()
+            continue
+        limpia = serie.str.replace(segmento.patron, '', regex=True)
+        if segmento.verificar:
+            patron_literales = '|'.join(re.escape(literal) for literal in segmento.literales)
+            revisar = limpia.str.contains(patron_literales, regex=True).fillna(False).to_numpy(dtype=bool)
+            if revisar.any():
+                limpia = limpia.copy()
+                limpia[revisar] = _limpiar_serie_secuencial(serie[revisar], segmento.reglas)
+        serie = limpia.str.strip()
+    return serie
+
+
+def limpiar_columnas(df, reglas, inplace=False, combinar=True):
     """
     Limpia valores en columnas según reglas definidas.
 
+    Con combinar=True las reglas se agrupan por columna y las consecutivas que se
+    pueden combinar (textos literales y regex de un solo carácter como '[$,]' o
+    '\\s+', sin solaparse entre sí) se compilan en una sola expresión regular: cada
+    columna se convierte a texto una vez y recibe un reemplazo y un strip por grupo
+    en lugar de tres pasadas por regla. Las regex generales (anclas, grupos,
+    cuantificadores sobre varios caracteres) se aplican solas y en su orden, y las
+    filas donde al borrar un texto aparece otro de las reglas se recalculan regla por
+    regla. combinar=False aplica las reglas una por una como antes.
+
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - reglas (list): Lista de reglas, cada una es un diccionario con:
@@ -406,80 +1731,238 @@ def limpiar_columnas(df, reglas):
             'tipo': 'replace' o 'regex',
             'patron': 'texto o regex a eliminar'
         }
+    - inplace (bool): Si es True, limpia las columnas sobre df sin copiarlo.
+    - combinar (bool): Si es False, aplica cada regla por separado (versión original).
 
     Retorna:
     - pd.DataFrame: DataFrame con las columnas limpiadas.
     """
-    df_resultado = df.copy()
+    df_resultado = _copia_para_escribir(df, inplace)
+
+    if not combinar:
+        for regla in reglas:
+            col = regla['columna']
+            tipo = regla.get('tipo', 'replace')
+            patron = regla['patron']
+
+            if col not in df_resultado.columns:
+                print(f"⚠️ La columna '{col}' no existe en el DataFrame.")
+                continue
+
+            if tipo == 'replace':
+                # Reemplazo simple
+                df_resultado[col] = df_resultado[col].astype(str).str.replace(patron, '', regex=False)
+            elif tipo == 'regex':
+                # Reemplazo usando expresión regular
+                df_resultado[col] = df_resultado[col].astype(str).str.replace(patron, '', regex=True)
+
+            # Limpiar espacios extra
+            df_resultado[col] = df_resultado[col].str.strip()
+
+        return df_resultado
 
+    # Agrupar las reglas por columna, conservando su orden
+    por_columna = {}
     for regla in reglas:
-        col = regla['columna']
         tipo = regla.get('tipo', 'replace')
-        patron = regla['patron']
+        if tipo in ('replace', 'regex'):
+            por_columna.setdefault(regla['columna'], []).append((tipo, regla['patron']))
+        else:
+            por_columna.setdefault(regla['columna'], [])
 
+    for col, reglas_columna in por_columna.items():
         if col not in df_resultado.columns:
             print(f"⚠️ La columna '{col}' no existe en el DataFrame.")
             continue
+        serie = df_resultado[col].astype(str)
+        df_resultado[col] = _limpiar_serie(serie, reglas_columna) if reglas_columna else serie.str.strip()
 
-        if tipo == 'replace':
-            # Reemplazo simple
-            df_resultado[col] = df_resultado[col].astype(str).str.replace(patron, '', regex=False)
-        elif tipo == 'regex':
-            # Reemplazo usando expresión regular
-            df_resultado[col] = df_resultado[col].astype(str).str.replace(patron, '', regex=True)
+    return df_resultado
 
-        # Limpiar espacios extra
-        df_resultado[col] = df_resultado[col].str.strip()
+def _formatear_serie_fechas(serie, formato='m-d-a', separador='/', separador_salida=None, por_unicos=True):
+    """
+    Normaliza una Serie de fechas en texto a 'dd{sep}mm{sep}aaaa' de forma vectorizada.
 
-    return df_resultado
+    Con por_unicos=True el análisis se hace sobre los valores distintos (ver
+    aplicar_por_unicos), que en columnas de fechas son muchos menos que las filas,
+    y luego se reparte a cada celda.
+
+    Retorna:
+    - tuple: (np.ndarray con las fechas formateadas, np.ndarray booleano con las celdas
+      que no se pudieron interpretar). Las celdas nulas o vacías se devuelven como ''
+      y las no interpretables se dejan como estaban.
+    """
+    if formato not in ('d-m-a', 'm-d-a'):
+        raise ValueError(f"⚠️ Formato de fecha desconocido: '{formato}'. Use 'd-m-a' o 'm-d-a'.")
+    if separador_salida is None:
+        separador_salida = separador
+    sep = re.escape(separador)
 
-def formatear_fechas(df, columnas, formato='m-d-a', separador='/', separador_salida=None):
+    def formatear(valores):
+        valores = valores.astype(object)
+        texto = valores.astype(str)
+        vacias = valores.isna() | (texto.str.strip() == '')
+
+        partes = texto.str.extract(rf'^\s*(\d{{1,2}}){sep}(\d{{1,2}}){sep}(\d{{4}}|\d{{2}})\s*$')
+        if formato == 'm-d-a':
+            mes, dia, anio = partes[0], partes[1], partes[2]
+        else:
+            dia, mes, anio = partes[0], partes[1], partes[2]
+
+        # Normalizar a dos dígitos día y mes, año a 4 dígitos
+        anio = anio.where(anio.str.len() == 4, '20' + anio)
+        resultado = dia.str.zfill(2) + separador_salida + mes.str.zfill(2) + separador_salida + anio
+
+        return pd.DataFrame({'fecha': resultado.fillna(texto).mask(vacias, '').astype(object),
+                             'fallida': resultado.isna() & ~vacias})
+
+    # La Serie puede venir de concatenar varias columnas: se trabaja con posiciones
+    serie = serie.reset_index(drop=True)
+    resultado = aplicar_por_unicos(serie, formatear, max_proporcion=None) if por_unicos else formatear(serie)
+    return resultado['fecha'].to_numpy(dtype=object), resultado['fallida'].to_numpy(dtype=bool)
+
+
+def formatear_fechas(df, columnas, formato='m-d-a', separador='/', separador_salida=None,
+                     devolver_fallidas=False, inplace=False, por_unicos=True):
     """
     Formatea fechas en las columnas especificadas según el formato y separador.
 
+    Todas las columnas se procesan en una sola pasada vectorizada (str.extract + zfill).
+    Las fechas se devuelven siempre como día{sep}mes{sep}año con año de 4 dígitos
+    (los años de 2 dígitos se expanden a 20xx).
+
     Parámetros:
     - df (pd.DataFrame): DataFrame original.
     - columnas (list): Lista de columnas a formatear.
     - formato (str): Formato esperado en la entrada ('d-m-a' o 'm-d-a').
     - separador (str): Separador actual en las fechas (por defecto '/').
     - separador_salida (str): Separador para la salida (si None, usa el mismo que entrada).
+    - devolver_fallidas (bool): Si es True, retorna también {columna: celdas no interpretadas}.
+    - inplace (bool): Si es True, formatea las columnas sobre df sin copiarlo.
+    - por_unicos (bool): Si es True (por defecto), interpreta cada fecha distinta una sola
+                         vez; False procesa celda a celda (columnas casi sin repeticiones).
 
     Retorna:
-    - pd.DataFrame: DataFrame con las fechas formateadas.
+    - pd.DataFrame: DataFrame con las fechas formateadas. Las celdas que no se pudieron
+      interpretar se dejan como estaban y se informa cuántas hubo por columna.
     """
-    df_resultado = df.copy()
-    if separador_salida is None:
-        separador_salida = separador
+    df_resultado = _copia_para_escribir(df, inplace)
 
+    existentes = []
     for col in columnas:
         if col not in df_resultado.columns:
             print(f"⚠️ La columna '{col}' no existe.")
             continue
+        existentes.append(col)
+
+    fallidas_por_columna = {}
+    if existentes:
+        n = len(df_resultado)
+        valores = pd.concat([df_resultado[col] for col in existentes], ignore_index=True)
+        formateadas, fallidas = _formatear_serie_fechas(valores, formato, separador, separador_salida,
+                                                         por_unicos)
+
+        for k, col in enumerate(existentes):
+            df_resultado[col] = formateadas[k * n:(k + 1) * n]
+            fallidas_por_columna[col] = int(fallidas[k * n:(k + 1) * n].sum())
+            if fallidas_por_columna[col]:
+                print(f"⚠️ {fallidas_por_columna[col]} celdas de '{col}' no se pudieron interpretar como fecha.")
+
+    if devolver_fallidas:
+        return df_resultado, fallidas_por_columna
+    return df_resultado
 
-        def convertir_fecha(fecha):
-            if pd.isna(fecha) or fecha.strip() == '':
-                return ''
-            partes = fecha.split(separador)
-            try:
-                if formato == 'm-d-a':
-                    mes, dia, anio = partes
-                elif formato == 'd-m-a':
-                    dia, mes, anio = partes
-                else:
-                    return fecha  # Formato desconocido
-                # Normalizar a dos dígitos día y mes, año a 4 dígitos
-                dia = dia.zfill(2)
-                mes = mes.zfill(2)
-                anio = anio.zfill(4) if len(anio) == 4 else f"20{anio}"
-                return f"{dia}{separador_salida}{mes}{separador_salida}{anio}"
-            except:
-                return fecha  # Si falla, deja el original
-
-        df_resultado[col] = df_resultado[col].astype(str).apply(convertir_fecha)
+def _feriados_a_numpy(feriados):
+    """Convierte una colección de fechas en un arreglo datetime64[D] para numpy.busday_count."""
+    if not feriados:
+        return np.array([], dtype='datetime64[D]')
+    return pd.to_datetime(pd.Index(list(feriados))).to_numpy().astype('datetime64[D]')
 
-    return df_resultado
 
-def calcular_rangos_fechas(df, col_inicio, col_fin, formato='d-m-a', feriados=None):
+def _laborables_por_mes(inicio, fin, feriados):
+    """
+    Descompone cada rango [inicio, fin] en tramos mensuales y cuenta sus días
+    laborables con numpy.busday_count, sin recorrer fila por fila.
+
+    Parámetros:
+    - inicio, fin (np.ndarray): Fechas datetime64[D] (NaT permitido).
+    - feriados (np.ndarray): Fechas datetime64[D] no laborables.
+
+    Retorna:
+    - tuple: (posiciones, anios, dias) con un elemento por tramo mensual de los
+      rangos válidos; las posiciones son 0-based respecto a los arreglos de entrada.
+    """
+    validos = ~(np.isnat(inicio) | np.isnat(fin))
+    validos[validos] = inicio[validos] <= fin[validos]
+    posiciones = np.flatnonzero(validos)
+    ini, fin = inicio[posiciones], fin[posiciones]
+
+    # Número de meses calendario que toca cada rango
+    mes_ini = ini.astype('datetime64[M]')
+    n_meses = (fin.astype('datetime64[M]') - mes_ini).astype(np.int64) + 1
+    desplazamiento = np.arange(n_meses.sum()) - np.repeat(np.cumsum(n_meses) - n_meses, n_meses)
+    mes = np.repeat(mes_ini, n_meses) + desplazamiento
+
+    # Tramo del rango dentro de cada mes: [tramo_ini, tramo_fin)
+    tramo_ini = np.maximum(mes.astype('datetime64[D]'), np.repeat(ini, n_meses))
+    tramo_fin = np.minimum((mes + 1).astype('datetime64[D]'), np.repeat(fin, n_meses) + 1)
+    dias = np.busday_count(tramo_ini, tramo_fin, holidays=feriados)
+
+    anios = mes.astype('datetime64[Y]').astype(np.int64) + 1970
+    return np.repeat(posiciones, n_meses), anios, dias
+
+
+def _laborables_por_anio(inicio, fin, feriados):
+    """
+    Agrega los tramos mensuales de `_laborables_por_mes` por (fila, año).
+
+    Retorna:
+    - tuple: (posiciones, anios, dias_laborables, meses_laborables). Un mes cuenta
+      como laborable si tiene al menos un día laborable dentro del rango.
+    """
+    posiciones, anios, dias = _laborables_por_mes(inicio, fin, feriados)
+    if len(posiciones) == 0:
+        vacio = np.array([], dtype=np.int64)
+        return vacio, vacio, vacio, vacio
+    cambio = np.empty(len(posiciones), dtype=bool)
+    cambio[0] = True
+    cambio[1:] = (posiciones[1:] != posiciones[:-1]) | (anios[1:] != anios[:-1])
+    inicios = np.flatnonzero(cambio)
+    return (posiciones[inicios], anios[inicios],
+            np.add.reduceat(dias, inicios), np.add.reduceat((dias > 0).astype(np.int64), inicios))
+
+
+def calcular_detalle_laborable(df, col_inicio, col_fin, formato='d-m-a', feriados=None):
+    """
+    Calcula los días y meses laborables por año de cada rango en formato largo
+    (una fila por registro y año), sin construir un diccionario por fila.
+
+    Parámetros:
+    - df: DataFrame original.
+    - col_inicio: Nombre de la columna con fecha inicial.
+    - col_fin: Nombre de la columna con fecha final.
+    - formato: 'd-m-a' o 'm-d-a' (por defecto 'd-m-a').
+    - feriados: Lista opcional de fechas (datetime) que son no laborables.
+
+    Retorna:
+    - DataFrame con columnas Fila (índice del registro en df), Anio,
+      DiasLaborables y MesesLaborables. Los rangos inválidos no generan filas.
+    """
+    fmt = "%d/%m/%Y" if formato == 'd-m-a' else "%m/%d/%Y"
+    inicio = pd.to_datetime(df[col_inicio], format=fmt, errors='coerce').to_numpy().astype('datetime64[D]')
+    fin = pd.to_datetime(df[col_fin], format=fmt, errors='coerce').to_numpy().astype('datetime64[D]')
+
+    posiciones, anios, dias, meses = _laborables_por_anio(inicio, fin, _feriados_a_numpy(feriados))
+    return pd.DataFrame({
+        'Fila': df.index.to_numpy()[posiciones],
+        'Anio': anios,
+        'DiasLaborables': dias,
+        'MesesLaborables': meses,
+    })
+
+
+def calcular_rangos_fechas(df, col_inicio, col_fin, formato='d-m-a', feriados=None, detalle_por_anio=True,
+                           inplace=False):
     """
     Calcula métricas entre dos columnas de fechas:
     1) Día, mes, año para cada fecha.
@@ -487,18 +1970,23 @@ def calcular_rangos_fechas(df, col_inicio, col_fin, formato='d-m-a', feriados=No
     3) Total días laborables (incluyendo inicio y fin).
     4) Detalle de días y meses laborables por año.
 
+    Los días laborables se calculan sobre columnas completas con numpy.busday_count.
+    Para obtener el detalle por año en formato largo use `calcular_detalle_laborable`.
+
     Parámetros:
     - df: DataFrame original.
     - col_inicio: Nombre de la columna con fecha inicial.
     - col_fin: Nombre de la columna con fecha final.
     - formato: 'd-m-a' o 'm-d-a' (por defecto 'd-m-a').
     - feriados: Lista opcional de fechas (datetime) que son no laborables.
+    - detalle_por_anio: Si es False, no se genera la columna 'DetalleLaborablePorAnio'.
+    - inplace: Si es True, agrega las columnas (y convierte las fechas) sobre df sin copiarlo.
 
     Retorna:
     - DataFrame con columnas adicionales.
     """
-    df_resultado = df.copy()
-    feriados = set(feriados) if feriados else set()
+    df_resultado = _copia_para_escribir(df, inplace)
+    feriados = _feriados_a_numpy(feriados)
 
     # Definir formato para pandas
     fmt = "%d/%m/%Y" if formato == 'd-m-a' else "%m/%d/%Y"
@@ -522,45 +2010,18 @@ def calcular_rangos_fechas(df, col_inicio, col_fin, formato='d-m-a', feriados=No
                                   (df_resultado[col_fin].dt.month - df_resultado[col_inicio].dt.month))
     df_resultado['TotalAnios'] = df_resultado[col_fin].dt.year - df_resultado[col_inicio].dt.year
 
-    # Calcular días laborables
-    def dias_laborables(inicio, fin):
-        if pd.isna(inicio) or pd.isna(fin) or inicio > fin:
-            return 0
-        dias = pd.date_range(inicio, fin)
-        laborables = [d for d in dias if d.weekday() < 5 and d not in feriados]
-        return len(laborables)
+    # Días laborables por año (tramos mensuales vectorizados)
+    inicio = df_resultado[col_inicio].to_numpy().astype('datetime64[D]')
+    fin = df_resultado[col_fin].to_numpy().astype('datetime64[D]')
+    posiciones, anios, dias, meses = _laborables_por_anio(inicio, fin, feriados)
 
-    df_resultado['DiasLaborables'] = df_resultado.apply(lambda x: dias_laborables(x[col_inicio], x[col_fin]), axis=1)
+    df_resultado['DiasLaborables'] = np.bincount(posiciones, weights=dias, minlength=len(df_resultado)).astype(np.int64)
 
     # Detalle por año: días y meses laborables
-    detalles = []
-    for i, row in df_resultado.iterrows():
-        inicio, fin = row[col_inicio], row[col_fin]
-        if pd.isna(inicio) or pd.isna(fin) or inicio > fin:
-            detalles.append({})
-            continue
-        detalle_anual = {}
-        for year in range(inicio.year, fin.year + 1):
-            rango_inicio = max(inicio, datetime(year, 1, 1))
-            rango_fin = min(fin, datetime(year, 12, 31))
-            dias = pd.date_range(rango_inicio, rango_fin)
-            laborables = [d for d in dias if d.weekday() < 5 and d not in feriados]
-            detalle_anual[year] = {'dias': len(laborables), 'meses': len(set(d.month for d in laborables))}
-        detalles.append(detalle_anual)
-    df_resultado['DetalleLaborablePorAnio'] = detalles
+    if detalle_por_anio:
+        detalles = [{} for _ in range(len(df_resultado))]
+        for pos, anio, d, m in zip(posiciones.tolist(), anios.tolist(), dias.tolist(), meses.tolist()):
+            detalles[pos][anio] = {'dias': d, 'meses': m}
+        df_resultado['DetalleLaborablePorAnio'] = detalles
 
     return df_resultado
-
-
-
-
-
-
-
-
-
-
-
-
-
-